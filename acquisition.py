@@ -0,0 +1,230 @@
+# Acquisition process, runs the XbeeDriver in its own process so graph redraws and GUI freezes can never delay reading the radio or stop the log being written
+
+import os, time, queue, signal, multiprocessing
+from collections import deque
+from datetime import datetime
+
+from xbee import XbeeDriver, TELEMETRY_SHM_NAME
+from session_log import session_name, LOG_DIR
+
+HEARTBEAT_PERIOD = 0.5 #s between heartbeats from the acquisition process
+HEARTBEAT_TIMEOUT = 3.0 #s without a heartbeat before the acquisition process is restarted
+HANDLER_TIMEOUT = 5.0 #s the xbee handler thread can go without going round its loop (it waits at most READ_TIMEOUT) before the acquisition process is restarted
+TO_GUI_SIZE = 10000 #items the queue to the GUI holds (about 2.5 hours of packets at 1Hz), more are dropped and counted, they are still in the session log
+RESTART_DELAY = 2.0 #s minimum between restarts, stops a missing serial port turning into a restart loop
+POLL_PERIOD = 0.005 #s between checks for new packets and commands in the acquisition process
+
+
+def acquisition_main(to_gui, from_gui, COM, BAUD, shm_name, filename, memory=False):
+    signal.signal(signal.SIGINT, signal.SIG_IGN) #ctrl+c in the terminal is for the GUI, it closes us properly
+    driver = XbeeDriver(COM, BAUD, shm_name=shm_name, filename=filename)
+    monitor = None
+    if memory: #see memory_monitor.py, only imported when asked for
+        from memory_monitor import MemoryMonitor
+        monitor = MemoryMonitor(os.path.join(LOG_DIR, session_name(driver.filename) + ".acquisition.memory.log"))
+    parent = multiprocessing.parent_process()
+
+    dropped = 0
+    def send(item): #never blocks, a hung GUI cant hold up the driver
+        nonlocal dropped
+        try:
+            to_gui.put_nowait(item)
+        except queue.Full:
+            dropped += 1
+
+    last_heartbeat = 0
+    running = True
+    while running:
+        try:
+            while True:
+                cmd = from_gui.get_nowait()
+                if cmd[0] == "send":
+                    driver.send_msg(cmd[1])
+                elif cmd[0] == "simp":
+                    if cmd[1]: driver.start_simp(cmd[2])
+                    else: driver.stop_simp()
+                elif cmd[0] == "close":
+                    running = False
+                    break
+        except queue.Empty:
+            pass
+
+        for recv_time, msg, rssi in driver.get_packets():
+            send(["packet", msg, driver.get_recv_count(), driver.last_sent_command, recv_time, rssi])
+            if monitor: monitor.packet()
+        if monitor: monitor.update()
+
+        if time.time() - last_heartbeat > HEARTBEAT_PERIOD:
+            last_heartbeat = time.time()
+            send(["heartbeat", last_heartbeat, driver.get_recv_count(), driver.last_sent_command, driver.connection_status(), monitor.summary() if monitor else None,
+                  driver.handler_activity, driver.commands_written, dropped, driver.simp_c if driver.simp_state else None])
+            if parent is not None and not parent.is_alive(): #GUI process is gone, nobody left to close us
+                running = False
+
+        time.sleep(POLL_PERIOD)
+
+    driver.close()
+    if monitor: monitor.close()
+
+
+class XbeeDriverProcess(): #drop in replacement for XbeeDriver that runs the driver in a supervised acquisition process
+    #acquisition -> GUI  ["packet", msg, received count, last sent command, time received, RSSI dBm or None]
+    #                    ["heartbeat", time, received count, last sent command, serial connection status, memory summary or None,
+    #                     time the xbee handler last went round its loop, commands written to the port, items dropped because the GUI fell behind, next SIMP command or None when simp is off]
+    #GUI -> acquisition  ["send", msg], ["simp", True, SIMP command to start from], ["simp", False], ["close"]
+    def __init__(self, COM=None, BAUD=115200, shm_name=TELEMETRY_SHM_NAME, filename=None, memory=False): #filename: session log to append to, a new one is started if None. memory: run a MemoryMonitor in the acquisition process
+        self.COM = COM
+        self.BAUD = BAUD
+        self.shm_name = shm_name
+        self.memory = memory
+        self.filename = filename or datetime.now().strftime("%H-%M-%S_%d-%m-%Y") + '.csv' #fixed here so a restarted process keeps appending to the same session log
+
+        self._msgs = deque() #[time received, packet, RSSI dBm or None] not yet collected
+        self._recv_count = 0
+        self._recv_base = 0 #packets received by previous acquisition processes this session
+        self.last_sent_command = "-"
+        self.simp_state = False
+        self.simp_position = 0 #next SIMP command the acquisition process will send, as of the last heartbeat
+        self.restarts = 0
+        self._pending = deque() #commands sent that the acquisition process hasnt written to the port yet
+        self._written = 0 #commands the current acquisition process has written
+        self.failed_commands = [] #commands the acquisition process took but may not have sent before it was restarted
+        self.dropped = 0 #packets the acquisition process dropped because the GUI fell behind
+        self._dropped_base = 0
+        self.connection = ["Starting", "", 0, None] #serial connection status from the last heartbeat
+        self.memory_summary = None #memory monitor summary from the last heartbeat
+        self.last_heartbeat = time.time()
+        self._started = 0
+        self.process = None
+
+        self._ctx = multiprocessing.get_context("spawn") #never fork a process that has Qt loaded
+        self._start()
+        print("Xbee driver process: started")
+        print(self.filename)
+
+    def _start(self):
+        self._to_gui = self._ctx.Queue(TO_GUI_SIZE)
+        self._from_gui = self._ctx.Queue()
+        self.process = self._ctx.Process(target=acquisition_main,
+                                         args=(self._to_gui, self._from_gui, self.COM, self.BAUD, self.shm_name, self.filename, self.memory),
+                                         daemon=True)
+        self.process.start()
+        self._started = time.time()
+        self.last_heartbeat = time.time() #give it until the timeout to send the first one
+        self.handler_activity = time.time()
+        self._written = 0
+        self._dropped_base = self.dropped
+        if self.simp_state: #carry on streaming SIMP from where the profile got to, the last command may not have been sent so it is sent again rather than skipped
+            self._from_gui.put(["simp", True, max(self.simp_position - 1, 0)])
+
+    def _restart(self, reason):
+        if time.time() - self._started < RESTART_DELAY:
+            return
+        print("Xbee driver process: restarting acquisition process, " + reason)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(1)
+        self.restarts += 1
+        self._collect() #packets the old process sent before it went
+        self._recv_base = self._recv_count
+
+        unsent = [] #commands the old process never took off its queue, so were certainly not sent
+        try:
+            while True:
+                cmd = self._from_gui.get_nowait()
+                if cmd[0] == "send": unsent.append(cmd[1])
+        except Exception: #queue.Empty, or an item the old process was killed half way through reading
+            pass
+        taken = list(self._pending)[:len(self._pending) - len(unsent)]
+        if taken:
+            self.failed_commands += taken
+            print("Xbee driver process: " + str(len(taken)) + " commands may not have been sent before the restart: " + ", ".join(cmd.strip() for cmd in taken))
+        self._pending = deque(unsent)
+
+        self._start()
+        for cmd in unsent:
+            self._from_gui.put(["send", cmd])
+
+    def _collect(self): #everything the acquisition process has sent so far
+        try:
+            while True:
+                item = self._to_gui.get_nowait()
+                if item[0] == "packet":
+                    self._msgs.append([item[4], item[1], item[5]])
+                if item[0] == "heartbeat":
+                    self.connection = item[4]
+                    self.memory_summary = item[5]
+                    self.handler_activity = item[6]
+                    for i in range(min(item[7] - self._written, len(self._pending))):
+                        self._pending.popleft()
+                    self._written = item[7]
+                    if item[8] + self._dropped_base > self.dropped:
+                        print("Xbee driver process: GUI fell behind, " + str(item[8] + self._dropped_base - self.dropped) + " packets dropped (they are still in the session log)")
+                    self.dropped = item[8] + self._dropped_base
+                    if self.simp_state and item[9] is not None: self.simp_position = item[9]
+                self._recv_count = self._recv_base + item[2]
+                self.last_sent_command = item[3]
+                self.last_heartbeat = time.time()
+        except queue.Empty:
+            pass
+
+    def _poll(self): #collects everything the acquisition process has sent and restarts it if it has died or stopped responding
+        self._collect()
+        if not self.process.is_alive():
+            self._restart("exit code " + str(self.process.exitcode))
+        elif time.time() - self.last_heartbeat > HEARTBEAT_TIMEOUT:
+            self._restart("no heartbeat for " + str(round(time.time() - self.last_heartbeat, 1)) + "s")
+        elif time.time() - self.handler_activity > HANDLER_TIMEOUT:
+            self._restart("xbee handler stuck for " + str(round(time.time() - self.handler_activity, 1)) + "s")
+
+    def connection_status(self): #[state, port, s until the next attempt to connect, RSSI dBm] as of the last heartbeat
+        return self.connection
+
+    def memory_status(self): #MemoryMonitor.summary() of the acquisition process as of the last heartbeat, None if it isnt monitored
+        return self.memory_summary
+
+    def heartbeat_age(self): #s since the acquisition process was last heard from
+        return time.time() - self.last_heartbeat
+
+    def close(self):
+        self._from_gui.put(["close"])
+        self.process.join(10) #closing compresses the last log segment
+        if self.process.is_alive():
+            self.process.terminate()
+
+    def start_simp(self):
+        print("STARTING SIMP")
+        self.simp_state = True
+        self.simp_position = 0
+        self._from_gui.put(["simp", True, 0])
+        return 1
+
+    def stop_simp(self):
+        print("STOPPING SIMP")
+        self.simp_state = False
+        self._from_gui.put(["simp", False])
+        return 0
+
+    def is_unread(self):
+        self._poll()
+        return len(self._msgs) > 0
+
+    def get_msg(self):
+        return self._msgs.popleft()[1]
+
+    def get_msgs(self):
+        return [packet[1] for packet in self.get_packets()]
+
+    def get_packets(self): #[time received, packet, RSSI dBm or None] for every packet not yet collected
+        self._poll()
+        packets = list(self._msgs)
+        self._msgs.clear()
+        return packets
+
+    def get_recv_count(self):
+        return self._recv_count
+
+    def send_msg(self, msg):
+        self._pending.append(msg)
+        self._from_gui.put(["send", msg])
+        return True
@@ -0,0 +1,28 @@
+# Commands that can be sent to the payload, shared by the GUI buttons and the headless command interface
+
+from telemetry import TEAM_ID
+
+COMMANDS = [["Arm",                 "CMD," + TEAM_ID + ",ARM,ON\n"], #[button text, command], <UTC TIME> is replaced with the time when sent
+            ["Disarm",              "CMD," + TEAM_ID + ",ARM,OFF\n"],
+            ["CX ON",               "CMD," + TEAM_ID + ",CX,ON\n"],
+            ["CX OFF",              "CMD," + TEAM_ID + ",CX,OFF\n"],
+            ["Set Time\nUTC",       "CMD," + TEAM_ID + ",ST,<UTC TIME>\n"],
+            ["Set Time\nGPS",       "CMD," + TEAM_ID + ",ST,GPS\n"],
+            ["Calibrate\nAltitude", "CMD," + TEAM_ID + ",CAL\n"],
+            ["Simulation\nDisable", "CMD," + TEAM_ID + ",SIM,DISABLE\n"],
+            ["Simulation\nEnable",  "CMD," + TEAM_ID + ",SIM,ENABLE\n"],
+            ["Simulation\nActivate","CMD," + TEAM_ID + ",SIM,ACTIVATE\n"],
+            ["Probe\nUnlatch",      "CMD," + TEAM_ID + ",MEC,SEPERATION,ON\n"],
+            ["Probe\nLatch",        "CMD," + TEAM_ID + ",MEC,SEPERATION,OFF\n"],
+            ["Gimbal\nOn",          "CMD," + TEAM_ID + ",MEC,GIMBAL,ON\n"],
+            ["Gimbal\nOff",         "CMD," + TEAM_ID + ",MEC,GIMBAL,OFF\n"]]
+
+ONLY_ON_GROUND = ["Arm", "CX OFF", "Set Time\nUTC", "Set Time\nGPS", "Calibrate\nAltitude", "Simulation\nEnable", "Simulation\nActivate"] #not allowed once the payload has left the launch pad
+STARTS_SIMP = "Simulation\nActivate" #also starts streaming SIMP pressures
+STOPS_SIMP = "Simulation\nDisable" #also stops streaming them
+
+
+def command_name(text): #button text as typed at a terminal, "Set Time\nUTC" -> "set time utc"
+    return " ".join(text.lower().split())
+
+COMMAND_NAMES = {command_name(name): [name, command] for name, command in COMMANDS}
@@ -0,0 +1,92 @@
+# GPS ground track on a flat grid around the launch point, with distance from the ground station and a landing estimate
+
+import numpy as np
+
+EARTH_RADIUS = 6371000 #m
+GCS_POSITION = None #[lat, long] of the ground station in degrees, None uses the launch point
+CAPACITY = 4096 #points kept, once full the older half of the track is thinned out to every other point
+FIT_SECONDS = 10 #s of track the landing estimate is fitted to
+MIN_DESCENT_RATE = 0.5 #m/s, slower than this the payload is treated as not descending
+
+
+def bearing(dx, dy): #degrees clockwise from north
+    return np.degrees(np.arctan2(dx, dy)) % 360
+
+
+class GroundTrack():
+    def __init__(self, gcs_position=GCS_POSITION, capacity=CAPACITY):
+        self.gcs_position = gcs_position
+        self.capacity = capacity
+        self.x = np.empty(capacity) #m east of the launch point
+        self.y = np.empty(capacity) #m north of the launch point
+        self.alt = np.empty(capacity) #m above the launch point
+        self.t = np.empty(capacity)
+        self.n = 0
+        self.thinned = 0 #number of times the track has been thinned out, so anything drawing it knows to redraw it all
+        self.origin = None #[lat, long, alt] of the launch point
+        self.gcs = [0.0, 0.0] #ground station position on the grid
+
+    def set_origin(self, lat, long, alt):
+        self.origin = [lat, long, alt]
+        self._scale = [EARTH_RADIUS * np.radians(1) * np.cos(np.radians(lat)), EARTH_RADIUS * np.radians(1)] #m per degree of [long, lat], worked out once
+        if self.gcs_position:
+            self.gcs = self.project(*self.gcs_position)
+
+    def project(self, lat, long): #degrees to m east, m north of the launch point, works on arrays too
+        return [(long - self.origin[1]) * self._scale[0], (lat - self.origin[0]) * self._scale[1]]
+
+    def add(self, lat, long, alt, t): #one GPS fix, ignored if there is no fix
+        if not (np.isfinite(lat) and np.isfinite(long) and np.isfinite(alt)) or (lat == 0 and long == 0): #0,0 is sent before the first fix
+            return
+        if self.origin is None:
+            self.set_origin(lat, long, alt)
+        if self.n == self.capacity:
+            self._thin()
+        self.x[self.n], self.y[self.n] = self.project(lat, long)
+        self.alt[self.n] = alt - self.origin[2]
+        self.t[self.n] = t
+        self.n += 1
+
+    def extend(self, lat, long, alt, t): #many fixes at once, arrays in time order
+        for i in range(len(t)): #only run when loading a session so per fix is fine
+            self.add(lat[i], long[i], alt[i], t[i])
+
+    def _thin(self): #drops every other point of the older half so long tracks stay a fixed size
+        half = self.n // 2
+        keep = np.concatenate([np.arange(0, half, 2), np.arange(half, self.n)])
+        for a in (self.x, self.y, self.alt, self.t):
+            a[:len(keep)] = a[keep]
+        self.n = len(keep)
+        self.thinned += 1
+
+    def clear(self): #forgets the track and the launch point, the next fix is the new launch point
+        self.n = 0
+        self.thinned += 1
+        self.origin = None
+        self.gcs = [0.0, 0.0]
+
+    def track(self): #[x, y] of every point kept
+        return [self.x[:self.n], self.y[:self.n]]
+
+    def position(self): #[x, y, alt] of the latest fix, None before the first
+        if self.n == 0:
+            return None
+        return [self.x[self.n - 1], self.y[self.n - 1], self.alt[self.n - 1]]
+
+    def from_gcs(self, x, y): #[distance m, bearing degrees] of a point from the ground station
+        dx, dy = x - self.gcs[0], y - self.gcs[1]
+        return [np.hypot(dx, dy), bearing(dx, dy)]
+
+    def landing_estimate(self): #[x, y] the payload will land at if it keeps drifting and descending as it has for the last FIT_SECONDS, None if it isnt descending
+        if self.n < 3:
+            return None
+        start = np.searchsorted(self.t[:self.n], self.t[self.n - 1] - FIT_SECONDS)
+        if self.n - start < 3:
+            return None
+        t = self.t[start:self.n] - self.t[self.n - 1]
+        fit = np.polyfit(t, np.stack([self.x[start:self.n], self.y[start:self.n], self.alt[start:self.n]], axis=1), 1) #row 0 is the rate of each, row 1 the value now
+        descent_rate = -fit[0, 2]
+        if descent_rate < MIN_DESCENT_RATE:
+            return None
+        time_to_ground = max(fit[1, 2], 0) / descent_rate
+        return [fit[1, 0] + fit[0, 0] * time_to_ground, fit[1, 1] + fit[0, 1] * time_to_ground]
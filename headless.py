@@ -0,0 +1,185 @@
+# Headless ground station for a small computer at the antenna, python headless.py [serial port] [--port N] [--memory] then type help
+
+import sys, os, time, select, socket, queue, threading
+import numpy as np
+
+from telemetry import FIELD_INDEX, packet_numbers
+from xbee import XbeeDriver
+from session_log import session_name, LOG_DIR
+from link_quality import LinkStats, LinkLog
+from commands import COMMAND_NAMES, ONLY_ON_GROUND, STARTS_SIMP, STOPS_SIMP, command_name
+from memory_monitor import MemoryMonitor, memory_mb, size_text
+
+HEADLESS_COM_PORT = None #port tried first, None finds the xbee by listening for telemetry on every port
+COMMAND_PORT = 5025 #local TCP port commands are accepted on, only from this computer, None for the terminal only
+POLL_PERIOD = 0.25 #s the main loop waits for commands, the driver thread receives and logs packets regardless so this only sets how often stats are updated
+STATUS_PERIOD = 10 #s between status lines
+
+HELP = """commands:
+  status              packet counts, loss, CPU and current memory (RSS) use
+  simp on / simp off  start or stop streaming SIMP pressures
+  send <text>         send text to the payload as is (a newline is added)
+  <button name>       send a payload command, same names as the GUI buttons: """ + ", ".join(COMMAND_NAMES) + """
+  quit                close the driver and log and exit
+"""
+
+
+class HeadlessStation(): #xbee driver (session log, SIMP, commands) and link statistics with no GUI, commands are typed at the terminal or sent as lines of text to a local TCP port
+    def __init__(self, COM, BAUD=115200, command_port=COMMAND_PORT, memory=False, terminal=True): #memory: run a MemoryMonitor, see memory_monitor.py. terminal: read commands typed at the terminal
+        self.driver = XbeeDriver(COM, BAUD, verbose=False)
+        self.link = LinkStats()
+        self.link_log = LinkLog(os.path.join(LOG_DIR, session_name(self.driver.filename) + ".link.log"))
+        self.state = "" #payload state from the latest packet
+        self.monitor = None
+        if memory:
+            self.monitor = MemoryMonitor(os.path.join(LOG_DIR, session_name(self.driver.filename) + ".memory.log"))
+        self.running = True
+
+        self.server = None
+        self.clients = {} #socket: bytes received but not yet a whole line
+        if command_port:
+            self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server.bind(("127.0.0.1", command_port))
+            self.server.listen()
+            print("headless: accepting commands on 127.0.0.1:" + str(command_port))
+        self.typed = queue.Queue() #lines typed at the terminal, None once it is closed
+        if terminal: #read in a thread as select only works on sockets on windows
+            threading.Thread(target=self._read_terminal, daemon=True).start()
+
+        self.start_time = time.time()
+        self.start_cpu = time.process_time()
+        self.last_status = time.time()
+
+    def command(self, line): #runs one line of the command interface, returns the reply
+        line = line.strip()
+        name = command_name(line)
+        if name == "":
+            return ""
+        if name == "help":
+            return HELP
+        if name == "status":
+            return self.status()
+        if name == "quit":
+            self.running = False
+            return "closing"
+        if name in ["simp on", "simp off"]:
+            (self.driver.start_simp if name == "simp on" else self.driver.stop_simp)()
+            return "simp " + name.split()[1]
+        if name.split()[0] == "send":
+            self.driver.send_msg(line[len("send"):].strip() + "\n")
+            return "sent"
+        if name in COMMAND_NAMES:
+            button, cmd = COMMAND_NAMES[name]
+            if button in ONLY_ON_GROUND and self.state not in ["", "LAUNCH_PAD"]:
+                return "not sent, " + command_name(button) + " is only allowed on the launch pad (state " + self.state + ")"
+            self.driver.send_msg(cmd)
+            if button == STARTS_SIMP: self.driver.start_simp()
+            if button == STOPS_SIMP: self.driver.stop_simp()
+            return "sent " + cmd.strip()
+        return "unknown command " + line + ", type help for the commands"
+
+    def status(self):
+        state, port, retry, rssi = self.driver.connection_status()
+        elapsed = time.time() - self.start_time
+        cpu = (time.process_time() - self.start_cpu) / elapsed * 100 if elapsed > 0 else 0
+        return ((port + " " if state == "Connected" else state + " " + port + (" retry in " + str(round(retry, 1)) + "s " if retry else "")) +
+                ("rssi " + str(rssi) + "dBm  " if rssi is not None else "") +
+                "received " + str(self.driver.get_recv_count()) +
+                "  lost " + str(self.link.lost) + " (" + str(round(self.link.loss_rate() * 100, 1)) + "%)" +
+                "  rate " + str(round(self.link.packet_rate(), 2)) + "Hz" +
+                "  state " + (self.state or "-") +
+                "  last cmd " + self.driver.last_sent_command +
+                "  cpu " + str(round(cpu, 1)) + "%  rss " + str(round(memory_mb(), 1)) + "MB" +
+                (self.memory_text() if self.monitor and self.monitor.summary() else ""))
+
+    def memory_text(self): #memory monitor part of the status line
+        traced, growth, objects, over = self.monitor.summary()
+        return ("  traced " + size_text(traced) + (" " + size_text(growth) + "/pkt " + str(round(objects, 1)) + " objects/pkt" if np.isfinite(growth) else "") +
+                (" OVER BUDGET" if over else ""))
+
+    def _read_terminal(self):
+        for line in sys.stdin: #ends at end of input, the station keeps running
+            self.typed.put(line)
+
+    def _serve(self, client): #runs every whole line the client has sent and replies to each
+        data = client.recv(4096)
+        if not data:
+            self._drop(client)
+            return
+        self.clients[client] += data
+        while b"\n" in self.clients[client]:
+            line, self.clients[client] = self.clients[client].split(b"\n", 1)
+            client.sendall((self.command(line.decode(errors="replace")) + "\n").encode())
+
+    def _drop(self, client):
+        del self.clients[client]
+        client.close()
+
+    def poll(self): #waits up to POLL_PERIOD for commands, then collects packets
+        inputs = [s for s in [self.server] if s] + list(self.clients)
+        readable = []
+        if inputs:
+            readable = select.select(inputs, [], [], POLL_PERIOD)[0] #sleeps until a command arrives or POLL_PERIOD is up
+        else:
+            time.sleep(POLL_PERIOD)
+        try:
+            while True:
+                print(self.command(self.typed.get_nowait()))
+        except queue.Empty:
+            pass
+        for source in readable:
+            if source is self.server:
+                try:
+                    client, address = self.server.accept()
+                except OSError: #gone before it was accepted
+                    continue
+                self.clients[client] = b""
+            else:
+                try:
+                    self._serve(source)
+                except OSError: #client went away mid conversation (reset or broken pipe), only it is dropped
+                    self._drop(source)
+
+        for recv_time, msg, rssi in self.driver.get_packets():
+            self.link.packet(packet_numbers(msg)[0], recv_time) #Packet Count is the first numeric field
+            if len(msg) > FIELD_INDEX["State"]:
+                self.state = msg[FIELD_INDEX["State"]]
+            if self.monitor: self.monitor.packet()
+        self.link_log.update(self.link)
+        if self.monitor: self.monitor.update()
+
+        if time.time() - self.last_status > STATUS_PERIOD:
+            self.last_status = time.time()
+            print(self.status())
+
+    def run(self):
+        print("headless: type help for the commands")
+        try:
+            while self.running:
+                self.poll()
+        except KeyboardInterrupt:
+            pass
+        self.close()
+
+    def close(self):
+        for client in self.clients:
+            client.close()
+        if self.server:
+            self.server.close()
+        self.driver.close()
+        print(self.status())
+        if self.monitor: self.monitor.close()
+
+
+if __name__ == "__main__":
+    print("### CANSAT Ground Station (headless) ###")
+    args = sys.argv[1:]
+    port = COMMAND_PORT
+    if "--port" in args:
+        port = int(args[args.index("--port") + 1])
+        del args[args.index("--port"):args.index("--port") + 2]
+    memory = "--memory" in args
+    if memory: args.remove("--memory")
+    HeadlessStation(args[0] if args else HEADLESS_COM_PORT, 115200, port, memory).run()
+    print("bye")
@@ -0,0 +1,127 @@
+# Limit checking for telemetry fields, rules from limits.json compiled into numpy arrays with a row per rule
+
+import os, json, time
+import numpy as np
+
+from telemetry import NUMERIC_FIELDS
+
+LIMITS_FILE = os.path.join(os.path.dirname(__file__), "limits.json")
+
+LEVELS = ["OK", "Warn", "Error"] #index is the level returned by LimitChecker.check, names are the variable_line statuses
+RULES = ["", "warn range", "rate", "stuck", "error range", "stale"] #why a field is at its level, least to most severe
+
+
+def _bound(value, default): #json null means no limit
+    return default if value is None else float(value)
+
+
+class LimitChecker(): #checks every numeric field of a packet against the compiled rules, a few array operations however many rules there are
+    def __init__(self, path=LIMITS_FILE):
+        with open(path, "r") as file:
+            config = json.load(file)
+
+        self.index = {name: i for i, name in enumerate(NUMERIC_FIELDS)}
+        rules = []
+        for name in config:
+            if name.startswith("_"): #comments
+                continue
+            rule = config[name]
+            field = rule.get("field", name)
+            if field not in self.index:
+                print("limits: unknown field " + field + " in rule " + name + ", ignored")
+                continue
+            warn = rule.get("warn", [None, None])
+            error = rule.get("error", [None, None])
+            rules.append([self.index[field],
+                          _bound(warn[0], -np.inf), _bound(warn[1], np.inf),
+                          _bound(error[0], -np.inf), _bound(error[1], np.inf),
+                          _bound(rule.get("rate"), np.inf),
+                          _bound(rule.get("stuck"), np.inf),
+                          _bound(rule.get("stale"), np.inf),
+                          rule.get("flight_only", False)])
+
+        rules = np.array(rules, dtype=np.float64).reshape(-1, 9)
+        self.columns = rules[:, 0].astype(int) #field each rule checks
+        self.warn_lo, self.warn_hi = rules[:, 1], rules[:, 2]
+        self.error_lo, self.error_hi = rules[:, 3], rules[:, 4]
+        self.max_rate = rules[:, 5]
+        self.stuck = rules[:, 6]
+        self.stale = rules[:, 7]
+        self.flight_only = rules[:, 8].astype(bool)
+        self.reset()
+        print("limits: " + str(len(rules)) + " rules loaded from " + os.path.basename(path))
+
+    def reset(self):
+        n = len(NUMERIC_FIELDS)
+        self.last_values = np.full(n, np.nan)
+        self.last_time = np.nan
+        self.last_change = np.full(n, np.nan) #time each field last changed value
+        self.last_valid = np.full(n, np.nan) #time each field was last a number
+        self.level = np.zeros(n, dtype=np.int8) #current level of each field, see LEVELS
+        self.rule = np.zeros(n, dtype=np.int8) #rule causing it, see RULES
+        self.last_rate = np.full(n, np.nan) #change per second at the last packet
+        self.in_flight = False #as of the last packet
+
+    def check(self, values, t=None, in_flight=True): #values in NUMERIC_FIELDS order, returns the fields whose level changed as [[field, level, rule, value]]
+        if t is None: t = time.time()
+        valid = np.isfinite(values)
+        changed = values != self.last_values
+        self.last_change = np.where(changed | np.isnan(self.last_change), t, self.last_change)
+        self.last_valid = np.where(valid | np.isnan(self.last_valid), t, self.last_valid)
+        with np.errstate(invalid="ignore"):
+            rate = np.abs(values - self.last_values) / (t - self.last_time) #nan until two packets have arrived
+        self.last_values = values.copy()
+        self.last_time = t
+        self.last_rate = rate
+        self.in_flight = in_flight
+        return self._evaluate(t)
+
+    def tick(self, t=None): #checks the time based rules (stale, stuck) again without a packet, so they fire during an outage. returns the changes like check
+        if np.isnan(self.last_time):
+            return []
+        if t is None: t = time.time()
+        return self._evaluate(t)
+
+    def _evaluate(self, t): #levels of every field at time t from the last packet
+        values = self.last_values
+        v = values[self.columns] #per rule
+        active = ~self.flight_only | self.in_flight
+        with np.errstate(invalid="ignore"):
+            hits = [np.zeros(len(v), dtype=bool),
+                    (v < self.warn_lo) | (v > self.warn_hi),
+                    self.last_rate[self.columns] > self.max_rate,
+                    t - self.last_change[self.columns] > self.stuck,
+                    (v < self.error_lo) | (v > self.error_hi),
+                    t - self.last_valid[self.columns] > self.stale]
+        rule = np.zeros(len(v), dtype=np.int8)
+        for code in range(1, len(hits)): #later rules are more severe and win
+            rule[hits[code] & active] = code
+        rule_level = np.array([0, 1, 1, 1, 2, 2], dtype=np.int8)[rule]
+
+        level = np.zeros(len(NUMERIC_FIELDS), dtype=np.int8)
+        np.maximum.at(level, self.columns, rule_level) #worst rule for each field
+        field_rule = np.zeros(len(NUMERIC_FIELDS), dtype=np.int8)
+        np.maximum.at(field_rule, self.columns, rule)
+
+        changes = [[NUMERIC_FIELDS[i], int(level[i]), int(field_rule[i]), float(values[i])] for i in np.flatnonzero(level != self.level)]
+        self.level = level
+        self.rule = field_rule
+        return changes
+
+    def status(self, field): #current variable_line status of a field
+        return LEVELS[self.level[self.index[field]]]
+
+
+class AlarmLog(): #every change of a field's level, one csv line each: time, field, value, level, rule
+    def __init__(self, path):
+        self.path = path
+
+    def record(self, changes, t=None):
+        if not changes:
+            return
+        if t is None: t = time.time()
+        stamp = time.strftime("%H:%M:%S", time.localtime(t))
+        with open(self.path, "a") as file:
+            for field, level, rule, value in changes:
+                file.write(",".join([stamp, field, str(value), LEVELS[level], RULES[rule]]) + "\n")
+                print("ALARM: " + field + " " + LEVELS[level] + " " + RULES[rule] + " (" + str(value) + ")")
@@ -0,0 +1,101 @@
+# Link quality from packet counts and arrival times: loss, gap lengths, inter-arrival times and an LOS threshold that follows the packet rate
+
+import os, time
+import numpy as np
+from collections import deque
+
+WINDOW = 60 #packets the sliding window statistics are worked out over
+DEFAULT_LOS = 1.20 #s without a packet before LOS is declared, used until the packet rate has been measured
+LOS_PERIODS = 1.2 #LOS once this many packet periods have gone by without a packet
+LOS_JITTER = 3 #plus this many times the spread (median absolute deviation) of the inter-arrival times
+MIN_INTERVALS = 3 #inter-arrival times needed before the LOS threshold adapts
+
+
+class LinkStats():
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.received = 0
+        self.lost = 0 #total packets missing from the packet count sequence
+        self.bursts = {} #gap length: number of gaps that long
+        self.last_count = None
+        self.last_time = time.time()
+        self.window = deque(maxlen=WINDOW) #[received, lost] for each of the latest packets
+        self.intervals = deque(maxlen=WINDOW) #s between the latest packets
+        self._los = DEFAULT_LOS
+
+    def packet(self, packet_count, t=None): #call for every packet received, packet_count may be nan if it couldnt be read
+        if t is None: t = time.time()
+        if self.received > 0:
+            self.intervals.append(t - self.last_time)
+        self.last_time = t
+        self.received += 1
+
+        gap = 0
+        if np.isfinite(packet_count):
+            if self.last_count is not None and packet_count > self.last_count: #a count going backwards is the payload restarting, not loss
+                gap = int(packet_count - self.last_count - 1)
+            self.last_count = packet_count
+        if gap > 0:
+            self.lost += gap
+            self.bursts[gap] = self.bursts.get(gap, 0) + 1
+        self.window.append([1, gap])
+
+        if len(self.intervals) >= MIN_INTERVALS: #worked out once per packet rather than every time LOS is checked
+            intervals = np.array(self.intervals)
+            median = np.median(intervals)
+            spread = np.median(np.abs(intervals - median))
+            self._los = max(DEFAULT_LOS / 2, LOS_PERIODS * median + LOS_JITTER * spread)
+
+    def loss_rate(self): #fraction of packets lost over the sliding window
+        if not self.window:
+            return 0.0
+        received, lost = np.sum(np.array(self.window), axis=0)
+        return lost / (received + lost)
+
+    def packet_rate(self): #packets per second over the sliding window, nan until measured
+        if not self.intervals:
+            return np.nan
+        return 1 / np.median(np.array(self.intervals))
+
+    def interval_stats(self): #[mean, std, max] inter-arrival time over the sliding window
+        if not self.intervals:
+            return [np.nan, np.nan, np.nan]
+        intervals = np.array(self.intervals)
+        return [intervals.mean(), intervals.std(), intervals.max()]
+
+    def longest_burst(self):
+        return max(self.bursts, default=0)
+
+    def los_threshold(self):
+        return self._los
+
+    def los(self, t=None): #True if a packet is overdue
+        if t is None: t = time.time()
+        return t - self.last_time > self._los
+
+    def summary(self): #one csv line for the link log, see LinkLog
+        mean, std, maximum = self.interval_stats()
+        bursts = " ".join(str(length) + "x" + str(self.bursts[length]) for length in sorted(self.bursts))
+        return ",".join([str(self.received), str(self.lost), str(round(self.loss_rate() * 100, 2)), str(round(self.packet_rate(), 3)),
+                         str(round(mean, 3)), str(round(std, 3)), str(round(maximum, 3)), str(round(self._los, 3)), bursts])
+
+
+class LinkLog(): #link statistics written every period seconds
+    HEADER = "time,received,lost,loss %,packet rate Hz,interval mean s,interval std s,interval max s,los threshold s,bursts (length x count)\n"
+
+    def __init__(self, path, period=10):
+        self.path = path
+        self.period = period
+        self.last_write = 0
+
+    def update(self, stats, t=None):
+        if t is None: t = time.time()
+        if t - self.last_write < self.period:
+            return
+        self.last_write = t
+        new = not os.path.exists(self.path)
+        with open(self.path, "a") as file:
+            if new: file.write(self.HEADER)
+            file.write(time.strftime("%H:%M:%S", time.localtime(t)) + "," + stats.summary() + "\n")
@@ -3,12 +3,11 @@
 #               github - BTSC10
 #               btsc@mail.com
 
-import sys, os, time, serial, threading
-from datetime import datetime
+import sys, os, time
 import numpy as np
 
 from PyQt6.QtCore import QSize, Qt, QTimer
-from PyQt6.QtGui import QColor, QFont
+from PyQt6.QtGui import QColor, QFont, QPalette
 from PyQt6.QtWidgets import (
     QApplication, 
     QMainWindow,
@@ -17,15 +16,29 @@ from PyQt6.QtWidgets import (
     QLabel,
     QVBoxLayout,
     QHBoxLayout,
-    QGridLayout)
+    QGridLayout,
+    QComboBox)
 
 from pyqtgraph.opengl import GLViewWidget, MeshData, GLMeshItem
-from pyqtgraph import GraphicsLayoutWidget, PlotWidget, ViewBox, AxisItem, PlotCurveItem, mkPen
+from pyqtgraph import GraphicsLayoutWidget, PlotWidget, ViewBox, AxisItem, PlotCurveItem, ScatterPlotItem, InfiniteLine, mkPen
 from stl import mesh
 
-XBEE_COM_PORT = "COM11" #"/dev/ttyUSB0"
-SIM_DATA_FILE = "sim_data.csv"
+from telemetry import TelemetryStore, packet_numbers, level_of_detail, NUMERIC_FIELDS
+from session_log import latest_session, load_session, read_session_values, session_name, is_indexed, LOG_DIR
+from limits import LimitChecker, AlarmLog, LEVELS
+from acquisition import XbeeDriverProcess
+from link_quality import LinkStats, LinkLog
+from render_scheduler import RenderScheduler
+from commands import COMMANDS, ONLY_ON_GROUND, STARTS_SIMP, STOPS_SIMP
+from ground_track import GroundTrack
+from memory_monitor import MemoryMonitor, size_text
+
+XBEE_COM_PORT = None #port the xbee is on eg "COM11" or "/dev/ttyUSB0", tried first. None finds it by listening for telemetry on every port
 MESH_FILE = "Container_old.stl"
+RESUME_SECONDS = 30 * 60 #how much of the previous session is reloaded when started with --resume
+RETENTION_SECONDS = 30 * 60 #how much history is kept in memory, older data is read back from the session log when a graph is zoomed out past it
+MEMORY_MONITOR = False #True (or --memory) to watch memory use in both processes, see memory_monitor.py. Slows the GCS down so only for testing
+SIM_DATA_FILE = "sim_data.csv" #telemetry lines in data/ that XbeeDriverSim plays back on a loop (SIMP pressures are in data/simp_commands.txt, see simp_profile.py)
 
 SCRIPT_DIR = os.path.dirname(__file__)  #stores path of main.py so all paths can be defined as relative
 
@@ -33,6 +46,7 @@ SCRIPT_DIR = os.path.dirname(__file__)  #stores path of main.py so all paths can
 class XbeeDriverSim(): #class that can replace XbeeDriver and inject simulated data
     def __init__(self, gui):
         self.gui = gui
+        self.filename = time.strftime("%H-%M-%S_%d-%m-%Y") + '.csv' #session name for the alarm log, nothing is logged to it
 
         self._msg = ""
         self._unread = False
@@ -55,7 +69,9 @@ class XbeeDriverSim(): #class that can replace XbeeDriver and inject simulated d
         if self._unread:
             print("Warning Data lost")
 
-        self._msg = self.msgs[self.c][:-1]
+        if not self.msgs:
+            return
+        self._msg = self.msgs[self.c % len(self.msgs)].rstrip("\r\n")
         self._msg = self._msg.split(',')
         end_of_echo = self._msg.index("")
         self._msg = self._msg[:24] + [','.join(self._msg[24:end_of_echo])] + self._msg[end_of_echo:]
@@ -81,161 +97,28 @@ class XbeeDriverSim(): #class that can replace XbeeDriver and inject simulated d
 
     def is_unread(self):
         return self._unread
-    
-    def send_cmd(self, cmd):
-        print("Sending ", cmd)
-        #self.gui.variables["CMD Echo"].setStatus("Warn")
-        #self.gui.variables["CMD Echo Line"].setStatus("Warn")
-
-        self.last_sent_command = cmd
-
-class XbeeDriver():
-    def __init__(self, gui, COM=XBEE_COM_PORT, BAUD=115200):
-
-        self.filename = datetime.now().strftime("%H-%M-%S_%d-%m-%Y") + '.csv'
-
-        self.gui = gui
-        self.ser = serial.Serial(COM, BAUD)
-        self.ser.timeout = 0.01
-
-        self.xbee_thread = threading.Thread(target=self.xbee_handler, daemon=True)
-        self._xbee_lock = threading.Lock()
-        self._kill_flag = False
-        self.xbee_thread.start()
-
-        self.simp_thread = threading.Thread(target=self.simp_handler, daemon=True)
-        self.simp_thread.start()
-        self._simp_lock = threading.Lock() #only used to check the exit flag
-        self._simp_running_flag = False
-        self.simp_state = False
-        self._toSendSimp = ''
-
-        self._msg = ""
-        self._unread = False
-        self._recv_count = 0
-        self._toSend = ""
-        self.last_sent_command = "-"
-
-        print("Xbee driver: finished init")
-        print(self.filename)
 
-    def close(self):
-        self.stop_simp()
-        with self._xbee_lock: self._kill_flag = True
-        self.ser.close()
+    def get_msgs(self):
+        return [self.get_msg()] if self._unread else []
 
-    def xbee_handler(self): #reads from xbee and writes to xbee
-        latest_msg = '' #buffer for incomming msg
-        while True:
-            try:
-                with self._xbee_lock:
-                    if self._kill_flag: 
-                        break
-                    latest_char = self.ser.read().decode()
-                with open(os.path.join(SCRIPT_DIR, "logs", self.filename), 'a') as file:
-                    file.write(latest_char)
-        
-                if latest_char == "\n": #signifies end of current msg
-                    with self._xbee_lock:
-                        if self._unread:
-                            print("xbee_handler: MSG OVERFLOW, data lost")
-                        print("xbee handler: got packet:")
-                        print(latest_msg)
-                        self._msg = latest_msg.split(',')
-
-                        end_of_echo = self._msg.index('') #remove splits in echo (every command has commas)
-                        self._msg = self._msg[:24] + [','.join(self._msg[24:end_of_echo])] + self._msg[end_of_echo:]
-                        print(self._msg)
-                        print(len(self._msg))
-                        latest_msg = ''
-                        print("xbee_handler: got new msg")
-                        self._unread = True
-                        self._recv_count += 1
-
-                        if self._toSendSimp != '': #if there is a simp msg to send
-                            print("xbee handler: allowing single simp send")
-                            self.ser.write(self._toSendSimp.encode()) #send simp msg to xbee
-                            self.last_sent_command = ('\n\n' + self._toSendSimp).split('\n')[-2]
-                            self._toSendSimp = ''
-                            print('done')
-                else:
-                    latest_msg += latest_char #add recieved char to msg buffer
-
-                with self._xbee_lock:
-                    if self._toSend != '':
-                        print("xbee_handler sending: ", self._toSend)
-                        self.ser.write(self._toSend.encode())
-                        self.last_sent_command = ('\n\n' + self._toSend).split('\n')[-2]
-                        self._toSend = ''
-            except Exception as e:
-                print("xbee handler: ERROR")
-                print(str(e))
+    def get_packets(self):
+        return [[time.time(), msg, None] for msg in self.get_msgs()]
 
-    def simp_handler(self): #this thread handles reading from a simulated data file, generates SIMP commands, and makes them available to the xbee handler at self._toSend
-        with open(os.path.join(SCRIPT_DIR, "data", SIM_DATA_FILE), "r") as file:
-            all_data = file.readlines()
-
-        while True:
-            self.simp_c = 0
-            self.simp_state = True
-            time.sleep(0.5)
-            while self.simp_state:
-                with self._simp_lock:
-                    self.simp_state = self._simp_running_flag  
-                if self.simp_state:   
-                    print("SimP handler: sending packet", self.simp_c)
-                    self.send_simp_msg("CMD,3130,SIMP," + str(0.1) + "\n")
-                    self.simp_c += 1
-
-                    simp_timer = time.time()
-                    while time.time() - simp_timer < 1: #this whole simp handler thing is super messy. I would rework all of this. I was having a weird issue where this simp handler thread would never halt or go busy so the main thread never ran and didnt realise the problem untill id come up with whatever this hell is.
-                        time.sleep(0.1)
+    def connection_status(self):
+        return ["Connected", "SIM", 0, None]
 
-    def start_simp(self):
-        print("STARTING SIMP")
-        with self._simp_lock:
-            self._simp_running_flag = True
-            print(self._simp_running_flag)
-        return 1
-    
-    def stop_simp(self):
-        print("STOPPING SIMP")
-        with self._simp_lock:
-            self._simp_running_flag = False
-        return 0
+    def memory_status(self):
+        return None
 
-    def is_unread(self):
-        with self._xbee_lock:
-            x = self._unread
-        return x
-    
-    def get_msg(self):
-        with self._xbee_lock:
-            msg = self._msg
-            self._unread = False
-        return msg
-    
     def get_recv_count(self):
-        with self._xbee_lock:
-            x = self._recv_count
-        return x
-    
-    def send_msg(self, msg):
-        if "<UTC TIME>" in msg: #replace <UTC TIME> with HH:MM:SS timestamp
-            print("Replacing ", msg)
-            start = msg.find("<UTC TIME>")
-            end = msg[start:].find(">") + start + 1
-            msg = msg[:start] + datetime.now().strftime("%H:%M:%S") + msg[end:]
-            print("with", msg)
-
-        with self._xbee_lock:
-                self._toSend += msg
-        return True
+        return self.received_count
     
-    def send_simp_msg(self, msg):
-        with self._xbee_lock:
-                self._toSendSimp = msg
-        return True
+    def send_cmd(self, cmd):
+        print("Sending ", cmd)
+        #self.gui.variables["CMD Echo"].setStatus("Warn")
+        #self.gui.variables["CMD Echo Line"].setStatus("Warn")
+
+        self.last_sent_command = cmd
 
 class Graphic3d(GraphicsLayoutWidget): #widget to display a 3d STL file
     def __init__(self, file): #file: path to stl file in mesh/
@@ -265,8 +148,9 @@ class GraphWidget(GraphicsLayoutWidget): #widget to display up to 3 line graphs
         self.setBackground("w")
         self.plot = PlotWidget()
         self.plot.setBackground("w")
-        layout = QHBoxLayout()
+        layout = QVBoxLayout()
         layout.setContentsMargins(0,5,0,0)
+        layout.setSpacing(0)
         #self.setFixedHeight(200)
         self.setContentsMargins(5,10,20,40)
 
@@ -340,7 +224,41 @@ class GraphWidget(GraphicsLayoutWidget): #widget to display up to 3 line graphs
         self.p2.addItem(self.line2)
         self.p3.addItem(self.line3)
 
+        self.axes = [[self.p0.getAxis("left"), self.p1, self.line1], #[axis, view, line] for each of the 3 channels
+                     [self.p0.getAxis("right"), self.p2, self.line2],
+                     [self.ax3, self.p3, self.line3]]
+        self.channels = [None, None, None]
+
+        self.detail = 2000 #most points drawn per line, more than that are thinned by level_of_detail
+        self.t_offset = 0 #time that is 0 on the x axis, set by setDataSmart
+        self.redrawing = False
+
+        selector_bar = QWidget() #one drop down per axis to pick what is plotted on it
+        selector_layout = QHBoxLayout()
+        selector_layout.setContentsMargins(0,0,0,0)
+        self.selectors = []
+        for i in range(len(self.axes)):
+            selector = QComboBox()
+            selector.addItems(["None"] + self.GUI.store.channels)
+            selector.setStyleSheet("QComboBox{color: rgb" + str(self.line_colours[i]) + "; font-size: 11pt;}")
+            selector.currentTextChanged.connect(lambda channel, i=i: self.selectChannel(i, channel))
+            selector_layout.addWidget(selector)
+            self.selectors.append(selector)
+        selector_bar.setLayout(selector_layout)
+        for i in range(len(self.axes)): #start with every axis hidden
+            self.selectChannel(i, "None")
+
+        self.p0.vb.sigXRangeChanged.connect(self.viewChanged)
+
+        self.cursor = InfiniteLine(angle=90, movable=False, pen=mkPen((150, 150, 150), style=Qt.PenStyle.DashLine))
+        self.p0.addItem(self.cursor, ignoreBounds=True)
+        self.readout = QLabel("")
+        self.readout.setStyleSheet("QLabel{font-size: 11pt;}")
+        self.p0.scene().sigMouseMoved.connect(self.mouseMoved)
+
+        layout.addWidget(selector_bar)
         layout.addWidget(self.plot)
+        layout.addWidget(self.readout)
         self.setLayout(layout)
 
     def updateViews(self):
@@ -356,53 +274,30 @@ class GraphWidget(GraphicsLayoutWidget): #widget to display up to 3 line graphs
         self.p2.linkedViewChanged(self.p0.vb, self.p2.XAxis)
         self.p3.linkedViewChanged(self.p0.vb, self.p3.XAxis)
 
-    def setData(self, t, variable_1, variable_2, variable_3):
-
-        if t == []:
-            print("empty")
-            return
-
-        #self.p1.setXRange(-5,0,padding=0)
-        #self.p1.setRange(xRange=(-5, 5), disableAutoRange=False)
-        self.p0.getAxis("left").setLabel(self.genLabel(variable_1))
-        #print(variable_1.name.text())
-        self.line1.setData(t[-len(variable_1.history):], variable_1.history)
-
-        try:
-            if variable_2:
-                self.p0.getAxis("right").show()
-                self.p0.getAxis("right").setLabel(self.genLabel(variable_2))
-                self.p2.show()
-                self.line2.setData( [i[0] for i in self.variables[variable_2].history], [i[1] for i in self.variables[variable_2].history])
-            else:
-                self.p0.getAxis("right").hide()
-                self.p2.hide()
-        except:
-            print("error plotting line 2")
-            self.p0.getAxis("right").hide()
-            self.p2.hide()
-
-        try:
-            if variable_3:
-                self.ax3.show()
-                self.ax3.setLabel(self.genLabel(variable_3))
-                self.p3.show()
-                self.line3.setData(t[-len(variable_3.history):], variable_3.history)
-            else:
-                self.ax3.hide()
-                self.p3.hide()
-        except:
-            print("error plotting line 3")
-            self.ax3.hide()
-            self.p3.hide()
-
+    def setChannels(self, variable_1, variable_2, variable_3): #selects the channel plotted on each axis, None hides the axis
+        for selector, channel in zip(self.selectors, [variable_1, variable_2, variable_3]):
+            selector.setCurrentText(channel if channel else "None")
+
+    def selectChannel(self, axis_number, channel): #called when a channel selector changes, the new channel is drawn straight away
+        self.channels[axis_number] = None if channel == "None" else channel
+        axis, view, line = self.axes[axis_number]
+        if self.channels[axis_number]:
+            axis.show()
+            axis.setLabel(self.genLabel(self.channels[axis_number]))
+            view.show()
+        else:
+            axis.hide()
+            view.hide()
+            line.setData([], [])
+        if self.GUI.store.n > 0:
+            self.setDataSmart()
 
-    def setDataSmart(self, variable_1, variable_2, variable_3):
+    def setDataSmart(self): #plots the selected channels, only those channels are pulled out of the telemetry store
 
         if self.GUI.variables["State"].getData() == "LAUNCH_PAD": #All Data with t=0 at this instant ~ time.time()
-            if self.GUI.variables["Substate"].getData() == "DISARMED":
+            if self.GUI.variables["Substate"].getData() == "DISARMED": #everything still in memory, zoom out for more
                 max = 0
-                min = self.GUI.start_time - time.time()
+                min = self.GUI.start_time - time.time() if time.time() - self.GUI.start_time < RETENTION_SECONDS else -RETENTION_SECONDS
                 t_offset = time.time()
             else:
                 max = 0
@@ -410,6 +305,11 @@ class GraphWidget(GraphicsLayoutWidget): #widget to display up to 3 line graphs
                 t_offset = time.time()
 
 
+        elif self.GUI.launch_time == -1: #resumed after a launch that was before the reloaded window, drawn up to now like on the pad
+            max = 0
+            min = self.GUI.start_time - time.time() if time.time() - self.GUI.start_time < RETENTION_SECONDS else -RETENTION_SECONDS
+            t_offset = time.time()
+
         else: #10s before launch to now
             max = time.time() - self.GUI.launch_time
             min = -10
@@ -417,69 +317,149 @@ class GraphWidget(GraphicsLayoutWidget): #widget to display up to 3 line graphs
     
 
         self.autorange_line.setData([min, min+0.0000001, max], [0,1,1]) #this is an invisible line used to set the autoscale range of the graph
+        self.t_offset = t_offset
+
+        store = self.GUI.store
+        parts = [store]
+        if not self.p0.vb.state["autoRange"][0]: #zoomed by hand, only the visible part is drawn, paged in from the session log if the view goes back past whats in memory
+            min, max = self.p0.vb.viewRange()[0]
+            older = store.history(min + t_offset)
+            if older is not None: parts.insert(0, older)
+        windows = [part.window(min + t_offset, max + t_offset) for part in parts] #binary search, the arrays are never scanned
+        t = np.concatenate([part.times[first:last] for part, (first, last) in zip(parts, windows)]) - t_offset
+        for channel, (axis, view, line) in zip(self.channels, self.axes):
+            if not channel:
+                continue
+            try:
+                values = np.concatenate([part.channel(channel)[first:last] for part, (first, last) in zip(parts, windows)])
+                line.setData(*level_of_detail(t, values, self.detail), connect="finite")
+            except Exception as e:
+                print("ERROR : "+str(e))
+                print("error plotting " + channel)
+                axis.hide()
+                view.hide()
+
+    def viewChanged(self): #zoomed or panned by hand, redraws the newly visible part
+        if not self.p0.vb.state["autoRange"][0] and not self.redrawing and hasattr(self.GUI, "data"):
+            self.redrawing = True #setDataSmart can move the view itself
+            self.setDataSmart()
+            self.redrawing = False
+
+    def mouseMoved(self, position): #cursor read out of the selected channels
+        if not self.p0.sceneBoundingRect().contains(position):
+            return
+        x = self.p0.vb.mapSceneToView(position).x()
+        self.cursor.setPos(x)
+        values = self.GUI.store.value_at(x + self.t_offset)
+        text = "T" + ("+" if x >= 0 else "") + str(round(x, 1)) + "s"
+        for channel in self.channels:
+            if channel and channel in values:
+                text += "   " + channel.upper() + " " + str(round(values[channel], 2))
+        self.readout.setText(text)
+
+    def genLabel(self, channel):
+        if channel not in self.GUI.variables: #derived channel without a variable_line of its own
+            label = channel.upper()
+            if self.GUI.store.unit(channel) != "": label += " - " + self.GUI.store.unit(channel)
+            return label
+
+        variable = self.GUI.variables[channel]
+        label = variable.name.text()
+        if variable.unit.text() != "": label += " - " + variable.unit.text()
+        return label
 
+class GroundTrackWidget(QWidget): #GPS ground track on a local grid around the launch point, drawn in fixed size pieces so each fix only redraws the newest piece
+    CHUNK = 256 #points per piece
 
-        
+    def __init__(self, track):
+        super().__init__()
+        self.track = track
 
-        try:
-            if variable_1:
-                self.p0.getAxis("left").show()
-                self.p0.getAxis("left").setLabel(self.genLabel(self.GUI.variables[variable_1]))
-                self.p1.show()
-                self.line1.setData( [i[1] - t_offset for i in self.GUI.variables[variable_1].history], [i[0] for i in self.GUI.variables[variable_1].history], connect="finite")
-            else:
-                self.p0.getAxis("left").hide()
-                self.p1.hide()
-        except Exception as e:
-            print("ERROR : "+str(e))
-            print("error plotting line 1")
-            self.p0.getAxis("left").hide()
-            self.p1.hide()
+        self.plot = PlotWidget()
+        self.plot.setBackground("w")
+        self.plot.setAspectLocked(True)
+        self.plot.showGrid(x=True, y=True)
+        self.plot.setLabel("bottom", "EAST - m")
+        self.plot.setLabel("left", "NORTH - m")
+
+        self.pen = mkPen((0, 0, 255), width=2)
+        self.pieces = [] #finished pieces of the track, never redrawn unless the track is thinned
+        self.active = PlotCurveItem(pen=self.pen)
+        self.plot.addItem(self.active)
+        self.markers = ScatterPlotItem(size=12) #launch point, ground station, payload, landing estimate
+        self.plot.addItem(self.markers)
+        self.drawn = [0, 0] #[points, times thinned] of the track last drawn
+
+        self.info = QLabel("NO FIX")
+        self.info.setStyleSheet("QLabel{font-size: 12pt;}")
 
-        try:
-            if variable_2:
-                self.p0.getAxis("right").show()
-                self.p0.getAxis("right").setLabel(self.genLabel(self.GUI.variables[variable_2]))
-                self.p2.show()
-                self.line2.setData( [i[1] - t_offset for i in self.GUI.variables[variable_2].history], [i[0] for i in self.GUI.variables[variable_2].history], connect="finite")
-            else:
-                self.p0.getAxis("right").hide()
-                self.p2.hide()
-        except:
-            print("error plotting line 2")
-            self.p0.getAxis("right").hide()
-            self.p2.hide()
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0,0,0,0)
+        layout.setSpacing(0)
+        layout.addWidget(self.plot)
+        layout.addWidget(self.info)
+        self.setLayout(layout)
+        self.setFixedHeight(300)
 
-        try:
-            if variable_3:
-                self.ax3.show()
-                self.ax3.setLabel(self.genLabel(self.GUI.variables[variable_3]))
-                self.p3.show()
-                self.line3.setData( [i[1] - t_offset for i in self.GUI.variables[variable_3].history], [i[0] for i in self.GUI.variables[variable_3].history], connect="finite")
-            else:
-                self.ax3.hide()
-                self.p3.hide()
-        except:
-            print("error plotting line 3")
-            self.ax3.hide()
-            self.p3.hide()
-
-    def genLabel(self, variable):
-        label = variable.name.text()
-        if variable.unit.text() != "": label += " - " + variable.unit.text()
-        return label
+    def redraw(self): #call whenever, only draws if there are new fixes
+        track = self.track
+        if [track.n, track.thinned] == self.drawn:
+            return
+        if track.thinned != self.drawn[1]: #every point has moved
+            for piece in self.pieces:
+                self.plot.removeItem(piece)
+            self.pieces = []
+        self.drawn = [track.n, track.thinned]
+
+        x, y = track.track()
+        while (len(self.pieces) + 1) * self.CHUNK < track.n:
+            start = len(self.pieces) * self.CHUNK
+            piece = PlotCurveItem(x[start:start + self.CHUNK + 1].copy(), y[start:start + self.CHUNK + 1].copy(), pen=self.pen) #overlaps the next piece by a point so the line is unbroken
+            self.plot.addItem(piece)
+            self.pieces.append(piece)
+        start = len(self.pieces) * self.CHUNK
+        self.active.setData(x[start:], y[start:])
+
+        position = track.position()
+        landing = track.landing_estimate()
+        spots = [{"pos": (0, 0), "brush": (0, 180, 0), "symbol": "t"},
+                 {"pos": tuple(track.gcs), "brush": (0, 0, 0), "symbol": "s"}]
+        if position:
+            spots.append({"pos": (position[0], position[1]), "brush": (255, 0, 0), "symbol": "o"})
+        if landing:
+            spots.append({"pos": tuple(landing), "brush": (255, 140, 0), "symbol": "x"})
+        self.markers.setData(spots)
+
+        if position:
+            distance, heading = track.from_gcs(position[0], position[1])
+            text = "GCS " + str(round(distance)) + " m " + str(round(heading)).zfill(3) + "°  ALT " + str(round(position[2])) + " m"
+            if landing:
+                distance, heading = track.from_gcs(*landing)
+                text += "  LANDING " + str(round(distance)) + " m " + str(round(heading)).zfill(3) + "°"
+            self.info.setText(text)
+        else:
+            self.info.setText("NO FIX")
+
+def status_palettes(widget, status_colors): #builds one palette per status up front so setStatus only has to swap them
+    palettes = {}
+    for status in status_colors:
+        p = QPalette(widget.palette())
+        p.setColor(widget.backgroundRole(), status_colors[status])
+        palettes[status] = p
+    return palettes
 
 class variable_line(QWidget): #widget to display a single variable name, value, and unit
+    status_colors = {"OK":     QColor(255, 255, 255, 255),
+                     "Warn":   QColor(255, 255,   0, 255),
+                     "Error":  QColor(255,   0,   0, 255),
+                     "Off":    QColor(100, 100, 100, 255),
+                     }
+
     def __init__(self, name, unit, number_check):
         super().__init__()
 
-        self.status_colors = {"OK":     QColor(255, 255, 255, 255),
-                              "Warn":   QColor(255, 255,   0, 255),
-                              "Error":  QColor(255,   0,   0, 255),
-                              "Off":    QColor(100, 100, 100, 255),
-                              }
-        self.history = []
         self.number_check = number_check
+        self.limit_status = "OK" #status shown when the value is a number, set from the limit checker
 
 
         layout = QHBoxLayout()
@@ -491,7 +471,8 @@ class variable_line(QWidget): #widget to display a single variable name, value,
 
         layout.addStretch()
 
-        self.data = QLabel("NO DATA")
+        self._text = "NO DATA" #whats currently displayed, compared against so Qt is only called when something changes
+        self.data = QLabel(self._text)
         self.data.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight)
         layout.addWidget(self.data)
 
@@ -501,72 +482,84 @@ class variable_line(QWidget): #widget to display a single variable name, value,
         layout.addWidget(self.unit)
 
         self.setLayout(layout)
+        self._palettes = status_palettes(self, self.status_colors)
+        self._status = None
         self.setStatus("OK")
         self.setAutoFillBackground(True)
         self.setStyleSheet("QLabel{font-size: 14pt;}")
 
     def setStatus(self, status):
-        if status in self.status_colors:
-            color = self.status_colors[status]
-        else:
-            color = self.status_colors["Error"]
+        if status not in self.status_colors:
+            status = "Error"
+        if status != self._status:
+            self._status = status
+            self.setPalette(self._palettes[status])
 
-        p = self.palette()
-        p.setColor(self.backgroundRole(), color)
-        self.setPalette(p)
+    def setText(self, text): #changes the displayed value without checking it
+        if text != self._text:
+            self._text = text
+            self.data.setText(text)
 
     def setData(self, new_value):
-        self.data.setText(new_value)
+        self.setText(new_value)
 
         try:
-            self.history.append([float(new_value), time.time()])
-            self.setStatus("OK")
+            float(new_value)
+            self.setStatus(self.limit_status)
         except ValueError: 
-            self.history.append([np.nan, time.time()])
             if self.number_check:
                 self.setStatus("Warn")
 
     def getData(self):
-        return self.data.text()
+        return self._text
 
 class LargeLabel(QWidget): #widget to display a large string (used to display state)
+    status_colors = {"OK":     QColor(255, 255, 255, 255),
+                     "Warn":   QColor(255, 255,   0, 255),
+                     "Error":  QColor(255,   0,   0, 255),
+                     "Off":    QColor(100, 100, 100, 255),
+                     }
+
     def __init__(self, text):
         super().__init__()
 
-        self.status_colors = {"OK":     QColor(255, 255, 255, 255),
-                              "Warn":   QColor(255, 255,   0, 255),
-                              "Error":  QColor(255,   0,   0, 255),
-                              "Off":    QColor(100, 100, 100, 255),
-                              }
-
         layout = QVBoxLayout()
         layout.setContentsMargins(0,0,0,0)
         layout.setSpacing(0)
-        self.data = QLabel(text.upper())
+        self._text = text.upper()
+        self.data = QLabel(self._text)
         layout.addWidget(self.data)
         self.setLayout(layout)
 
+        self._palettes = status_palettes(self, self.status_colors)
+        self._status = None
         self.setStatus("OK")
         self.setAutoFillBackground(True)
         self.setStyleSheet("QLabel{font-size: 25pt;}")
 
     def setStatus(self, status):
-        if status in self.status_colors:
-            color = self.status_colors[status]
-        else:
-            color = self.status_colors["Error"]
-
-        p = self.palette()
-        p.setColor(self.backgroundRole(), color)
-        self.setPalette(p)
+        if status not in self.status_colors:
+            status = "Error"
+        if status != self._status:
+            self._status = status
+            self.setPalette(self._palettes[status])
 
     def setData(self, new_value):
-        self.data.setText(new_value)
+        if new_value != self._text:
+            self._text = new_value
+            self.data.setText(new_value)
 
     def getData(self):
-        return self.data.text()
+        return self._text
 
 class VariableWindow(QWidget): # combines multiple variable_lines into a vertical panel with a title and independent state
+    status_colors = {"OK":     QColor(200, 200, 200, 255),
+                     "Warn":   QColor(255, 255,   0, 255),
+                     "Error":  QColor(255,   0,   0, 255),
+                     "LOS":    QColor(255,   0,   0, 255),
+                     "Off":    QColor(100, 100, 100, 255),
+                     }
+
     def __init__(self, name, variable_widgets):
         super().__init__()
 
@@ -581,6 +574,8 @@ class VariableWindow(QWidget): # combines multiple variable_lines into a vertica
 
         self.banner = QWidget()
         self.banner.setAutoFillBackground(True)
+        self._palettes = status_palettes(self.banner, self.status_colors)
+        self._status = None
         self.setStatus("OK")
         banner_layout = QHBoxLayout()
         banner_layout.setContentsMargins(10,0,10,0)
@@ -593,6 +588,7 @@ class VariableWindow(QWidget): # combines multiple variable_lines into a vertica
         banner_layout.addWidget(self.name)
         banner_layout.addStretch()
 
+        self._state_text = ""
         self.state = QLabel("<b></b>")
         self.state.setAlignment(Qt.AlignmentFlag.AlignTop | Qt.AlignmentFlag.AlignRight)
         banner_layout.addWidget(self.state)
@@ -608,21 +604,16 @@ class VariableWindow(QWidget): # combines multiple variable_lines into a vertica
         self.setFixedWidth(300)
 
     def setStatus(self, status):
-        self.status_colors = {"OK":     QColor(200, 200, 200, 255),
-                              "Warn":   QColor(255, 255,   0, 255),
-                              "Error":  QColor(255,   0,   0, 255),
-                              "LOS":    QColor(255,   0,   0, 255),
-                              "Off":    QColor(100, 100, 100, 255),
-                              }
-        
-        if status in self.status_colors:
-            color = self.status_colors[status]
-        else:
-            color = self.status_colors["Error"]
+        if status not in self.status_colors:
+            status = "Error"
+        if status != self._status:
+            self._status = status
+            self.banner.setPalette(self._palettes[status])
 
-        p = self.banner.palette()
-        p.setColor(self.backgroundRole(), color)
-        self.banner.setPalette(p)
+    def setState(self, text): #text shown on the right of the banner
+        if text != self._state_text:
+            self._state_text = text
+            self.state.setText(text)
 
 class MainVariableWindow(QWidget): #like VariableWindow used to show crucial variables in a bigger font
     def __init__(self, variables):
@@ -698,10 +689,27 @@ class ButtonWindow(QWidget): #widget combines all buttons passed to it into a la
 
 # Subclass QMainWindow to customize GCS main window
 class MainWindow(QMainWindow): #This MainWindow is whats displayed 
-    def __init__(self):
+    def __init__(self, resume=False, memory=MEMORY_MONITOR): #resume: carry on from the most recent session log after a crash. memory: run the memory monitor
         super().__init__()
 
-        self.xbee_driver = XbeeDriver(self, XBEE_COM_PORT, 115200) #XbeeDriverSim(self)
+        resume_path = latest_session() if resume else None
+        if resume_path and not is_indexed(resume_path): #it would be appended to and then rotated away without being reloaded
+            print("Not resuming " + os.path.basename(resume_path) + ", it has no index, starting a new session")
+            resume_path = None
+        self.xbee_driver = XbeeDriverProcess(XBEE_COM_PORT, 115200, filename=os.path.basename(resume_path) if resume_path else None, memory=memory) #xbee.XbeeDriver(XBEE_COM_PORT, 115200) to run the driver in this process, XbeeDriverSim(self) for simulated data
+        self.monitor = MemoryMonitor(os.path.join(LOG_DIR, session_name(self.xbee_driver.filename) + ".memory.log")) if memory else None #started before anything else is allocated, memory use of this process, the acquisition process has its own
+        self.store = TelemetryStore(retention=RETENTION_SECONDS) #history of every numeric channel, used for the graphs
+        session_path = os.path.join(LOG_DIR, session_name(self.xbee_driver.filename) + ".csv")
+        self.store.pager = lambda start, stop: read_session_values(session_path, start, stop)
+        self.limits = LimitChecker() #limits.json
+        self.alarm_log = AlarmLog(os.path.join(LOG_DIR, session_name(self.xbee_driver.filename) + ".alarms.log"))
+        self.link = LinkStats() #packet loss and LOS threshold
+        self.ground_track = GroundTrack() #GPS track, distance from the GCS and landing estimate
+        self.gps_columns = [self.store.index["GPS Lat"], self.store.index["GPS Long"], self.store.index["GPS Altitude"]]
+        self.link_log = LinkLog(os.path.join(LOG_DIR, session_name(self.xbee_driver.filename) + ".link.log"))
+        self.scheduler = RenderScheduler() #how often the display is redrawn
+        self.comms_state = None #[comms window status, state text] from the latest packet, waiting to be drawn
+        self.new_data = False #a packet is waiting to be drawn
         self.launch_packet = -1
         self.last_msg_time = time.time()
         self.launch_time = time.time()
@@ -751,6 +759,17 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
                                 
                                 ["Packet Count", "", True],
                                 ["Received Count", "", True],
+                                ["Loss Rate", "", False], #link quality, units are part of the text
+                                ["Packet Rate", "", False],
+                                ["Longest Gap", "", False],
+                                ["Radio", "", False], #serial connection to the xbee
+                                ["Frame Time", "", False], #render scheduler
+                                ["Dropped Frames", "", False],
+                                ["Traced Memory", "", False], #memory monitor, only shown when its running
+                                ["Memory Growth", "", False],
+                                ["Objects/Packet", "", False],
+                                ["Store Size", "", False],
+                                ["Driver Memory", "", False],
                                 ["CMD Echo", "", False], # CMD echo is split over two lines otherwise long commands overflow the box, therefore CMD Echo is never written to with data, only CMD Echo Line is
                                 ["CMD Echo Line", "", False],
 
@@ -783,41 +802,32 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
         self.variables["Gimbal State"].name.setText("STATE")
         self.variables["Release Mechanism"].name.setText("MECHANISM")
 
-        self.variables["CMD Echo"].data.setText("")
+        self.variables["CMD Echo"].setText("")
         self.variables["CMD Echo Line"].name.setText("")
         #self.variables["CMD Echo line"].
-        self.variables["CMD Echo Line"].data.setText("-")
-
-
-        TEAM_ID = "3130"
-        self.button_names =    [["Arm",                 "CMD," + TEAM_ID + ",ARM,ON\n"],
-                                ["Disarm",              "CMD," + TEAM_ID + ",ARM,OFF\n"],
-                                ["CX ON",               "CMD," + TEAM_ID + ",CX,ON\n"],
-                                ["CX OFF",              "CMD," + TEAM_ID + ",CX,OFF\n"],
-                                ["Set Time\nUTC",       "CMD," + TEAM_ID + ",ST,<UTC TIME>\n"],
-                                ["Set Time\nGPS",       "CMD," + TEAM_ID + ",ST,GPS\n"],
-                                ["Calibrate\nAltitude", "CMD," + TEAM_ID + ",CAL\n"],
-                                ["Simulation\nDisable", "CMD," + TEAM_ID + ",SIM,DISABLE\n"],
-                                ["Simulation\nEnable",  "CMD," + TEAM_ID + ",SIM,ENABLE\n"],
-                                ["Simulation\nActivate","CMD," + TEAM_ID + ",SIM,ACTIVATE\n"],
-                                ["Probe\nUnlatch",      "CMD," + TEAM_ID + ",MEC,SEPERATION,ON\n"],
-                                ["Probe\nLatch",        "CMD," + TEAM_ID + ",MEC,SEPERATION,OFF\n"],
-                                ["Gimbal\nOn",          "CMD," + TEAM_ID + ",MEC,GIMBAL,ON\n"],
-                                ["Gimbal\nOff",         "CMD," + TEAM_ID + ",MEC,GIMBAL,OFF\n"],
-                                ["Clear\n Graph", "CLEAR GRAPH"]]
-        self.only_on_ground =   ["Arm", "CX OFF", "Set Time\nUTC", "Set Time\nGPS", "Calibrate\nAltitude", "Simulation\nEnable", "Simulation\nActivate"] #sets the list of buttons that are disabled during flight
+        self.variables["CMD Echo Line"].setText("-")
+
+
+        self.button_names = COMMANDS + [["Clear\n Graph", "CLEAR GRAPH"]] #commands.py
+        self.only_on_ground = ONLY_ON_GROUND #sets the list of buttons that are disabled during flight
         self.buttons = {}
         for i in self.button_names:
             self.buttons[i[0]] = TXButton(self, i)
 
-        self.buttons["Simulation\nActivate"].clicked.connect(self.xbee_driver.start_simp)
-        self.buttons["Simulation\nDisable"].clicked.connect(self.xbee_driver.stop_simp)
+        self.buttons[STARTS_SIMP].clicked.connect(self.xbee_driver.start_simp)
+        self.buttons[STOPS_SIMP].clicked.connect(self.xbee_driver.stop_simp)
         self.buttons["Clear\n Graph"].clicked.connect(self.clear_graph)
 
         #this next bit defines which varibles belong in each window
 
-        comms_data = [self.variables["Packet Count"],
+        comms_data = [self.variables["Radio"],
+                      self.variables["Packet Count"],
                       self.variables["Received Count"],
+                      self.variables["Loss Rate"],
+                      self.variables["Packet Rate"],
+                      self.variables["Longest Gap"],
+                      self.variables["Frame Time"],
+                      self.variables["Dropped Frames"],
                       self.variables["CMD Echo"],
                       self.variables["CMD Echo Line"]]
         self.comms_window = VariableWindow("Comms", comms_data)
@@ -900,6 +910,12 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
         variable_panel_2_layout.addWidget(power_window)
         variable_panel_2_layout.addWidget(gps_window)
         variable_panel_2_layout.addWidget(imu_window)
+        if self.monitor:
+            memory_data = [self.variables[name] for name in ["Traced Memory", "Memory Growth", "Objects/Packet", "Store Size", "Driver Memory"]]
+            for i in memory_data:
+                i.unit.setFixedWidth(0)
+            self.memory_window = VariableWindow("Memory", memory_data)
+            variable_panel_2_layout.addWidget(self.memory_window)
 
         #variable_panel_2_layout.addWidget(ButtonWindow())
         #variable_panel_2_layout.addStretch()
@@ -916,17 +932,27 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
         left_panel = QWidget()
         left_panel.setLayout(layout)
         left_panel.setFixedWidth(610)
+        self.left_panel = left_panel
 
         graph_panel = QWidget()
         graph_panel_layout = QVBoxLayout()
         graph_panel_layout.setContentsMargins(0,0,0,0)
 
+        top_graphs = QWidget()
+        top_graphs_layout = QHBoxLayout()
+        top_graphs_layout.setContentsMargins(0,0,0,0)
         self.graph3d = Graphic3d(MESH_FILE)
-        graph_panel_layout.addWidget(self.graph3d)
+        top_graphs_layout.addWidget(self.graph3d)
+        self.track_widget = GroundTrackWidget(self.ground_track)
+        top_graphs_layout.addWidget(self.track_widget)
+        top_graphs.setLayout(top_graphs_layout)
+        graph_panel_layout.addWidget(top_graphs)
         self.graph_1 = GraphWidget(self)
         graph_panel_layout.addWidget(self.graph_1)
         self.graph_2 = GraphWidget(self)
         graph_panel_layout.addWidget(self.graph_2)
+        self.graph_1.setChannels("Altitude", "Pressure", None) #what each graph shows at startup, can be changed from the drop downs above each graph
+        self.graph_2.setChannels("Temperature", None, None)
         graph_panel.setLayout(graph_panel_layout)
 
         big_layout.addWidget(left_panel)
@@ -952,8 +978,11 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
         timer = QTimer(self)
         timer.timeout.connect(self.update)
         timer.start(10)
+        self.on_ground = None
         self.c = 0
         self.start_time = -1
+        if resume_path:
+            self.resume(resume_path)
 
     def setStatus(self, status):
         if status in self.status_colors:
@@ -966,17 +995,184 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
         self.setPalette(p)
 
     def clear_graph(self):
-        for var in self.variables:
-            self.variables[var].history = []
+        self.store.clear()
+        self.ground_track.clear()
+        self.track_widget.redraw()
         self.start_time = time.time()
 
-    def update(self):
+    def resume(self, path): #rebuilds the graphs and display from the end of an indexed session log, the driver carries on writing to the same log
+        start = time.perf_counter()
+        times, msgs = load_session(path, self.store, RESUME_SECONDS)
+        if not msgs:
+            return
 
+        self.start_time = times[0]
+        self.last_msg_time = times[-1]
+        self.store.spilled = True #everything before the reloaded window is still in the log and can be paged in
+        on_pad = [i for i in range(len(msgs)) if msgs[i][4] == "LAUNCH_PAD"]
+        if on_pad:
+            self.launch_packet = int(msgs[on_pad[-1]][2])
+            self.launch_time = times[min(on_pad[-1] + 1, len(msgs) - 1)]
+        else: #launched before the reloaded window, when isnt known
+            self.launch_time = -1
+
+        for msg, values, t in zip(msgs, self.store.values[:self.store.n], times): #link statistics and alarm levels carry on from where they were, the alarms are already in the alarm log
+            self.link.packet(values[self.store.index["Packet Count"]], t)
+            self.limits.check(values, t, in_flight=msg[4] != "LAUNCH_PAD")
+        for field in NUMERIC_FIELDS:
+            if field in self.variables: self.variables[field].limit_status = self.limits.status(field)
+        self.variables["Altitude 2"].limit_status = self.limits.status("Altitude")
+        self.showLink()
+
+        self.ground_track.extend(*[self.store.channel(name) for name in ["GPS Lat", "GPS Long", "GPS Altitude"]], self.store.time())
+        self.track_widget.redraw()
+        self.data = msgs[-1]
+        self.showPacket(self.data)
+        print("Resumed " + os.path.basename(path) + " in " + str(round((time.perf_counter() - start) * 1000)) + "ms")
+
+    def showPacket(self, data): #displays every field of a packet, the packet must already be in the store
+        self.variables["Mission Time"].setData(data[1])
+        self.variables["Packet Count"].setData(data[2])
+        self.variables["Received Count"].setData(str(self.xbee_driver.get_recv_count()))
+        self.variables["Mode"].setData(data[3])
+        self.variables["State"].setData(data[4])
+        self.variables["Altitude"].setData(data[5])
+        self.variables["Altitude 2"].setData(data[5])
+        self.variables["Temperature"].setData(data[6])
+        self.variables["Pressure"].setData(data[7])
+        self.variables["Bus Voltage"].setData(data[8])
+
+        self.variables["GYRO R"].setData(data[9])
+        self.variables["GYRO P"].setData(data[10])
+        self.variables["GYRO Y"].setData(data[11])
+        self.variables["ACCEL R"].setData(data[12])
+        self.variables["ACCEL P"].setData(data[13])
+        self.variables["ACCEL Y"].setData(data[14])
+        self.variables["MAG R"].setData(data[15])
+        self.variables["MAG P"].setData(data[16])
+        self.variables["MAG Y"].setData(data[17])
+
+        self.variables["Autogyro Rate"].setData(data[18])
+
+        self.variables["GPS Time"].setData(data[19])
+        self.variables["GPS Altitude"].setData(data[20])
+        self.variables["GPS Lat"].setData(data[21])
+        self.variables["GPS Long"].setData(data[22])
+        self.variables["GPS Sats"].setData(data[23])
+
+        self.variables["CMD Echo Line"].setData(data[24])
+
+        self.variables["Substate"].setData(data[26])
+        #self.variables["Descent Rate"].setData(data[27])
+        self.variables["Main SOC"].setData(data[27])
+        self.variables["Bus Current"].setData(data[28])
+        self.variables["Bus Power"].setData(data[29])
+        self.variables["Release Mechanism"].setData(data[30])
+
+        descent_rate = self.store.latest("Descent Rate") #not in the packet, worked out from altitude
+        if np.isfinite(descent_rate):
+            self.variables["Descent Rate"].setData(str(round(descent_rate, 1)))
+
+    def showLink(self): #link quality lines in the comms window
+        self.variables["Loss Rate"].setText(str(round(self.link.loss_rate() * 100, 1)) + " %")
+        rate = self.link.packet_rate()
+        self.variables["Packet Rate"].setText(str(round(rate, 2)) + " Hz" if np.isfinite(rate) else "")
+        self.variables["Longest Gap"].setText(str(self.link.longest_burst()) + " pkts")
+        self.variables["Loss Rate"].setStatus("OK" if self.link.loss_rate() < 0.05 else "Warn")
+
+    def showConnection(self): #serial port the xbee is connected on, or how long until the next try
+        state, port, retry, rssi = self.xbee_driver.connection_status()
+        if state == "Connected":
+            self.variables["Radio"].setText(port + (" " + str(rssi) + "dBm" if rssi is not None else ""))
+            self.variables["Radio"].setStatus("OK")
+        elif state == "Reconnecting":
+            self.variables["Radio"].setText("RETRY " + str(round(retry, 1)) + "s")
+            self.variables["Radio"].setStatus("Error")
+        else:
+            self.variables["Radio"].setText(state.upper())
+            self.variables["Radio"].setStatus("Warn")
+
+    def showMemory(self): #memory monitor lines, after each snapshot
+        traced, growth, objects, over = self.monitor.summary()
+        self.variables["Traced Memory"].setText(size_text(traced))
+        self.variables["Memory Growth"].setText(size_text(growth) + "/pkt" if np.isfinite(growth) else "-")
+        self.variables["Memory Growth"].setStatus("Error" if over else "OK")
+        self.variables["Objects/Packet"].setText(str(round(objects, 1)) if np.isfinite(objects) else "-")
+        self.variables["Store Size"].setText(size_text(self.monitor.store_bytes) + " " + str(self.store.n) + " rows")
+        driver = self.xbee_driver.memory_status() #None until the acquisition process has taken its first snapshot
+        if driver:
+            traced, growth, objects, driver_over = driver
+            self.variables["Driver Memory"].setText(size_text(traced) + (" " + size_text(growth) + "/pkt" if np.isfinite(growth) else ""))
+            self.variables["Driver Memory"].setStatus("Error" if driver_over else "OK")
+            over = over or driver_over
+        self.memory_window.setStatus("Error" if over else "OK")
+        self.memory_window.setState("<b>OVER BUDGET<b>" if over else "")
+
+    def update(self): #called every 10ms, every packet waiting is processed but the display is only redrawn when a frame is due
         if self.start_time == -1: self.start_time = time.time() #time this session started
 
+        for recv_time, new_msg, rssi in self.xbee_driver.get_packets(): #everything received since the last tick, drawn together in the next frame
+            self.processPacket(new_msg, recv_time)
+        self.link_log.update(self.link)
+        if self.monitor and self.monitor.update(self.store):
+            self.showMemory()
+
+        if self.scheduler.due():
+            self.scheduler.start()
+            self.drawFrame()
+            self.scheduler.finish()
+
+    def processPacket(self, new_msg, recv_time): #everything done with a packet except displaying it
+        self.last_msg_time = recv_time
+        print(new_msg)
+        self.link.packet(packet_numbers(new_msg)[0], self.last_msg_time) #Packet Count is the first numeric field
+        if self.monitor: self.monitor.packet()
+
+        if len(new_msg) != 31: #expects 32 entries (blank after command included)
+            print("MALFORMED PACKET: expected 30 entries, got " + str(len(new_msg)+1))
+            print(new_msg)
+            self.comms_state = ["Warn", "MAL"]
+            return
+
+        if hasattr(self, "data") and self.data[4] == "LAUNCH_PAD": #keeps t0 in the future
+            self.launch_packet = int(new_msg[2])
+            self.launch_time = self.last_msg_time
+        self.data = new_msg
+        self.comms_state = ["OK", ""]
+        self.new_data = True
+
+        values = packet_numbers(self.data)
+        self.store.append(values, self.last_msg_time)
+        self.ground_track.add(*values[self.gps_columns], self.last_msg_time)
+        changes = self.limits.check(values, self.last_msg_time, in_flight=self.data[4] != "LAUNCH_PAD")
+        self.alarm_log.record(changes, self.last_msg_time)
+        self.setLimits(changes)
+
+    def setLimits(self, changes, show=False): #changes from the limit checker, show: redraw the statuses now rather than with the next packet
+        for field, level, rule, value in changes: #only fields whose status changed
+            lines = [self.variables[field]] + ([self.variables["Altitude 2"]] if field == "Altitude" else [])
+            for line in lines:
+                line.limit_status = LEVELS[level]
+                if show: line.setData(line.getData())
+
+    def drawFrame(self): #updates every widget from the latest packet, called at the render scheduler's frame rate
+        self.left_panel.setUpdatesEnabled(False) #repaint all the labels once for the whole frame
+
+        if self.comms_state: #packets since the last frame
+            self.comms_window.setStatus(self.comms_state[0])
+            self.comms_window.setState(self.comms_state[1])
+            self.comms_state = None
+            self.showLink()
+        if self.new_data:
+            self.new_data = False
+            self.showPacket(self.data)
+
         #disable buttons while flying
-        for i in self.only_on_ground:
-            self.buttons[i].setEnabled(self.variables["State"].getData() == "LAUNCH_PAD")
+        on_ground = self.variables["State"].getData() == "LAUNCH_PAD"
+        if on_ground != self.on_ground:
+            self.on_ground = on_ground
+            for i in self.only_on_ground:
+                self.buttons[i].setEnabled(on_ground)
 
         if self.variables["CMD Echo Line"].getData() == self.xbee_driver.last_sent_command:
             self.variables["CMD Echo"].setStatus("OK")
@@ -989,93 +1185,33 @@ class MainWindow(QMainWindow): #This MainWindow is whats displayed
             self.variables["CMD Echo"].setStatus("Warn")
             self.variables["CMD Echo Line"].setStatus("Warn")
 
+        changes = self.limits.tick() #stale and stuck fields, these matter most when no packets are arriving
+        self.alarm_log.record(changes)
+        self.setLimits(changes, show=True)
 
-        # LOS detector
-        if self.variables["State"] != "LAUNCH_PAD" or True: #remove True if sending packets less frequently to save battery before launch
-            if time.time() - self.last_msg_time > 1.20: #margin of 0.2s late
-                los_time = time.time() - self.last_msg_time
-                self.comms_window.setStatus("Error")
-                los_time_str = time.strftime("%M:%S", time.gmtime(los_time))
-                self.comms_window.state.setText("<b>LOS " + los_time_str + "<b>")
-
-
-
-        if self.xbee_driver.is_unread():
-            new_msg = self.xbee_driver.get_msg()
-            self.last_msg_time = time.time()
-            print(new_msg)
-
-            if len(new_msg) != 31: #expects 32 entries (blank after command included)
-                print("MALFORMED PACKET: expected 30 entries, got " + str(len(new_msg)+1))
-                print(new_msg)
-                self.comms_window.setStatus("Warn")
-                self.comms_window.state.setText("MAL")
-            else:
-                self.data = new_msg
-                self.comms_window.setStatus("OK")
-                self.comms_window.state.setText("")
-
-                if self.variables["State"].getData() == "LAUNCH_PAD": #keeps t0 in the future
-                    self.launch_packet = int(self.data[2])
-                    self.launch_time = time.time()
-
-                self.variables["Mission Time"].setData(self.data[1])
-                self.variables["Packet Count"].setData(self.data[2])
-                self.variables["Received Count"].setData(str(self.xbee_driver.get_recv_count()))
-                self.variables["Mode"].setData(self.data[3])
-                self.variables["State"].setData(self.data[4])
-                self.variables["Altitude"].setData(self.data[5])
-                self.variables["Altitude 2"].setData(self.data[5])
-                self.variables["Temperature"].setData(self.data[6])
-                self.variables["Pressure"].setData(self.data[7])
-                self.variables["Bus Voltage"].setData(self.data[8])
-
-                self.variables["GYRO R"].setData(self.data[9])
-                self.variables["GYRO P"].setData(self.data[10])
-                self.variables["GYRO Y"].setData(self.data[11])
-                self.variables["ACCEL R"].setData(self.data[12])
-                self.variables["ACCEL P"].setData(self.data[13])
-                self.variables["ACCEL Y"].setData(self.data[14])
-                self.variables["MAG R"].setData(self.data[15])
-                self.variables["MAG P"].setData(self.data[16])
-                self.variables["MAG Y"].setData(self.data[17])
-
-                self.variables["Autogyro Rate"].setData(self.data[18])
-
-                self.variables["GPS Time"].setData(self.data[19])
-                self.variables["GPS Altitude"].setData(self.data[20])
-                self.variables["GPS Lat"].setData(self.data[21])
-                self.variables["GPS Long"].setData(self.data[22])
-                self.variables["GPS Sats"].setData(self.data[23])
-                                                
-                self.variables["CMD Echo Line"].setData(self.data[24])
-
-                self.variables["Substate"].setData(self.data[26])
-                #self.variables["Descent Rate"].setData(self.data[27])
-                self.variables["Main SOC"].setData(self.data[27])
-                self.variables["Bus Current"].setData(self.data[28])
-                self.variables["Bus Power"].setData(self.data[29])
-                self.variables["Release Mechanism"].setData(self.data[30])
-            
-
-
-
+        # LOS detector, the threshold follows the measured packet rate so sending less often on the pad doesnt show LOS
+        if self.link.los():
+            los_time = time.time() - self.last_msg_time
+            self.comms_window.setStatus("Error")
+            los_time_str = time.strftime("%M:%S", time.gmtime(los_time))
+            self.comms_window.setState("<b>LOS " + los_time_str + "<b>")
 
+        self.showConnection()
+        fps, frame_time, max_frame_time, frames, dropped = self.scheduler.stats()
+        self.variables["Frame Time"].setText(str(round(frame_time * 1000, 1)) + " ms " + str(fps) + " fps")
+        self.variables["Dropped Frames"].setText(str(dropped))
+        self.left_panel.setUpdatesEnabled(True)
 
         if hasattr(self, 'data'): #update graphs
-            t = [i for i in range(int(self.data[2])-self.launch_packet-len(self.variables["Altitude"].history), int(self.data[2])-self.launch_packet)]
-            #self.graph_1.setData(t, self.variables["Altitude"], self.variables["Pressure"], None)
-            self.graph_1.setDataSmart("Altitude", "Pressure", None)
-            #self.graph_1.setDataSmart("GYRO R", "GYRO P", "GYRO Y")
-            #self.graph_1.setDataSmart(None, "Pressure", None)
-            #self.graph_2.setDataSmart("Autogyro Rate", "Descent Rate", "Temperature")
-            self.graph_2.setDataSmart("Temperature", None, None)
-            #self.graph_2.setDataSmart("ACCEL R", "ACCEL P", "ACCEL Y")
+            for graph in [self.graph_1, self.graph_2]:
+                graph.detail = self.scheduler.detail()
+                graph.setDataSmart()
+            self.track_widget.redraw()
 
 if __name__ == "__main__":
     print("### CANSAT Ground Station ###")
     app = QApplication([])
-    window = MainWindow()
+    window = MainWindow(resume="--resume" in sys.argv, memory=MEMORY_MONITOR or "--memory" in sys.argv)
     window.show()
     app.exec()
 
@@ -0,0 +1,137 @@
+# Memory monitor for long sessions, opt in (python main.py --memory, python headless.py --memory) because tracemalloc slows every allocation
+
+import os, sys, gc, time, tracemalloc
+import numpy as np
+
+SNAPSHOT_PERIOD = 60 #s between snapshots
+TOP_SITES = 10 #allocation sites that changed most written to the log each snapshot
+GROWTH_BUDGET = 2048 #bytes memory may grow per packet outside the telemetry store, 2KB a packet at 1Hz is 86MB over 12 hours
+MIN_PACKETS = 100 #packets since start up before growth per packet is judged, a single buffer being reallocated swamps fewer
+TRACE_FRAMES = 1 #stack frames kept per allocation, more shows the callers but costs more memory and time
+
+_IGNORE = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"), tracemalloc.Filter(False, "<unknown>")]
+
+
+def memory_mb(): #current resident memory (RSS) of this process, from psutil if it is installed, otherwise asked of the OS directly
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [(name, ctypes.c_size_t) for name in
+                       ["PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage", "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage"]]
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+        if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return float("nan")
+        return counters.WorkingSetSize / (1024 * 1024)
+    try:
+        with open("/proc/self/statm") as file: #linux, sizes in pages, the second is resident
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        pass
+    import resource #mac, only the peak is available without psutil
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024 #bytes on mac, KiB elsewhere
+
+def size_text(size): #bytes as text, "12.3KB"
+    for unit in ["B", "KB", "MB"]:
+        if abs(size) < 1024:
+            return str(round(size, 1)) + unit
+        size /= 1024
+    return str(round(size, 1)) + "GB"
+
+
+class MemoryMonitor(): #every period a tracemalloc snapshot is diffed against the last by allocating line and written to logs/<session>.memory.log, with the telemetry store's size
+    #and how much memory grew a packet outside the store (which its retention window bounds), growth over budget a packet is warned about
+    def __init__(self, path, period=SNAPSHOT_PERIOD, budget=GROWTH_BUDGET): #path: report file, appended to
+        self.path = path
+        self.period = period
+        self.budget = budget
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACE_FRAMES)
+
+        self.packets = 0 #packets processed
+        self.traced = 0 #bytes traced at the last snapshot
+        self.store_bytes = 0 #bytes of that in the telemetry store
+        self.growth = np.nan #bytes a packet memory grew by outside the store between the last two snapshots
+        self.trend = np.nan #same since the first snapshot (the end of start up), what the budget is checked against
+        self.objects_per_packet = np.nan #Python objects (that the garbage collector tracks) left over per packet since the first snapshot
+        self.over_budget = False
+        self.snapshots = 0
+
+        self.last_time = time.time()
+        self._packets = 0
+        self._outside = tracemalloc.get_traced_memory()[0]
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+        self._baseline = None #[packets, bytes outside the store, objects] at the first snapshot
+
+    def packet(self, count=1): #call for every packet processed
+        self.packets += count
+
+    def update(self, store=None, t=None): #takes a snapshot if one is due, returns True if it did. store: TelemetryStore to report
+        if t is None: t = time.time()
+        if t - self.last_time < self.period:
+            return False
+        self.snapshot(store, t)
+        return True
+
+    def snapshot(self, store=None, t=None):
+        if t is None: t = time.time()
+        sizes = store.nbytes() if store is not None else {}
+        snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORE)
+        traced, peak = tracemalloc.get_traced_memory()
+        objects = len(gc.get_objects())
+
+        packets = self.packets - self._packets
+        outside = traced - sum(sizes.values())
+        self.growth = (outside - self._outside) / packets if packets > 0 else np.nan
+        if self._baseline is None: #the first interval is start up, not packets
+            self._baseline = [self.packets, outside, objects]
+        since = self.packets - self._baseline[0]
+        if since > 0:
+            self.trend = (outside - self._baseline[1]) / since
+            self.objects_per_packet = (objects - self._baseline[2]) / since
+        self.over_budget = since >= MIN_PACKETS and self.trend > self.budget
+        self.traced = traced
+        self.store_bytes = sum(sizes.values())
+        sites = snapshot.compare_to(self._snapshot, "lineno")[:TOP_SITES] #biggest change first
+
+        line = (time.strftime("%H:%M:%S", time.localtime(t)) + " packets " + str(self.packets) + ", traced " + size_text(traced) + " (peak " + size_text(peak) +
+                ", store " + size_text(self.store_bytes) + "), rss " + str(round(memory_mb(), 1)) + "MB, " +
+                (size_text(self.growth) + "/packet outside the store" if packets > 0 else "no packets") +
+                (", since start up " + size_text(self.trend) + "/packet " + str(round(self.objects_per_packet, 1)) + " objects/packet" if since > 0 else "") +
+                (" (start up)" if self.snapshots == 0 else "") + (", OVER BUDGET (" + size_text(self.budget) + "/packet)" if self.over_budget else ""))
+        with open(self.path, "a") as file:
+            file.write(line + "\n")
+            if store is not None:
+                file.write("  store " + str(store.n) + "/" + str(len(store.times)) + " rows: " + ", ".join(name + " " + size_text(size) for name, size in sizes.items()) + "\n")
+            for stat in sites:
+                frame = stat.traceback[0]
+                file.write("  " + ("+" if stat.size_diff >= 0 else "") + size_text(stat.size_diff) + " (" + ("+" if stat.count_diff >= 0 else "") + str(stat.count_diff) + " blocks, " +
+                           size_text(stat.size) + " total) " + frame.filename + ":" + str(frame.lineno) + "\n")
+        if self.over_budget:
+            top = sites[0].traceback[0] if sites else None
+            print("memory: growing " + size_text(self.trend) + " a packet, over the " + size_text(self.budget) + " budget" +
+                  (", most from " + top.filename + ":" + str(top.lineno) if top else ""))
+
+        self.snapshots += 1
+        self.last_time = t
+        self._packets = self.packets
+        self._outside = outside
+        self._snapshot = snapshot
+
+    def summary(self): #[bytes traced, bytes a packet grown outside the store since start up, objects per packet, over budget] as of the last snapshot, None before the first
+        if self.snapshots == 0:
+            return None
+        return [self.traced, self.trend, self.objects_per_packet, self.over_budget]
+
+    def close(self):
+        tracemalloc.stop()
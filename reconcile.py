@@ -0,0 +1,207 @@
+# Reconciles the payload's SD card log with the radio session logs of the same flight into one dataset, python reconcile.py <sd log> <session logs> [-o output.csv]
+
+import os, sys, csv
+import numpy as np
+
+from telemetry import split_packet, packet_numbers, mission_seconds, PACKET_FIELDS, PACKET_LENGTH, FIELD_INDEX, NUMERIC_FIELDS
+from session_log import read_session_tail, session_name, is_indexed
+
+TOLERANCE = {"Altitude": 1.0, "Temperature": 0.5, "Pressure": 0.2, "Bus Voltage": 0.1, "GPS Lat": 1e-4, "GPS Long": 1e-4} #smallest difference between the SD log and the radio that is flagged, on top of how much the field changed in that second
+DEFAULT_TOLERANCE = 0.5 #for fields not in TOLERANCE
+MATCH_FIELDS = ["Pressure", "Temperature"] #fields that must agree for a run of the SD log and a run of the radio logs to be the same run
+MIN_MATCHED = 30 #radio packets that must agree with the SD log before two runs are paired
+CLOCK_JUMP = 300 #s, mission time jumping forward more than this is the time being set (ST command) rather than a gap
+
+COLUMNS = ["Run", "Source", "Session", "Received", "Gap Before", "Packets Lost Before", "Disagrees"] + [field[0] for field in PACKET_FIELDS if field[0] != ""]
+FIELD_COLUMNS = [i for i, field in enumerate(PACKET_FIELDS) if field[0] != ""] #split packet indexes written out, the blank entry after the echo isnt
+COUNT = NUMERIC_FIELDS.index("Packet Count")
+
+
+class Records(): #packets from one source as arrays, a row per packet
+    def __init__(self, msgs, recv, sessions):
+        self.msgs = msgs
+        self.values = np.array([packet_numbers(msg) for msg in msgs]).reshape(len(msgs), len(NUMERIC_FIELDS))
+        self.mission = np.array([mission_seconds(msg[FIELD_INDEX["Mission Time"]]) for msg in msgs])
+        self.recv = np.asarray(recv, dtype=float)
+        self.sessions = np.asarray(sessions)
+        self.run = np.zeros(len(msgs), dtype=int)
+
+    def keep(self, rows): #drops every row not in rows (a bool mask or indexes)
+        rows = np.flatnonzero(rows) if np.asarray(rows).dtype == bool else np.asarray(rows)
+        self.msgs = [self.msgs[i] for i in rows]
+        self.values, self.mission, self.recv, self.sessions, self.run = self.values[rows], self.mission[rows], self.recv[rows], self.sessions[rows], self.run[rows]
+
+    def find_runs(self, key, jump=np.inf, count=False): #a new run starts wherever key goes backwards (the payload restarted) or forward more than jump, and if count wherever Packet Count goes backwards (restarted or wrapped)
+        step = np.diff(key)
+        new = (step < 0) | (step > jump)
+        if count:
+            new |= np.diff(self.values[:, COUNT]) < 0
+        self.run = np.concatenate([[0], np.cumsum(new)]).astype(int) if len(key) else np.zeros(0, dtype=int)
+
+    def spans(self): #[first mission time, last mission time, run] of every run, sorted on the first
+        if len(self.run) == 0:
+            return []
+        starts = np.flatnonzero(np.diff(self.run, prepend=-1)) #runs are numbered in order so each is one block of rows
+        first, last = np.minimum.reduceat(self.mission, starts), np.maximum.reduceat(self.mission, starts)
+        return sorted(zip(first, last, self.run[starts]))
+
+
+def read_sd_log(path): #Records of an SD card log, lines that arent whole packets or have no mission time are skipped
+    msgs = []
+    with open(path, "rb") as file:
+        for line in file:
+            try:
+                msg = split_packet(line.decode(errors="replace").strip("\r\n"))
+            except ValueError:
+                continue
+            if len(msg) == PACKET_LENGTH:
+                msgs.append(msg)
+    sd = Records(msgs, np.full(len(msgs), np.nan), [os.path.basename(path)] * len(msgs))
+    sd.keep(np.isfinite(sd.mission))
+    sd.find_runs(sd.mission, CLOCK_JUMP, count=bool(np.any(sd.values[:, COUNT] > 0))) #main board SD logs dont record the packet count
+    return sd
+
+def read_radio_logs(paths): #Records of every packet in radio session logs (oldest first), across segments
+    times, msgs, sessions = [], [], []
+    for path in paths:
+        session_times, session_msgs = read_session_tail(path, None)
+        times.append(session_times if is_indexed(path) else np.full(len(session_msgs), np.nan)) #logs from before indexes have no receive times
+        msgs += session_msgs
+        sessions += [session_name(path)] * len(session_msgs)
+    radio = Records(msgs, np.concatenate(times) if times else np.empty(0), sessions)
+    radio.keep(np.isfinite(radio.mission) & np.isfinite(radio.values[:, COUNT]))
+    radio.find_runs(radio.values[:, COUNT]) #mission time can be corrupted in transit, packet count is checked more by the line splitting
+    return radio
+
+
+def _keys(records, rows, by_count): #join key of each row, Packet Count or the whole second of Mission Time
+    return records.values[rows, COUNT] if by_count else np.floor(records.mission[rows])
+
+def _tolerances(sd, rows): #per row and field difference allowed from the SD log, the field's change to the neighbouring SD rows plus TOLERANCE
+    values = sd.values[rows]
+    change = np.nan_to_num(np.abs(np.diff(values, axis=0)))
+    local = np.maximum(np.vstack([change[:1] * 0, change]), np.vstack([change, change[:1] * 0])) if len(values) > 1 else np.zeros(values.shape)
+    return local + np.array([TOLERANCE.get(name, DEFAULT_TOLERANCE) for name in NUMERIC_FIELDS])
+
+def match(sd, sd_rows, radio, radio_rows): #joins a run of each, returns (SD row of each radio packet or -1, bool array of disagreeing fields per radio packet, by_count)
+    by_count = len(sd_rows) == 0 or bool(np.any(sd.values[sd_rows, COUNT] > 0)) #main board SD logs dont record the packet count, a radio run on its own is kept in packet order
+    sd_keys = _keys(sd, sd_rows, by_count)
+    order = np.argsort(sd_keys, kind="stable")
+    sorted_keys, first = np.unique(sd_keys[order], return_index=True) #a key logged twice is matched to its first row
+    sorted_rows = sd_rows[order][first]
+
+    radio_keys = _keys(radio, radio_rows, by_count)
+    pos = np.minimum(np.searchsorted(sorted_keys, radio_keys), max(len(sorted_keys) - 1, 0))
+    found = sorted_keys[pos] == radio_keys if len(sorted_keys) else np.zeros(len(radio_rows), dtype=bool)
+    sd_row = np.where(found, sorted_rows[pos] if len(sorted_rows) else -1, -1)
+
+    tolerance = _tolerances(sd, sorted_rows)[pos] if len(sorted_rows) else np.zeros((len(radio_rows), len(NUMERIC_FIELDS)))
+    with np.errstate(invalid="ignore"):
+        bad = np.abs(radio.values[radio_rows] - sd.values[np.maximum(sd_row, 0)]) > tolerance #nan (a field that isnt a number in either) never disagrees
+    bad &= found[:, None]
+    if not by_count:
+        bad[:, COUNT] = False
+    return sd_row, bad, by_count
+
+def overlapping(a, b): #[[run of a, run of b]] for every pair of spans (see Records.spans) that overlap in mission time, one pass over both
+    pairs, active_a, active_b = [], [], []
+    i = j = 0
+    while i < len(a) or j < len(b):
+        if j == len(b) or (i < len(a) and a[i][0] <= b[j][0]):
+            start, end, run = a[i]
+            i += 1
+            active_b = [span for span in active_b if span[1] >= start] #spans that ended before this one started cant overlap anything later either
+            pairs += [[run, span[2]] for span in active_b]
+            active_a.append([start, end, run])
+        else:
+            start, end, run = b[j]
+            j += 1
+            active_a = [span for span in active_a if span[1] >= start]
+            pairs += [[span[2], run] for span in active_a]
+            active_b.append([start, end, run])
+    return pairs
+
+def pair_runs(sd, radio): #[[sd run or None, radio run or None]] pairing runs of the SD log with runs of the radio logs that agree most, each run used once
+    scores = []
+    match_cols = [NUMERIC_FIELDS.index(name) for name in MATCH_FIELDS]
+    for s, r in overlapping(sd.spans(), radio.spans()): #runs that dont overlap in mission time cant be the same run
+        sd_row, bad, by_count = match(sd, np.flatnonzero(sd.run == s), radio, np.flatnonzero(radio.run == r))
+        score = int(np.sum((sd_row >= 0) & ~np.any(bad[:, match_cols], axis=1)))
+        if score >= MIN_MATCHED:
+            scores.append([score, s, r])
+    pairs, used_sd, used_radio = [], set(), set()
+    for score, s, r in sorted(scores, reverse=True):
+        if s not in used_sd and r not in used_radio:
+            pairs.append([s, r])
+            used_sd.add(s)
+            used_radio.add(r)
+    pairs += [[s, None] for s in np.unique(sd.run) if s not in used_sd]
+    pairs += [[None, r] for r in np.unique(radio.run) if r not in used_radio]
+    return sorted(pairs, key=lambda pair: (pair[0] is None, pair[0] if pair[0] is not None else pair[1]))
+
+
+def reconcile(sd, radio): #merges the two into one list of output rows (see COLUMNS) and a summary line per run
+    #the SD log has every second the payload was on, the radio logs have receive times but drop out. seconds the radio missed are filled in from the SD log
+    #and radio packets that dont agree with it (corrupted in transit) are flagged
+    rows, summary = [], []
+    for run, (s, r) in enumerate(pair_runs(sd, radio)):
+        sd_rows = np.flatnonzero(sd.run == s) if s is not None else np.zeros(0, dtype=int)
+        radio_rows = np.flatnonzero(radio.run == r) if r is not None else np.zeros(0, dtype=int)
+        sd_row, bad, by_count = match(sd, sd_rows, radio, radio_rows)
+
+        fill = sd_rows[~np.isin(_keys(sd, sd_rows, by_count), _keys(radio, radio_rows, by_count))] #seconds (or packets) the radio never received
+
+        source = np.array(["radio+sd" if row >= 0 else "radio" for row in sd_row] + ["sd"] * len(fill))
+        keys = np.concatenate([_keys(radio, radio_rows, by_count), _keys(sd, fill, by_count)])
+        mission = np.concatenate([radio.mission[radio_rows], sd.mission[fill]])
+        counts = np.concatenate([radio.values[radio_rows, COUNT], np.full(len(fill), np.nan)])
+        order = np.lexsort((np.arange(len(keys)), keys)) #radio packets keep the order they were received in within a key
+
+        seconds = np.floor(mission[order])
+        step = np.diff(seconds)
+        gap = np.concatenate([[0], np.where(step > CLOCK_JUMP, 0, np.maximum(step - 1, 0))]) if len(order) else np.zeros(0) #whole seconds missing from both
+        radio_counts = counts[order]
+        lost = np.zeros(len(order)) #packets the radio missed that the SD log didnt fill either
+        is_radio = np.isfinite(radio_counts)
+        if np.sum(is_radio) > 1:
+            lost[np.flatnonzero(is_radio)[1:]] = np.maximum(np.diff(radio_counts[is_radio]) - 1, 0)
+
+        disagrees = [";".join(NUMERIC_FIELDS[j] for j in np.flatnonzero(b)) for b in bad]
+        for out, i in enumerate(order):
+            if i < len(radio_rows):
+                msg, session, recv, note = radio.msgs[radio_rows[i]], radio.sessions[radio_rows[i]], radio.recv[radio_rows[i]], disagrees[i]
+            else:
+                row = fill[i - len(radio_rows)]
+                msg, session, recv, note = sd.msgs[row], sd.sessions[row], np.nan, ""
+            rows.append([run, source[i], session, "" if np.isnan(recv) else repr(float(recv)), int(gap[out]), int(lost[out]), note] + [msg[j] for j in FIELD_COLUMNS])
+
+        flagged = np.sum(bad, axis=0)
+        worst = ", ".join(NUMERIC_FIELDS[j] + " " + str(flagged[j]) for j in np.argsort(-flagged)[:3] if flagged[j] > 0)
+        summary.append("run " + str(run) + ": " + str(len(radio_rows)) + " radio packets, " + str(len(sd_rows)) + " SD rows" +
+                       (" joined on " + ("packet count" if by_count else "mission time") if s is not None and r is not None else " (no matching " + ("radio" if r is None else "SD") + " run)") +
+                       ", " + str(int(np.sum(sd_row >= 0))) + " matched, " + str(len(fill)) + " filled from SD, " + str(int(np.sum(gap))) + "s still missing" +
+                       ", " + str(int(np.sum(np.any(bad, axis=1)))) + " packets disagree" + (" (" + worst + ")" if worst else ""))
+    return rows, summary
+
+def write_reconciled(path, rows):
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(COLUMNS)
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if len(args) < 2:
+        print("python reconcile.py <sd log> <radio session log> [more session logs, oldest first] [-o output.csv]")
+        sys.exit(1)
+    output = os.path.splitext(args[0])[0] + "_reconciled.csv"
+    if "-o" in args:
+        output = args[args.index("-o") + 1]
+        del args[args.index("-o"):args.index("-o") + 2]
+    sd = read_sd_log(args[0])
+    radio = read_radio_logs(args[1:])
+    rows, summary = reconcile(sd, radio)
+    write_reconciled(output, rows)
+    print("\n".join(summary))
+    print("reconcile: wrote " + str(len(rows)) + " rows to " + output)
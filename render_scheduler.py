@@ -0,0 +1,68 @@
+# Frame rate governor for the GUI, lowers graph detail and then the frame rate when frames take too long so packets always keep up
+
+import time
+
+TARGET_FPS = 30
+MIN_FPS = 5
+BUDGET = 0.5 #fraction of the frame period drawing may take, over this the display is degraded
+RECOVER = 0.2 #under this fraction it is brought back up
+ADAPT_PERIOD = 1.0 #s between changes of frame rate or detail so one slow frame doesnt cause a change
+DETAIL_LEVELS = [2000, 1000, 500, 250] #most points drawn per graph line, highest first
+SMOOTHING = 0.1 #weight of the newest frame in the average frame time
+
+
+class RenderScheduler():
+    def __init__(self, target_fps=TARGET_FPS):
+        self.target_fps = target_fps
+        self.fps = target_fps #current frame rate, lowered when frames overrun
+        self.level = 0 #index into DETAIL_LEVELS
+        self.next_frame = 0 #time.perf_counter() the next frame is due
+        self.last_adapt = 0
+
+        self.frames = 0 #frames drawn
+        self.dropped = 0 #frame slots missed because a frame or packet processing ran late
+        self.frame_time = 0.0 #s, average time taken to draw a frame
+        self.max_frame_time = 0.0 #s, longest frame so far
+
+    def due(self): #True if its time to draw a frame
+        return time.perf_counter() >= self.next_frame
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    def finish(self): #call after drawing the frame
+        now = time.perf_counter()
+        cost = now - self._start
+        self.frames += 1
+        self.frame_time = cost if self.frames == 1 else (1 - SMOOTHING) * self.frame_time + SMOOTHING * cost
+        self.max_frame_time = max(self.max_frame_time, cost)
+
+        period = 1 / self.fps
+        if self.next_frame > 0:
+            self.dropped += max(int((now - self.next_frame) / period), 0) #whole frame periods late
+        self.next_frame = max(self.next_frame + period, now) #keeps to the frame rate without trying to catch up on missed frames
+
+        if now - self.last_adapt >= ADAPT_PERIOD:
+            self.adapt(period)
+            self.last_adapt = now
+
+    def adapt(self, period): #lowers detail then frame rate while frames overrun, raises frame rate then detail once they are cheap again
+        if self.frame_time > BUDGET * period:
+            if self.level < len(DETAIL_LEVELS) - 1:
+                self.level += 1
+            elif self.fps > MIN_FPS:
+                self.fps = max(MIN_FPS, round(self.fps * 0.75))
+            else:
+                return
+            print("render: frames taking " + str(round(self.frame_time * 1000, 1)) + "ms, now " + str(self.fps) + "fps " + str(self.detail()) + " points")
+        elif self.frame_time < RECOVER * period:
+            if self.fps < self.target_fps:
+                self.fps = min(self.target_fps, round(self.fps / 0.75))
+            elif self.level > 0:
+                self.level -= 1
+
+    def detail(self): #most points per graph line at the current detail level
+        return DETAIL_LEVELS[self.level]
+
+    def stats(self): #[fps, average frame time s, max frame time s, frames, dropped frames]
+        return [self.fps, self.frame_time, self.max_frame_time, self.frames, self.dropped]
@@ -0,0 +1,191 @@
+# Serial connection to the xbee that finds the port itself and reconnects with backoff when the USB adapter drops out
+
+import time, threading
+import serial
+import serial.tools.list_ports
+
+from telemetry import TEAM_ID, split_packet, PACKET_LENGTH
+
+PROBE_SECONDS = 2.5 #s each port is listened to for telemetry (packets are 1Hz)
+AT_PROBE = True #if no telemetry is heard ask the port for xbee command mode (+++ answered with OK), so the xbee is found before the payload is sending
+GUARD_TIME = 1.1 #s of silence needed either side of +++, the xbee's GT is 1s by default
+BACKOFF_START = 0.25 #s before the first reconnect attempt
+BACKOFF_MAX = 5.0 #s, kept short so a brown out during the flight loses as little as possible
+RETRIES_BEFORE_SCAN = 4 #after losing a port only it is retried this many times before other ports are probed, probing takes PROBE_SECONDS a port
+USB_SERIAL_VIDS = [0x0403, 0x10C4, 0x1A86, 0x067B] #FTDI (xbee explorers), Silicon Labs CP210x, CH340, Prolific, tried before other ports
+
+
+def is_telemetry(line): #True if a line of text is a telemetry packet from our payload
+    if not line.startswith(TEAM_ID + ","):
+        return False
+    try:
+        return len(split_packet(line)) == PACKET_LENGTH
+    except ValueError:
+        return False
+
+def candidate_ports(preferred=None): #serial ports the xbee might be on, most likely first
+    ports = sorted(serial.tools.list_ports.comports(), key=lambda p: (p.vid not in USB_SERIAL_VIDS, p.device))
+    names = [p.device for p in ports]
+    if preferred:
+        names = [preferred] + [name for name in names if name != preferred]
+    return names
+
+def is_xbee(ser): #True if the port answers +++ with OK like an xbee entering command mode, which it is then taken back out of
+    ser.reset_input_buffer()
+    time.sleep(GUARD_TIME)
+    if ser.in_waiting: #not quiet enough for the xbee to take +++ as a command
+        return False
+    ser.write(b"+++")
+    reply = b""
+    end = time.time() + GUARD_TIME + 1
+    while time.time() < end and b"OK\r" not in reply:
+        reply += ser.read(ser.in_waiting or 1)
+    if b"OK\r" not in reply:
+        return False
+    ser.write(b"ATCN\r")
+    ser.read(3) #its OK
+    return True
+
+def probe(port, BAUD, seconds=None): #opens a port and listens for telemetry for seconds (default PROBE_SECONDS), returns (the open port, bytes heard) if any is heard (or it is an xbee, see AT_PROBE), None otherwise
+    try:
+        ser = serial.Serial(port, BAUD, timeout=0.1)
+    except (serial.SerialException, OSError, ValueError):
+        return None
+    data = b""
+    end = time.time() + (seconds or PROBE_SECONDS)
+    try:
+        while time.time() < end:
+            data += ser.read(ser.in_waiting or 1)
+            if any(is_telemetry(line.decode(errors="replace").strip("\r")) for line in data.split(b"\n")[:-1]):
+                return ser, data
+        if AT_PROBE and is_xbee(ser):
+            return ser, data
+    except (serial.SerialException, OSError):
+        pass
+    ser.close()
+    return None
+
+
+class SerialConnection(): #stands in for serial.Serial in XbeeDriver, read and write never raise, they do nothing while disconnected
+    def __init__(self, port=None, BAUD=115200, timeout=0.05): #port: tried first, None finds the xbee by probing every port
+        self.preferred = port
+        self.BAUD = BAUD
+        self.timeout = timeout
+        self.ser = None
+        self.port = None #port currently or last connected to
+        self.state = "Searching" #Searching, Connected, Reconnecting or Closed
+        self.retry_at = 0 #time of the next connection attempt
+        self.drops = 0 #times the connection has been lost
+        self._lost = threading.Event()
+        self._lost.set()
+        self._closed = False
+        self._lock = threading.Lock() #so a port opened as the connection is closed is never left open
+        self._unread = b"" #heard while probing the port, read before anything else so the packet that found the port isnt lost
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self): #connects whenever the connection is lost
+        backoff = BACKOFF_START
+        attempts = 0
+        while not self._closed:
+            self._lost.wait()
+            if self._closed:
+                break
+            ser, data = self._connect(scan=self.state == "Searching" or attempts >= RETRIES_BEFORE_SCAN) or (None, b"")
+            with self._lock:
+                if ser and self._closed:
+                    ser.close()
+                    break
+                self._unread = data
+                self.ser = ser
+            if ser:
+                self.state = "Connected"
+                self._lost.clear()
+                backoff = BACKOFF_START
+                attempts = 0
+                print("serial: connected to " + self.port)
+            else:
+                attempts += 1
+                self.retry_at = time.time() + backoff
+                time.sleep(backoff)
+                backoff = min(backoff * 2, BACKOFF_MAX)
+
+    def _connect(self, scan=True): #a port is only used once it has passed probe, the last working or preferred port first then if scan every other port. (port, bytes heard) or None
+        first = self.port or self.preferred
+        for port in candidate_ports(first) if scan else [first] if first else []:
+            if self._closed:
+                return None
+            found = probe(port, self.BAUD)
+            if found:
+                found[0].timeout = self.timeout
+                self.port = port
+                return found
+        return None
+
+    def _failed(self, e):
+        ser, self.ser = self.ser, None
+        if ser is None: #already noticed
+            return
+        print("serial: lost " + str(self.port) + ", " + str(e))
+        try:
+            ser.close()
+        except Exception:
+            pass
+        self.drops += 1
+        self.state = "Reconnecting"
+        self._lost.set()
+
+    @property
+    def connected(self):
+        return self.ser is not None
+
+    @property
+    def in_waiting(self):
+        ser = self.ser
+        if ser is None:
+            return 0
+        if self._unread:
+            return len(self._unread)
+        try:
+            return ser.in_waiting
+        except (serial.SerialException, OSError) as e:
+            self._failed(e)
+            return 0
+
+    def read(self, size=1): #waits up to timeout for data, b"" while disconnected
+        ser = self.ser
+        if ser is None:
+            time.sleep(self.timeout)
+            return b""
+        if self._unread:
+            data, self._unread = self._unread[:size], self._unread[size:]
+            return data
+        try:
+            return ser.read(size)
+        except (serial.SerialException, OSError, TypeError, AttributeError) as e: #pyserial can raise TypeError or AttributeError if the port vanishes mid read
+            self._failed(e)
+            return b""
+
+    def write(self, data): #returns False if it couldnt be sent
+        ser = self.ser
+        if ser is None:
+            return False
+        try:
+            ser.write(data)
+            return True
+        except (serial.SerialException, OSError) as e:
+            self._failed(e)
+            return False
+
+    def status(self): #[state, port, s until the next attempt to connect]
+        retry = max(self.retry_at - time.time(), 0) if self.state != "Connected" else 0
+        return [self.state, self.port or "", retry]
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            ser, self.ser = self.ser, None
+        self.state = "Closed"
+        self._lost.set()
+        if ser:
+            ser.close()
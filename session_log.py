@@ -0,0 +1,383 @@
+# Session logs, the raw bytes received from the xbee in indexed, compressed segments. python session_log.py tidy to clear out the logs folder
+
+import os, sys, time, json, lzma, gzip, hashlib, queue, threading
+import numpy as np
+
+from telemetry import split_packet, packet_numbers, mission_seconds, PACKET_LENGTH, FIELD_INDEX, NUMERIC_FIELDS
+
+LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
+INDEX_DTYPE = np.dtype([("time", np.float64), ("packet", np.float64), ("offset", np.int64), ("rssi", np.float64)]) #<segment>.idx, a record per packet so the end of a session can be found without reading all of it. rssi in dBm, NaN if the xbee isnt in API mode
+TAIL_BLOCK = 65536 #bytes read at a time when reading a log without an index backwards
+
+SEGMENT_BYTES = 4 * 1024 * 1024 #a segment is rotated when it gets this big
+SEGMENT_SECONDS = 30 * 60 #or this old
+COMPRESSION = "xz" #"xz" (lzma) or "gz" (zlib)
+COMPRESSED_OPEN = {".xz": lzma.open, ".gz": gzip.open}
+
+
+def index_path(log_path): #<session>.<NNN>.csv.xz -> <session>.<NNN>.idx
+    for ext in COMPRESSED_OPEN:
+        if log_path.endswith(ext): log_path = log_path[:-len(ext)]
+    return os.path.splitext(log_path)[0] + ".idx"
+
+def session_name(log_path): #name of the session a log or segment belongs to
+    return os.path.basename(log_path).split(".")[0]
+
+def manifest_path(log_dir, session):
+    return os.path.join(log_dir, session + ".manifest.json")
+
+def _segment_number(filename): #NNN of a rotated segment, None for the active log
+    parts = filename.split(".")
+    if len(parts) > 2 and parts[1].isdigit():
+        return int(parts[1])
+    return None
+
+def session_segments(log_path): #every segment of the session a log belongs to oldest first, the active log (if there is one) last
+    log_dir = os.path.dirname(log_path)
+    session = session_name(log_path)
+    segments = {}
+    for f in os.listdir(log_dir):
+        if f.split(".")[0] != session or ".csv" not in f or f.endswith(".tmp"):
+            continue
+        number = _segment_number(f)
+        if number is None:
+            continue
+        if number not in segments or f.endswith(".csv"): #an uncompressed copy is only still there if compression didnt finish
+            segments[number] = os.path.join(log_dir, f)
+    paths = [segments[number] for number in sorted(segments)]
+    active = os.path.join(log_dir, session + ".csv")
+    if os.path.exists(active):
+        paths.append(active)
+    return paths
+
+def open_segment(path): #opens a segment for reading whether or not its compressed
+    for ext in COMPRESSED_OPEN:
+        if path.endswith(ext):
+            return COMPRESSED_OPEN[ext](path, "rb")
+        if not os.path.exists(path) and os.path.exists(path + ext): #compressed since the segment list was made
+            return COMPRESSED_OPEN[ext](path + ext, "rb")
+    return open(path, "rb")
+
+def load_index(path): #index of a segment, None if it has no index
+    if not os.path.exists(index_path(path)):
+        return None
+    count = os.path.getsize(index_path(path)) // INDEX_DTYPE.itemsize #a record half written by a crash is ignored
+    return np.fromfile(index_path(path), dtype=INDEX_DTYPE, count=count)
+
+
+def _segment_entry(path): #manifest entry for a segment from its index
+    index = load_index(path)
+    entry = {"segment": _segment_number(os.path.basename(path)), "packets": 0}
+    if index is not None and len(index) > 0:
+        packets = index["packet"][np.isfinite(index["packet"])]
+        entry.update({"packets": len(index),
+                      "start_time": float(index["time"][0]),
+                      "end_time": float(index["time"][-1]),
+                      "first_packet": float(packets.min()) if len(packets) else None,
+                      "last_packet": float(packets.max()) if len(packets) else None})
+    return entry
+
+def _add_manifest_entry(log_dir, session, entry): #manifest is rewritten whole and swapped in so a crash never leaves half of one
+    path = manifest_path(log_dir, session)
+    manifest = {"session": session, "segments": []}
+    if os.path.exists(path):
+        with open(path, "r") as file:
+            manifest = json.load(file)
+    manifest["segments"] = [s for s in manifest["segments"] if s["segment"] != entry["segment"]] + [entry]
+    manifest["segments"].sort(key=lambda s: s["segment"])
+    with open(path + ".tmp", "w") as file:
+        json.dump(manifest, file, indent=1)
+    os.replace(path + ".tmp", path)
+
+def compress_segment(path): #compresses a rotated segment, records it in the manifest and removes the uncompressed copy
+    with open(path, "rb") as file:
+        data = file.read()
+    compressed = path + "." + COMPRESSION
+    with COMPRESSED_OPEN["." + COMPRESSION](compressed + ".tmp", "wb") as file:
+        file.write(data)
+    os.replace(compressed + ".tmp", compressed)
+    with open(compressed, "rb") as file:
+        checksum = hashlib.sha256(file.read()).hexdigest()
+
+    entry = _segment_entry(path)
+    entry.update({"file": os.path.basename(compressed),
+                  "bytes": len(data),
+                  "compressed_bytes": os.path.getsize(compressed),
+                  "sha256": checksum})
+    _add_manifest_entry(os.path.dirname(path), session_name(path), entry)
+    os.remove(path)
+
+
+class SegmentCompressor(): #background thread that compresses rotated segments so the driver never waits on it
+    def __init__(self):
+        self.jobs = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, path):
+        self.jobs.put(path)
+
+    def wait(self): #blocks until everything submitted has been compressed
+        self.jobs.join()
+
+    def _run(self):
+        while True:
+            path = self.jobs.get()
+            try:
+                compress_segment(path)
+            except Exception as e:
+                print("session log: ERROR compressing " + os.path.basename(path))
+                print(str(e))
+            self.jobs.task_done()
+
+
+class SessionLog(): #appends to logs/<session>.csv and its index, rotated to <session>.<NNN>.csv and compressed to .csv.xz in the background, each listed in <session>.manifest.json
+    #an existing session is continued rather than overwritten. nothing belonging to any other session is ever touched
+    def __init__(self, filename, log_dir=LOG_DIR):
+        self.log_dir = log_dir
+        self.session = session_name(filename)
+        self.path = os.path.join(log_dir, self.session + ".csv")
+        self.compressor = SegmentCompressor()
+
+        for segment in _uncompressed_segments(self.path): #left by a GCS that didnt close properly
+            self.compressor.submit(segment)
+
+        existing = [_segment_number(os.path.basename(s)) for s in session_segments(self.path)]
+        self.segment = max([n for n in existing if n is not None], default=-1) + 1
+        self._open()
+
+    def _open(self):
+        self.file = open(self.path, "ab")
+        self.index_file = open(index_path(self.path), "ab")
+        self.size = self.file.tell()
+        self.line_start = self.size #offset of the start of the line currently being received
+        index = load_index(self.path)
+        self.segment_start = index["time"][0] if len(index) > 0 else None #time of the first packet in this segment
+
+    def write(self, data): #raw received data, str or bytes
+        if isinstance(data, str): data = data.encode()
+        self.file.write(data)
+        self.size += len(data)
+
+    def end_line(self, packet_count=None, recv_time=None, rssi=None): #call after writing a newline, the line is indexed if it was a valid packet
+        recv_time = recv_time or time.time()
+        if packet_count is not None:
+            record = np.array([(recv_time, packet_count, self.line_start, np.nan if rssi is None else rssi)], dtype=INDEX_DTYPE)
+            self.index_file.write(record.tobytes())
+            if self.segment_start is None:
+                self.segment_start = recv_time
+        self.line_start = self.size
+        self.flush()
+
+        if self.size >= SEGMENT_BYTES or (self.segment_start is not None and recv_time - self.segment_start >= SEGMENT_SECONDS):
+            self.rotate()
+
+    def rotate(self): #starts a new segment, only called between lines so a packet never spans two segments
+        self.file.close()
+        self.index_file.close()
+        segment = os.path.join(self.log_dir, self.session + "." + str(self.segment).zfill(3) + ".csv")
+        os.replace(index_path(self.path), index_path(segment))
+        os.replace(self.path, segment)
+        self.compressor.submit(segment)
+        self.segment += 1
+        self._open()
+
+    def flush(self): #gets everything to the OS so a crash of the GCS loses nothing
+        self.file.flush()
+        self.index_file.flush()
+
+    def close(self): #the last segment is compressed too, this waits for it
+        if self.size > 0:
+            self.rotate()
+        self.file.close()
+        self.index_file.close()
+        os.remove(self.path)
+        os.remove(index_path(self.path))
+        self.compressor.wait()
+
+
+def sessions(log_dir=LOG_DIR): #names of every session in the log folder
+    return sorted(set(f.split(".")[0] for f in os.listdir(log_dir) if ".csv" in f))
+
+def _uncompressed_segments(log_path): #rotated segments of a session that were never compressed
+    return [segment for segment in session_segments(log_path) if segment.endswith(".csv") and _segment_number(os.path.basename(segment)) is not None]
+
+def empty_sessions(log_dir=LOG_DIR): #sessions that never received anything (failed launches)
+    empty = []
+    for session in sessions(log_dir):
+        files = [f for f in os.listdir(log_dir) if f.split(".")[0] == session]
+        if all(os.path.getsize(os.path.join(log_dir, f)) == 0 for f in files):
+            empty.append(session)
+    return empty
+
+def prune_empty_sessions(log_dir=LOG_DIR, keep=None): #removes sessions that never received anything, returns how many. only run from python session_log.py tidy, never while logging
+    pruned = 0
+    for session in empty_sessions(log_dir):
+        if session == keep:
+            continue
+        for f in os.listdir(log_dir):
+            if f.split(".")[0] == session:
+                os.remove(os.path.join(log_dir, f))
+        pruned += 1
+    if pruned:
+        print("session log: pruned " + str(pruned) + " empty sessions")
+    return pruned
+
+def latest_session(log_dir=LOG_DIR): #active log path of the most recently written non empty indexed session, None if there isnt one. logs from before indexes are never continued
+    latest, latest_time = None, 0
+    for session in sessions(log_dir):
+        files = [os.path.join(log_dir, f) for f in os.listdir(log_dir) if f.split(".")[0] == session and ".csv" in f]
+        if all(os.path.getsize(f) == 0 for f in files) or not is_indexed(os.path.join(log_dir, session + ".csv")):
+            continue
+        modified = max(os.path.getmtime(f) for f in files)
+        if modified > latest_time:
+            latest, latest_time = os.path.join(log_dir, session + ".csv"), modified
+    return latest
+
+def iter_session_lines(log_path): #every raw line of a session in order, across all of its segments compressed or not
+    for segment in session_segments(log_path):
+        with open_segment(segment) as file:
+            for line in file:
+                yield line
+
+
+def _parse_lines(lines): #split packets from raw log lines, anything malformed is skipped
+    msgs = []
+    for line in lines:
+        try:
+            msg = split_packet(line.decode(errors="replace").strip("\r\n"))
+        except ValueError:
+            continue
+        if len(msg) == PACKET_LENGTH:
+            msgs.append(msg)
+    return msgs
+
+def _read_indexed(path, index, since, until=None): #packets in a segment received at or after since and before until (None for no limit)
+    start, stop = 0, len(index)
+    if since is not None:
+        start = np.searchsorted(index["time"], since) #binary search, index times only go up
+    if until is not None:
+        stop = np.searchsorted(index["time"], until)
+    if start >= stop:
+        return np.empty(0), []
+
+    with open_segment(path) as file:
+        file.seek(index["offset"][start]) #compressed segments are small enough that seeking by decompressing is fine
+        data = file.read(index["offset"][stop] - index["offset"][start]) if stop < len(index) else file.read()
+    offsets = index["offset"][start:stop] - index["offset"][start]
+
+    times, msgs = [], []
+    for t, offset in zip(index["time"][start:stop], offsets):
+        end = data.find(b"\n", offset)
+        parsed = _parse_lines([data[offset:end if end != -1 else len(data)]])
+        if parsed:
+            times.append(t)
+            msgs.append(parsed[0])
+    return np.array(times), msgs
+
+def _read_unindexed(path, seconds): #older logs and SD card logs have no index or receive times, reads backwards a block at a time
+    #packets are timed in s before the last packet in the log (so the newest is 0) from the steps in their mission time, these are not receive times
+    msgs = []
+    with open(path, "rb") as file:
+        end = file.seek(0, os.SEEK_END)
+        leftover = b""
+        while end > 0:
+            start = max(0, end - TAIL_BLOCK)
+            file.seek(start)
+            lines = (file.read(end - start) + leftover).split(b"\n")
+            leftover = lines.pop(0) if start > 0 else b"" #first line of the block may be cut off, its finished with the next block
+            msgs = _parse_lines(lines) + msgs
+            end = start
+            if seconds is not None and len(msgs) > 1:
+                span = mission_seconds(msgs[-1][FIELD_INDEX["Mission Time"]]) - mission_seconds(msgs[0][FIELD_INDEX["Mission Time"]])
+                if span > seconds:
+                    break
+    if not msgs:
+        return np.empty(0), []
+
+    mission = np.array([mission_seconds(msg[FIELD_INDEX["Mission Time"]]) for msg in msgs])
+    gaps = np.diff(mission)
+    gaps = np.where(np.isfinite(gaps) & (gaps >= 0) & (gaps < 60), gaps, 1.0) #mission time resets or garbage, assume 1Hz
+    times = -np.concatenate([np.cumsum(gaps[::-1])[::-1], [0]])
+    if seconds is not None:
+        keep = times >= times[-1] - seconds
+        times = times[keep]
+        msgs = [msg for msg, k in zip(msgs, keep) if k]
+    return times, msgs
+
+def is_indexed(path): #True if a session log has receive times, False for logs from before indexes (and SD card logs), which read_session_tail and read_session_range time relative to their last packet
+    return any(load_index(segment) is not None for segment in session_segments(path))
+
+def read_session_tail(path, seconds=None): #(receive times, split packets) for the last seconds of a session, the whole session if seconds is None. see is_indexed
+    segments = session_segments(path)
+    if len(segments) == 1 and load_index(segments[0]) is None: #log from before indexes and segments
+        return _read_unindexed(segments[0], seconds)
+
+    since = None
+    times, msgs = [], []
+    for segment in reversed(segments): #newest first, stops once the window is covered
+        index = load_index(segment)
+        if index is None or len(index) == 0:
+            continue
+        if since is None and seconds is not None:
+            since = index["time"][-1] - seconds
+        segment_times, segment_msgs = _read_indexed(segment, index, since)
+        times.insert(0, segment_times)
+        msgs = segment_msgs + msgs
+        if since is not None and index["time"][0] <= since:
+            break
+    if not msgs:
+        return np.empty(0), []
+    return np.concatenate(times), msgs
+
+def read_session_range(path, start, stop): #(receive times, split packets) for packets received from start up to stop. see is_indexed
+    segments = session_segments(path)
+    if len(segments) == 1 and load_index(segments[0]) is None:
+        times, msgs = _read_unindexed(segments[0], None)
+        keep = (times >= start) & (times < stop)
+        return times[keep], [msg for msg, k in zip(msgs, keep) if k]
+
+    times, msgs = [], []
+    for segment in segments: #oldest first, segments entirely outside the range are never opened
+        index = load_index(segment)
+        if index is None or len(index) == 0 or index["time"][-1] < start or index["time"][0] >= stop:
+            continue
+        segment_times, segment_msgs = _read_indexed(segment, index, start, stop)
+        times.append(segment_times)
+        msgs += segment_msgs
+    if not msgs:
+        return np.empty(0), []
+    return np.concatenate(times), msgs
+
+def read_session_values(path, start, stop): #(receive times, numeric values with a row per packet) from start up to stop, used to page history back into a TelemetryStore
+    times, msgs = read_session_range(path, start, stop)
+    if not msgs:
+        return times, np.empty((0, len(NUMERIC_FIELDS)))
+    return times, np.array([packet_numbers(msg) for msg in msgs])
+
+def load_session(path, store, seconds=None): #fills a TelemetryStore from a session log, returns the split packets loaded
+    start = time.perf_counter()
+    times, msgs = read_session_tail(path, seconds)
+    if msgs:
+        store.extend(np.array([packet_numbers(msg) for msg in msgs]), times)
+    print("session log: loaded " + str(len(msgs)) + " packets from " + session_name(path) + " in " + str(round((time.perf_counter() - start) * 1000)) + "ms")
+    return times, msgs
+
+
+if __name__ == "__main__": #python session_log.py tidy [--yes]: compresses segments left by a GCS that didnt close properly and deletes empty sessions, asking first
+    if sys.argv[1:2] != ["tidy"]:
+        print("python session_log.py tidy [--yes]")
+        sys.exit(1)
+    compressor = SegmentCompressor()
+    leftover = [segment for session in sessions() for segment in _uncompressed_segments(os.path.join(LOG_DIR, session + ".csv"))]
+    for segment in leftover:
+        compressor.submit(segment)
+    compressor.wait()
+    print("session log: compressed " + str(len(leftover)) + " segments")
+
+    empty = empty_sessions()
+    if not empty:
+        sys.exit(0)
+    print("empty sessions: " + ", ".join(empty))
+    if "--yes" in sys.argv or input("delete these " + str(len(empty)) + " sessions? (y/n) ").strip().lower() == "y":
+        prune_empty_sessions()
@@ -0,0 +1,187 @@
+# SIMP pressure profiles for simulation mode from a recorded flight or a model, one command a second in data/simp_commands.txt, see README.md for the commands
+
+import os, sys
+import numpy as np
+
+from telemetry import TEAM_ID, FIELD_INDEX, NUMERIC_FIELDS, packet_numbers
+from session_log import read_session_tail
+
+SCRIPT_DIR = os.path.dirname(__file__)
+SIMP_FILE = "simp_commands.txt" #in data/, streamed by XbeeDriver.simp_handler
+SIMP_PERIOD = 1.0 #s between SIMP commands, profiles are resampled to this
+
+SEA_LEVEL_PA = 101325.0
+MIN_PA = 30000.0 #a profile outside this range is rejected (about 9km up to below sea level)
+MAX_PA = 110000.0
+MAX_RATE = 4000.0 #Pa/s, faster than about 330m/s (the speed of sound) is a glitch in the recording rather than the flight
+LIFT_PA = 120.0 #pressure below the ground pressure that counts as off the ground when finding the flight in a recording, about 10m
+MARGIN = 30 #s kept either side of the flight found in a recording, the payload needs some ground time before launch is detected
+SMOOTHING = 3 #s moving average over the resampled profile, recordings are only to 0.1kPa so otherwise the altitude steps 8m at a time
+MAX_GAP = 5 #s, gaps in a recording longer than this are bridged by interpolation and warned about
+
+ALTITUDE_TOLERANCE = 5.0 #m rms the reported altitude may differ from the expected curve during a check
+MAX_LAG = 10 #s of delay searched for between the commands and the reported altitude
+
+
+def pressure_to_altitude(pressure, ground): #m above where the pressure is ground, international standard atmosphere
+    return 44330.77 * (1 - (np.asarray(pressure) / ground) ** 0.190263)
+
+def altitude_to_pressure(altitude, ground):
+    return ground * (1 - 2.25577e-5 * np.asarray(altitude)) ** 5.25588
+
+
+def read_pressure(path): #(s since the first packet, Pa) of every packet in a session log or SD card log
+    times, msgs = read_session_tail(path, None) #SD logs have no index, they are timed from mission time
+    if not msgs:
+        return np.empty(0), np.empty(0)
+    pressure = np.array([packet_numbers(msg) for msg in msgs])[:, NUMERIC_FIELDS.index("Pressure")] * 1000 #kPa in telemetry
+    keep = np.isfinite(pressure) & (pressure > MIN_PA) & (pressure < MAX_PA)
+    return times[keep] - times[0], pressure[keep]
+
+def flight_window(t, pressure): #[start, stop] s of the flight in a recording: around the lowest pressure, while below the ground pressure, plus MARGIN
+    ground = np.median(pressure)
+    low = np.argmin(pressure)
+    if pressure[low] > ground - LIFT_PA:
+        print("simp profile: never more than " + str(int(LIFT_PA)) + " Pa below the ground pressure, no flight in this recording so all of it is used")
+        return t[0], t[-1]
+    on_ground = np.flatnonzero(pressure > ground - LIFT_PA)
+    before, after = on_ground[on_ground < low], on_ground[on_ground > low]
+    start = t[before[-1]] if len(before) else t[0]
+    stop = t[after[0]] if len(after) else t[-1]
+    return max(start - MARGIN, t[0]), min(stop + MARGIN, t[-1])
+
+def resample(t, pressure, start=None, stop=None): #pressure every SIMP_PERIOD from start to stop (s), smoothed by SMOOTHING
+    start = t[0] if start is None else start
+    stop = t[-1] if stop is None else stop
+    inside = (t >= start) & (t <= stop)
+    t, pressure = t[inside], pressure[inside]
+    gaps = np.diff(t)
+    if np.any(gaps > MAX_GAP):
+        print("simp profile: " + str(int(np.sum(gaps > MAX_GAP))) + " gaps longer than " + str(MAX_GAP) + "s interpolated over, longest " + str(round(np.max(gaps), 1)) + "s")
+    grid = np.arange(start, stop + 1e-9, SIMP_PERIOD)
+    profile = np.interp(grid, t, pressure)
+    window = int(round(SMOOTHING / SIMP_PERIOD))
+    if window > 1 and len(profile) > window:
+        padded = np.concatenate([np.full(window // 2, profile[0]), profile, np.full(window - 1 - window // 2, profile[-1])]) #the ends are held rather than pulled towards 0
+        profile = np.convolve(padded, np.ones(window) / window, mode="valid")
+    return profile
+
+def profile_from_flight(path, start=None, stop=None): #1Hz Pa profile of a recorded flight, the flight is found from the pressure if start and stop arent given
+    t, pressure = read_pressure(path)
+    if len(t) < 2:
+        raise ValueError("no pressure readings in " + path)
+    if start is None and stop is None:
+        start, stop = flight_window(t, pressure)
+        print("simp profile: flight found from " + str(round(start)) + "s to " + str(round(stop)) + "s")
+    return resample(t, pressure, start, stop)
+
+def model_profile(apogee=725.0, ascent=8.0, descent_rate=15.0, release_altitude=None, release_rate=5.0, ground=SEA_LEVEL_PA, pad=MARGIN, landed=MARGIN): #1Hz Pa profile of a simple flight
+    #ascent: s to apogee, slowing as it gets there. descent_rate: m/s from apogee, release_rate: m/s once below release_altitude (None for one rate all the way down)
+    release = 0 if release_altitude is None else min(release_altitude, apogee)
+    fall = (apogee - release) / descent_rate + release / release_rate
+    t = np.arange(0, pad + ascent + fall + landed + 1e-9, SIMP_PERIOD) - pad #0 is launch
+    rising = np.clip(t / ascent, 0, 1)
+    falling = np.clip(t - ascent, 0, None)
+    high = apogee - falling * descent_rate #above the release altitude
+    low = release - (falling - (apogee - release) / descent_rate) * release_rate
+    altitude = np.where(t < ascent, apogee * (1 - (1 - rising) ** 2), np.where(high > release, high, np.maximum(low, 0)))
+    return altitude_to_pressure(altitude, ground)
+
+def validate_profile(profile): #list of reasons the profile shouldnt be sent, empty if its fine
+    problems = []
+    if len(profile) < 2:
+        problems.append("profile is too short (" + str(len(profile)) + " s)")
+        return problems
+    if not np.all(np.isfinite(profile)):
+        problems.append(str(int(np.sum(~np.isfinite(profile)))) + " readings arent numbers")
+    if np.nanmin(profile) < MIN_PA or np.nanmax(profile) > MAX_PA:
+        problems.append("pressure outside " + str(int(MIN_PA)) + " to " + str(int(MAX_PA)) + " Pa (" + str(round(np.nanmin(profile))) + " to " + str(round(np.nanmax(profile))) + ")")
+    rate = np.abs(np.diff(profile)) / SIMP_PERIOD
+    if np.nanmax(rate) > MAX_RATE:
+        problems.append("pressure changes " + str(round(np.nanmax(rate))) + " Pa/s at " + str(int(np.nanargmax(rate) * SIMP_PERIOD)) + "s, over " + str(int(MAX_RATE)))
+    if profile[0] < np.nanmax(profile) - LIFT_PA:
+        problems.append("profile doesnt start on the ground")
+    return problems
+
+
+def write_commands(path, profile): #one ready to send SIMP command per line, whole Pa
+    with open(path, "w", newline="\n") as file:
+        file.writelines("CMD," + TEAM_ID + ",SIMP," + str(int(p)) + "\n" for p in np.round(profile))
+
+def load_commands(path): #the lines of a command file as sent, [] if there isnt one
+    if not os.path.exists(path):
+        print("simp profile: no SIMP commands at " + path + ", make some with simp_profile.py")
+        return []
+    with open(path, "r") as file:
+        return [line for line in file if line.startswith("CMD,")]
+
+def read_commands(path): #the pressures in a command file as a float array
+    return np.array([float(line.split(",")[3]) for line in load_commands(path)])
+
+
+def check_playback(path, commands_path): #compares the altitude reported during a simulation run with the altitude the profile should give
+    #returns [packets in simulation mode, lag s, rms error m, max error m], the expected altitude is relative to the first pressure sent and the reported one to its first value
+    profile = read_commands(commands_path)
+    times, msgs = read_session_tail(path, None)
+    sim = np.array([msg[FIELD_INDEX["Mode"]] == "S" for msg in msgs], dtype=bool)
+    if len(profile) < 2 or not np.any(sim):
+        return [int(np.sum(sim)), np.nan, np.nan, np.nan]
+    altitude = np.array([packet_numbers(msg) for msg in msgs])[sim, NUMERIC_FIELDS.index("Altitude")]
+    t = times[sim] - times[sim][0]
+    reported = np.interp(np.arange(0, t[-1] + 1e-9, SIMP_PERIOD), t, altitude) #1Hz like the profile
+    reported -= reported[0]
+    expected = pressure_to_altitude(profile, profile[0])
+
+    errors = []
+    for lag in range(MAX_LAG + 1): #commands take a packet or two to be sent and acted on
+        n = min(len(expected), len(reported) - lag)
+        errors.append(np.sqrt(np.mean((reported[lag:lag + n] - expected[:n]) ** 2)) if n > 1 else np.inf)
+    lag = int(np.argmin(errors))
+    n = min(len(expected), len(reported) - lag)
+    return [int(np.sum(sim)), lag * SIMP_PERIOD, errors[lag], float(np.max(np.abs(reported[lag:lag + n] - expected[:n]))) if n > 1 else np.nan]
+
+
+def _option(args, name, default): #value after name in args as a float, removed from args
+    if name not in args:
+        return default
+    i = args.index(name)
+    value = float(args[i + 1])
+    del args[i:i + 2]
+    return value
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    output = os.path.join(SCRIPT_DIR, "data", SIMP_FILE)
+    if "-o" in args:
+        output = args[args.index("-o") + 1]
+        del args[args.index("-o"):args.index("-o") + 2]
+
+    if args[:1] == ["check"] and len(args) > 1:
+        packets, lag, rms, worst = check_playback(args[1], args[2] if len(args) > 2 else output)
+        if not np.isfinite(rms):
+            print("simp profile: nothing to check, " + str(packets) + " packets in simulation mode")
+            sys.exit(1)
+        print("simp profile: " + str(packets) + " packets in simulation mode, reported altitude " + str(lag) + "s behind the commands, " +
+              str(round(rms, 1)) + "m rms (worst " + str(round(worst, 1)) + "m) from the expected curve, " + ("OK" if rms <= ALTITUDE_TOLERANCE else "FAILED"))
+        sys.exit(0 if rms <= ALTITUDE_TOLERANCE else 1)
+
+    if args[:1] == ["flight"] and len(args) > 1:
+        start, stop = _option(args, "--start", None), _option(args, "--stop", None)
+        profile = profile_from_flight(args[1], start, stop)
+    elif args[:1] == ["model"]:
+        release = _option(args, "--release-altitude", None)
+        profile = model_profile(_option(args, "--apogee", 725.0), _option(args, "--ascent", 8.0), _option(args, "--descent-rate", 15.0),
+                                release, _option(args, "--release-rate", 5.0), _option(args, "--ground", SEA_LEVEL_PA))
+    else:
+        print("python simp_profile.py flight <log> [--start s] [--stop s] | model [--apogee m] [--ascent s] [--descent-rate m/s] [--release-altitude m] [--release-rate m/s] [--ground Pa] | check <session log> [file], [-o file]")
+        sys.exit(1)
+
+    problems = validate_profile(profile)
+    for problem in problems:
+        print("simp profile: " + problem)
+    if problems and "--force" not in args:
+        print("simp profile: not written, --force to write it anyway")
+        sys.exit(1)
+    write_commands(output, profile)
+    apogee = np.max(pressure_to_altitude(profile, profile[0]))
+    print("simp profile: wrote " + str(len(profile)) + " commands (" + str(round(len(profile) * SIMP_PERIOD)) + "s, apogee " + str(round(apogee)) + "m) to " + output)
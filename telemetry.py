@@ -0,0 +1,226 @@
+# Telemetry packet schema shared by the GCS, the drivers and the analysis tools
+
+import numpy as np
+
+TEAM_ID = "3130"
+
+PACKET_FIELDS = [["Team ID", False], #Field name (same as the GUI variable names), is numeric. Order is the order of the packet once the CMD echo has been rejoined
+                 ["Mission Time", False],
+                 ["Packet Count", True],
+                 ["Mode", False],
+                 ["State", False],
+                 ["Altitude", True],
+                 ["Temperature", True],
+                 ["Pressure", True],
+                 ["Bus Voltage", True],
+                 ["GYRO R", True],
+                 ["GYRO P", True],
+                 ["GYRO Y", True],
+                 ["ACCEL R", True],
+                 ["ACCEL P", True],
+                 ["ACCEL Y", True],
+                 ["MAG R", True],
+                 ["MAG P", True],
+                 ["MAG Y", True],
+                 ["Autogyro Rate", True],
+                 ["GPS Time", False],
+                 ["GPS Altitude", True],
+                 ["GPS Lat", True],
+                 ["GPS Long", True],
+                 ["GPS Sats", True],
+                 ["CMD Echo", False],
+                 ["", False], #blank entry after the command echo
+                 ["Substate", False],
+                 ["Main SOC", True],
+                 ["Bus Current", True],
+                 ["Bus Power", True],
+                 ["Release Mechanism", False]]
+
+PACKET_LENGTH = len(PACKET_FIELDS)
+FIELD_INDEX = {field[0]: i for i, field in enumerate(PACKET_FIELDS) if field[0] != ""}
+NUMERIC_FIELDS = [field[0] for field in PACKET_FIELDS if field[1]]
+NUMERIC_INDEX = [FIELD_INDEX[name] for name in NUMERIC_FIELDS]
+
+
+def split_packet(line): #splits a raw telemetry line into its fields, rejoining the CMD echo (every command has commas)
+    msg = line.split(',')
+    end_of_echo = msg.index('') #raises ValueError if the blank entry after the echo is missing
+    return msg[:24] + [','.join(msg[24:end_of_echo])] + msg[end_of_echo:]
+
+def mission_seconds(text): #"H:M:S" mission or gps time as seconds, nan if it cant be read
+    try:
+        h, m, sec = text.split(":")
+        return int(h) * 3600 + int(m) * 60 + float(sec)
+    except ValueError:
+        return np.nan
+
+def packet_numbers(msg): #numeric fields of a split packet as a float array in NUMERIC_FIELDS order, nan where a field isnt a number
+    values = np.full(len(NUMERIC_INDEX), np.nan)
+    for i, index in enumerate(NUMERIC_INDEX):
+        try:
+            values[i] = float(msg[index])
+        except (ValueError, IndexError):
+            pass
+    return values
+
+
+def _descent_rate(store, start, stop): #m/s, positive going down
+    first = max(start, 1)
+    out = np.full(stop - start, np.nan)
+    alt = store.values[first - 1:stop, store.index["Altitude"]]
+    t = store.times[first - 1:stop]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out[first - start:] = -np.diff(alt) / np.diff(t)
+    return out
+
+def _magnitude(*names): #length of a 3 axis vector channel
+    def f(store, start, stop):
+        cols = [store.index[name] for name in names]
+        return np.sqrt(np.sum(store.values[start:stop, cols] ** 2, axis=1))
+    return f
+
+DERIVED_CHANNELS = {"Descent Rate": [_descent_rate, "m/s"], #name: [function(store, start row, stop row) -> values for those rows, unit]
+                    "GYRO Magnitude": [_magnitude("GYRO R", "GYRO P", "GYRO Y"), "°/s"],
+                    "ACCEL Magnitude": [_magnitude("ACCEL R", "ACCEL P", "ACCEL Y"), "°/s²"],
+                    "MAG Magnitude": [_magnitude("MAG R", "MAG P", "MAG Y"), ""]}
+
+
+def level_of_detail(t, values, points): #thins a line down to about points points keeping the min and max of each bucket so spikes still show
+    if len(t) <= points:
+        return t, values
+    bucket = max(len(t) // max(points // 2, 1), 1)
+    whole = len(t) - len(t) % bucket
+    buckets = values[:whole].reshape(-1, bucket)
+    nan = np.isnan(buckets)
+    lows = np.argmin(np.where(nan, np.inf, buckets), axis=1) #an all nan bucket picks its first point, which is nan, so gaps are kept
+    highs = np.argmax(np.where(nan, -np.inf, buckets), axis=1)
+    starts = np.arange(0, whole, bucket)
+    keep = np.concatenate([[0], starts + lows, starts + highs, np.arange(whole, len(t)), [len(t) - 1]]) #partial last bucket is kept whole, and both ends so a flat line still reaches the edges
+    keep = np.unique(keep) #sorted, a bucket whose min and max are the same point only keeps it once
+    return t[keep], values[keep]
+
+
+class TelemetryStore(): #plot ready history of every numeric channel, one row per packet in growable numpy arrays
+    def __init__(self, capacity=1024, retention=None): #retention: s of history kept in memory, None keeps everything
+        self.index = {name: i for i, name in enumerate(NUMERIC_FIELDS)}
+        self.channels = NUMERIC_FIELDS + list(DERIVED_CHANNELS)
+        self.times = np.empty(capacity)
+        self.values = np.empty((capacity, len(NUMERIC_FIELDS)))
+        self.n = 0
+        self._derived = {} #name: [values, rows computed so far], only filled in for channels something has asked for
+        self.count_start = 0 #first row since Packet Count last went backwards (payload restart), packet counts only go up from here
+
+        self.retention = retention
+        self.pager = None #function(start, stop) -> (times, values) reading rows received from start up to stop back from disk, see session_log.read_session_values
+        self.spilled = False #True once rows have been dropped from memory
+        self.floor = -np.inf #nothing before this is paged back in (set by clear)
+        self._paged = None #[start, stop, TelemetryStore] of the last history paged in
+
+    def _make_room(self, rows): #drops rows older than the retention window before growing, capacity only grows while the window is filling
+        if self.n + rows <= len(self.times):
+            return
+        if self.retention is not None and self.n > 0:
+            drop = np.searchsorted(self.times[:self.n], self.times[self.n - 1] - self.retention)
+            if drop > 0: #they are already in the session log, history() reads them back
+                self.times[:self.n - drop] = self.times[drop:self.n]
+                self.values[:self.n - drop] = self.values[drop:self.n]
+                self.n -= drop
+                self.count_start = max(self.count_start - drop, 0)
+                self.spilled = True
+                self._derived = {}
+        while self.n + rows > len(self.times) // (2 if self.spilled else 1): #doubled until half is free after dropping, so appends stay O(1) on average
+            self.times = np.concatenate([self.times, np.empty(len(self.times))])
+            self.values = np.concatenate([self.values, np.empty(self.values.shape)])
+
+    def append(self, values, t): #values in NUMERIC_FIELDS order (see packet_numbers), t: time received
+        self._make_room(1)
+        count = self.index["Packet Count"]
+        if self.n > 0 and values[count] < self.values[self.n - 1, count]:
+            self.count_start = self.n
+        self.times[self.n] = t
+        self.values[self.n] = values
+        self.n += 1
+
+    def extend(self, values, times): #bulk append, values: 2d array with a row per packet
+        self._make_room(len(times))
+        self.times[self.n:self.n + len(times)] = times
+        self.values[self.n:self.n + len(times)] = values
+        counts = self.values[max(self.n - 1, 0):self.n + len(times), self.index["Packet Count"]]
+        restarts = np.flatnonzero(np.diff(counts) < 0)
+        if len(restarts):
+            self.count_start = max(self.n - 1, 0) + restarts[-1] + 1
+        self.n += len(times)
+
+    def clear(self):
+        if self.n > 0:
+            self.floor = self.times[self.n - 1] + 1e-6
+        self.n = 0
+        self._derived = {}
+        self.count_start = 0
+        self.spilled = False
+        self._paged = None
+
+    def history(self, start): #TelemetryStore of the rows from start up to the oldest row still in memory, paged back in from disk, None if there arent any
+        if self.pager is None or not self.spilled or self.n == 0:
+            return None
+        start = max(start, self.floor)
+        stop = self.times[0]
+        if start >= stop:
+            return None
+        if self._paged is None or self._paged[0] > start or self._paged[1] != stop: #only read again if more is needed or memory has moved on
+            times, values = self.pager(start, stop)
+            paged = TelemetryStore(max(len(times), 1))
+            paged.extend(values, times)
+            self._paged = [start, stop, paged]
+        return self._paged[2]
+
+    def time(self):
+        return self.times[:self.n]
+
+    def channel(self, name): #values of a channel, raw channels are views, derived ones are only computed for rows added since the last call
+        if name in self.index:
+            return self.values[:self.n, self.index[name]]
+
+        cached = self._derived.setdefault(name, [np.empty(0), 0])
+        if cached[1] < self.n:
+            if len(cached[0]) < self.n:
+                cached[0] = np.concatenate([cached[0], np.empty(max(self.n, len(cached[0])))])
+            cached[0][cached[1]:self.n] = DERIVED_CHANNELS[name][0](self, cached[1], self.n)
+            cached[1] = self.n
+        return cached[0][:self.n]
+
+    def latest(self, name): #newest value of a channel, nan if there is none
+        if self.n == 0:
+            return np.nan
+        return self.channel(name)[-1]
+
+    def window(self, start, stop): #[first, last + 1] rows received between start and stop, plus a row either side so lines run to the edge, binary search so O(log n)
+        times = self.times[:self.n]
+        first = max(np.searchsorted(times, start) - 1, 0)
+        last = min(np.searchsorted(times, stop, side="right") + 1, self.n)
+        return first, last
+
+    def packet_window(self, first_packet, last_packet): #[first, last + 1] rows with packet counts first_packet to last_packet since the last payload restart
+        counts = self.values[self.count_start:self.n, self.index["Packet Count"]]
+        return self.count_start + np.searchsorted(counts, first_packet), self.count_start + np.searchsorted(counts, last_packet, side="right")
+
+    def value_at(self, t): #{channel: value} of every channel at time t (the latest row received at or before it), empty if there isnt one
+        if self._paged is not None and self.n > 0 and t < self.times[0] and t >= self._paged[0]:
+            return self._paged[2].value_at(t)
+        row = np.searchsorted(self.times[:self.n], t, side="right") - 1
+        if row < 0:
+            return {}
+        return {name: self.channel(name)[row] for name in self.channels}
+
+    def nbytes(self): #{name: bytes} of every array the store holds at its whole capacity, paged in history under "History"
+        sizes = {"Time": self.times.nbytes}
+        sizes.update({name: self.values.nbytes // len(NUMERIC_FIELDS) for name in NUMERIC_FIELDS})
+        sizes.update({name: cached[0].nbytes for name, cached in self._derived.items()})
+        if self._paged is not None:
+            sizes["History"] = sum(self._paged[2].nbytes().values())
+        return sizes
+
+    def unit(self, name): #unit of a derived channel, raw channel units live with the GUI variables
+        if name in DERIVED_CHANNELS:
+            return DERIVED_CHANNELS[name][1]
+        return ""
@@ -0,0 +1,183 @@
+# Shared memory ring buffer of live telemetry, the XbeeDriver writes it and analysis scripts (descent prediction, landing zone estimation etc) read it by name
+
+import os, sys, time
+import numpy as np
+from multiprocessing import shared_memory
+
+from telemetry import NUMERIC_FIELDS
+
+DEFAULT_SHM_NAME = "gcs_telemetry"
+DEFAULT_CAPACITY = 4096 #records, ~1 hour at 1Hz
+REATTACH_PERIOD = 1.0 #s between readers checking whether the writer has been restarted
+
+RECORD_DTYPE = np.dtype([("seq", np.float64), ("recv_time", np.float64)] + [(name, np.float64) for name in NUMERIC_FIELDS]) #2*capacity of them after the header, each written at i and i+capacity so the latest N are one block to copy
+HEADER_DTYPE = np.dtype(np.uint64)
+HEADER_LEN = 5 #[next sequence number, capacity, number of record fields, writer pid, writer generation]
+HEADER_SIZE = HEADER_LEN * HEADER_DTYPE.itemsize
+
+
+def _map(shm, capacity): #header and record arrays backed by the shared memory block
+    header = np.ndarray((HEADER_LEN,), dtype=HEADER_DTYPE, buffer=shm.buf)
+    records = np.ndarray((2 * capacity,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=HEADER_SIZE)
+    return header, records
+
+
+class TelemetryRingWriter(): #owned by the process receiving telemetry, creates (and on close removes) the shared memory block
+    def __init__(self, name=DEFAULT_SHM_NAME, capacity=DEFAULT_CAPACITY):
+        size = HEADER_SIZE + 2 * capacity * RECORD_DTYPE.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError: #left behind by a GCS that crashed, nobody else should be writing to it
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+
+        self.name = name
+        self.capacity = capacity
+        self.header, self.records = _map(self.shm, capacity)
+        self.records[:] = np.nan
+        self.header[:] = [0, capacity, len(RECORD_DTYPE.names), os.getpid(), time.time_ns()]
+        self.seq = 0
+
+    def write(self, values, recv_time=None): #values: numeric fields in NUMERIC_FIELDS order (see telemetry.packet_numbers)
+        if recv_time is None: recv_time = time.time()
+        record = np.empty((), dtype=RECORD_DTYPE)
+        record["seq"] = self.seq
+        record["recv_time"] = recv_time
+        for name, value in zip(NUMERIC_FIELDS, values):
+            record[name] = value
+
+        i = self.seq % self.capacity
+        for j in [i, i + self.capacity]:
+            self.records["seq"][j] = np.nan #marks the record as being written
+            self.records[j] = record
+        self.seq += 1
+        self.header[0] = self.seq #published last so readers never see a half written record as the newest
+
+    def close(self):
+        self.header[4] = 0 #tells readers still attached that this block is finished
+        del self.header, self.records #views have to be released before the block can be closed
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class TelemetryRingReader(): #attaches to a ring created by a TelemetryRingWriter in another process
+    #a record's seq is nan while it is written, copies drop any record whose seq isnt the one expected or that the writer could have started overwriting.
+    #a restarted writer makes a new block with a new generation, which readers move over to within REATTACH_PERIOD
+    def __init__(self, name=DEFAULT_SHM_NAME):
+        self.name = name
+        self.shm = None
+        self._attach()
+        self.last_seq = self.seq() #records before attaching are available from latest() but not counted as new
+        self.overruns = 0 #number of times read_new() fell more than a full ring behind
+        self.lost = 0 #number of records overwritten before read_new() got to them
+        self.torn = 0 #number of records dropped because the writer overwrote them while they were being copied
+        self.restarts = 0 #number of times the writer was restarted and this reader moved to its new block
+
+    def _open(self): #the block currently called self.name and its header, raises FileNotFoundError if there isnt one
+        shm = shared_memory.SharedMemory(name=self.name)
+        header = np.ndarray((HEADER_LEN,), dtype=HEADER_DTYPE, buffer=shm.buf)
+        if sys.platform != "win32" and int(header[3]) != os.getpid(): #before python 3.13 attaching registers the block with the resource tracker, which would unlink it when this reader exits
+            try:
+                from multiprocessing import resource_tracker
+                resource_tracker.unregister(shm._name, "shared_memory")
+            except Exception:
+                pass
+        return shm, header
+
+    def _attach(self): #maps the block currently called self.name, raises FileNotFoundError if there isnt one
+        shm, header = self._open()
+        if int(header[2]) != len(RECORD_DTYPE.names):
+            del header
+            shm.close()
+            raise ValueError("telemetry ring: record layout doesnt match this version of telemetry.py")
+        if self.shm is not None:
+            self.close()
+        self.shm = shm
+        self.capacity = int(header[1])
+        self.generation = int(header[4])
+        del header
+        self.header, self.records = _map(self.shm, self.capacity)
+        self._checked = time.time()
+
+    def _check_writer(self): #moves to the writer's new block if it has been restarted since attaching
+        if int(self.header[4]) != 0 and time.time() - self._checked < REATTACH_PERIOD:
+            return
+        self._checked = time.time()
+        try:
+            current, header = self._open()
+        except FileNotFoundError: #writer is gone and hasnt been restarted yet, what it wrote is still readable
+            return
+        generation = int(header[4])
+        del header
+        current.close()
+        if generation != self.generation and generation != 0:
+            self._attach()
+            self.last_seq = 0 #everything the new writer has written is new
+            self.restarts += 1
+            print("telemetry ring: writer restarted, attached to its new ring")
+
+    def seq(self): #number of records written since the writer started
+        return int(self.header[0])
+
+    def writer_pid(self):
+        return int(self.header[3])
+
+    def _valid(self, records, first, seq): #bool per record, True if it is record first + i and the writer (now at seq) cant have started overwriting it
+        expected = first + np.arange(len(records))
+        return (records["seq"] == expected) & (expected > seq - self.capacity)
+
+    def _copy(self, seq, n): #copy of the n records before seq, dropping any the writer overwrote while they were being copied
+        if n == 0:
+            return self.records[:0].copy()
+        end = (seq - 1) % self.capacity + self.capacity + 1
+        records = self.records[end - n:end].copy()
+        valid = self._valid(records, seq - n, self.seq()) #header read again after copying
+        if not np.all(valid):
+            self.torn += int(np.sum(~valid))
+            records = records[valid]
+        return records
+
+    def latest(self, n): #copy of the newest n records oldest first, e.g. latest(60)["Altitude"]
+        self._check_writer()
+        seq = self.seq()
+        return self._copy(seq, min(n, seq, self.capacity))
+
+    def read_new(self): #copy of every record written since the last call, overruns are counted in self.overruns and self.lost
+        self._check_writer()
+        seq = self.seq()
+        n = seq - self.last_seq
+        if n < 0: #writer was restarted in the same block
+            n = seq
+        if n > self.capacity:
+            self.overruns += 1
+            self.lost += n - self.capacity
+            print("telemetry ring: reader overrun, lost " + str(n - self.capacity) + " records")
+        self.last_seq = seq
+        return self._copy(seq, min(n, self.capacity))
+
+    def is_intact(self, records): #False if any record isnt the one after the record before it, or the writer has lapped it since
+        if len(records) == 0:
+            return True
+        return bool(np.all(self._valid(records, int(records["seq"][0]) if np.isfinite(records["seq"][0]) else -1, self.seq())))
+
+    def close(self):
+        del self.header, self.records
+        self.shm.close()
+
+
+if __name__ == "__main__": #prints live telemetry from a running GCS: python telemetry_shm.py [shm name]
+    reader = TelemetryRingReader(sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SHM_NAME)
+    print("attached to ring of", reader.capacity, "records,", reader.seq(), "written so far")
+    try:
+        while True:
+            for record in reader.read_new():
+                print(int(record["seq"]), "packet", record["Packet Count"], "altitude", record["Altitude"], "pressure", record["Pressure"])
+            time.sleep(0.1)
+    except KeyboardInterrupt:
+        pass
+    reader.close()
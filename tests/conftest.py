@@ -0,0 +1,35 @@
+import os, sys, time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) #the modules live at the top of the repo, not in a package
+
+
+def packet_line(count, altitude=0.0, state="LAUNCH_PAD", mission=None, mode="F", pressure=101.3): #a telemetry line as the payload sends it, without the newline
+    mission = count if mission is None else mission
+    time_text = str(int(mission // 3600)) + ":" + str(int(mission // 60 % 60)).zfill(2) + ":" + str(int(mission % 60)).zfill(2)
+    return ",".join(["3130", time_text, str(count), mode, state, str(altitude), "20.0", str(pressure), "5.0"] + ["0.0"] * 9 +
+                    ["90", "00:00:00", "0", "0", "0", "0", "CMD,SIMP,101325", "", "IDLE", "90", "0.1", "0.5", "NONE"])
+
+
+class FakeConnection(): #stands in for serial_link.SerialConnection, never connects to anything
+    def __init__(self, port=None, BAUD=115200, timeout=0.05):
+        self.timeout = timeout
+        self.written = b""
+        self.connected = True
+
+    in_waiting = 0
+
+    def read(self, size=1): #like a quiet port, waits out the timeout
+        time.sleep(self.timeout)
+        return b""
+
+    def write(self, data):
+        if not self.connected:
+            return False
+        self.written += data
+        return True
+
+    def status(self):
+        return ["Connected", "FAKE", 0]
+
+    def close(self):
+        pass
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from ground_track import GroundTrack, bearing, EARTH_RADIUS
+
+LAT, LONG = 53.4668, -2.2339 #Manchester
+M_PER_DEG = EARTH_RADIUS * np.radians(1)
+
+
+def test_projection_is_metres_from_the_launch_point():
+    track = GroundTrack()
+    track.add(LAT, LONG, 100.0, 0)
+    assert track.position() == [0, 0, 0]
+    track.add(LAT + 1000 / M_PER_DEG, LONG, 150.0, 1) #1km north
+    x, y, alt = track.position()
+    assert x == pytest.approx(0) and y == pytest.approx(1000) and alt == 50
+    east = 1000 / (M_PER_DEG * np.cos(np.radians(LAT)))
+    x, y = track.project(LAT, LONG + east) #1km east, longitude lines are closer together away from the equator
+    assert x == pytest.approx(1000) and y == pytest.approx(0)
+
+def test_distance_and_bearing_from_the_gcs():
+    track = GroundTrack(gcs_position=[LAT - 500 / M_PER_DEG, LONG]) #500m south of the launch point
+    track.add(LAT, LONG, 0, 0)
+    assert track.gcs[1] == pytest.approx(-500)
+    distance, heading = track.from_gcs(0, 0)
+    assert distance == pytest.approx(500) and heading == pytest.approx(0)
+    assert bearing(1, 0) == 90 and bearing(0, -1) == 180 and bearing(-1, 0) == 270
+
+def test_no_fix_is_ignored():
+    track = GroundTrack()
+    track.add(0, 0, 0, 0)
+    track.add(np.nan, LONG, 0, 1)
+    assert track.n == 0 and track.position() is None and track.origin is None
+
+def test_thinning_keeps_a_fixed_size():
+    track = GroundTrack(capacity=100)
+    for i in range(1000):
+        track.add(LAT + i * 1e-6, LONG, 0, i)
+    assert track.n <= 100 and track.thinned > 0
+    assert track.t[track.n - 1] == 999 and np.all(np.diff(track.t[:track.n]) > 0)
+
+def test_landing_estimate():
+    track = GroundTrack()
+    track.add(LAT, LONG, 0, -100) #on the pad
+    for i in range(20): #drifting 2m/s east, falling 5m/s from 100m
+        track.add(LAT, LONG + 2 * i / (M_PER_DEG * np.cos(np.radians(LAT))), 100 - 5 * i, i)
+    x, y = track.landing_estimate() #last fix is at 38m east 5m up, so it lands a second later 2m further east
+    assert x == pytest.approx(40) and y == pytest.approx(0, abs=1e-6)
+
+def test_no_landing_estimate_when_not_descending():
+    track = GroundTrack()
+    for i in range(20):
+        track.add(LAT, LONG, 50, i)
+    assert track.landing_estimate() is None
+
+def test_clear_forgets_the_track_and_launch_point():
+    track = GroundTrack()
+    track.add(LAT, LONG, 0, 0)
+    track.add(LAT + 0.01, LONG, 0, 1)
+    thinned = track.thinned
+    track.clear()
+    assert track.n == 0 and track.thinned != thinned and track.landing_estimate() is None
+    track.add(LAT + 0.01, LONG, 0, 2)
+    assert track.position() == [0, 0, 0]
@@ -0,0 +1,60 @@
+import socket, struct
+import pytest
+
+import xbee, headless
+from headless import HeadlessStation
+from conftest import FakeConnection
+
+
+@pytest.fixture
+def station(tmp_path, monkeypatch):
+    monkeypatch.setattr(xbee, "SerialConnection", FakeConnection)
+    monkeypatch.setattr(xbee, "SCRIPT_DIR", str(tmp_path))
+    monkeypatch.setattr(headless, "XbeeDriver", lambda *args, **kwargs: xbee.XbeeDriver(*args, shm_name=None, **kwargs)) #another ground station on this computer may have the ring
+    monkeypatch.setattr(headless, "LOG_DIR", str(tmp_path / "logs"))
+    monkeypatch.setattr(headless, "POLL_PERIOD", 0.05)
+    (tmp_path / "logs").mkdir()
+    with socket.socket() as free: #a port nothing else is using
+        free.bind(("127.0.0.1", 0))
+        port = free.getsockname()[1]
+    station = HeadlessStation(None, command_port=port, terminal=False)
+    yield station
+    station.close()
+
+def connect(station):
+    client = socket.create_connection(station.server.getsockname())
+    station.poll() #accepts it
+    return client
+
+def ask(station, client, line):
+    client.sendall((line + "\n").encode())
+    reply = b""
+    while not reply.endswith(b"\n"):
+        station.poll()
+        client.settimeout(0.05)
+        try:
+            reply += client.recv(4096)
+        except socket.timeout:
+            pass
+    return reply.decode()
+
+
+def test_commands_over_the_socket(station):
+    client = connect(station)
+    assert ask(station, client, "status").startswith("FAKE ")
+    assert "unknown command" in ask(station, client, "fly")
+    client.close()
+
+def test_a_client_that_resets_only_drops_itself(station):
+    client = connect(station)
+    client.sendall(b"status\n")
+    client.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0)) #close with a reset rather than a goodbye
+    client.close()
+    for i in range(5):
+        station.poll()
+    assert station.running
+    assert station.clients == {}
+
+    other = connect(station)
+    assert ask(station, other, "status").startswith("FAKE ")
+    other.close()
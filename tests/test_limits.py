@@ -0,0 +1,81 @@
+import json
+import numpy as np
+import pytest
+
+from limits import LimitChecker, AlarmLog, LEVELS, RULES
+from telemetry import NUMERIC_FIELDS
+
+OK, WARN, ERROR = 0, 1, 2
+
+
+@pytest.fixture
+def checker(tmp_path):
+    path = tmp_path / "limits.json"
+    path.write_text(json.dumps({"_help": "ignored",
+                                "Bus Voltage": {"warn": [4.6, 5.4], "error": [4.3, None], "rate": 1.0, "stale": 5},
+                                "Altitude Stuck": {"field": "Altitude", "stuck": 10, "flight_only": True},
+                                "Nonsense": {"field": "Not A Field", "warn": [0, 1]}}))
+    return LimitChecker(str(path))
+
+def packet(**fields):
+    values = np.zeros(len(NUMERIC_FIELDS))
+    values[NUMERIC_FIELDS.index("Bus Voltage")] = 5.0
+    for name, value in fields.items():
+        values[NUMERIC_FIELDS.index(name.replace("_", " "))] = value
+    return values
+
+def level(checker, field):
+    return checker.level[NUMERIC_FIELDS.index(field)]
+
+
+def test_ranges(checker):
+    assert checker.check(packet(), 0, in_flight=False) == []
+    assert checker.check(packet(Bus_Voltage=4.5), 10, in_flight=False) == [["Bus Voltage", WARN, RULES.index("warn range"), 4.5]]
+    assert checker.check(packet(Bus_Voltage=4.5), 11, in_flight=False) == [] #only changes are returned
+    changes = checker.check(packet(Bus_Voltage=4.0), 12, in_flight=False)
+    assert changes == [["Bus Voltage", ERROR, RULES.index("error range"), 4.0]]
+    assert checker.status("Bus Voltage") == "Error"
+    assert checker.check(packet(), 20, in_flight=False) == [["Bus Voltage", OK, 0, 5.0]]
+
+def test_rate(checker):
+    checker.check(packet(), 0)
+    assert level(checker, "Bus Voltage") == OK
+    checker.check(packet(Bus_Voltage=5.3), 0.1) #3V/s
+    assert checker.rule[NUMERIC_FIELDS.index("Bus Voltage")] == RULES.index("rate")
+    checker.check(packet(Bus_Voltage=5.3), 1.1)
+    assert level(checker, "Bus Voltage") == OK
+
+def test_stuck_only_in_flight(checker):
+    for t in range(0, 30):
+        checker.check(packet(Altitude=100), t, in_flight=False)
+    assert level(checker, "Altitude") == OK
+    checker.check(packet(Altitude=100), 30, in_flight=True)
+    assert level(checker, "Altitude") == WARN and checker.rule[NUMERIC_FIELDS.index("Altitude")] == RULES.index("stuck")
+    checker.check(packet(Altitude=90), 31, in_flight=True)
+    assert level(checker, "Altitude") == OK
+
+def test_stale_while_packets_arrive(checker):
+    checker.check(packet(), 0)
+    for t in range(1, 7):
+        checker.check(packet(Bus_Voltage=np.nan), t)
+    assert level(checker, "Bus Voltage") == ERROR
+    assert checker.rule[NUMERIC_FIELDS.index("Bus Voltage")] == RULES.index("stale")
+
+def test_tick_fires_stale_during_an_outage(checker):
+    assert checker.tick(100) == [] #nothing received yet
+    checker.check(packet(Altitude=100), 0, in_flight=True)
+    assert checker.tick(3) == []
+    changes = checker.tick(6) #no packets since 0
+    assert ["Bus Voltage", ERROR, RULES.index("stale"), 5.0] in changes
+    changes = checker.tick(11)
+    assert [change[0] for change in changes] == ["Altitude"] #stuck too
+    checker.check(packet(Altitude=120), 12, in_flight=True) #link back
+    assert level(checker, "Bus Voltage") == OK and level(checker, "Altitude") == OK
+
+def test_alarm_log(tmp_path, checker):
+    log = AlarmLog(str(tmp_path / "alarms.log"))
+    checker.check(packet(), 0)
+    log.record(checker.check(packet(Bus_Voltage=4.0), 1), 1)
+    log.record([], 2)
+    lines = (tmp_path / "alarms.log").read_text().splitlines()
+    assert len(lines) == 1 and lines[0].split(",")[1:] == ["Bus Voltage", "4.0", "Error", "error range"]
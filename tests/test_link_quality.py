@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from link_quality import LinkStats, LinkLog, DEFAULT_LOS, LOS_PERIODS, MIN_INTERVALS
+
+
+def test_los_threshold_starts_at_the_default():
+    link = LinkStats()
+    link.packet(1, 100.0)
+    assert link.los_threshold() == DEFAULT_LOS
+    assert not link.los(100.0 + DEFAULT_LOS - 0.01)
+    assert link.los(100.0 + DEFAULT_LOS + 0.01)
+
+def test_los_threshold_follows_the_packet_rate():
+    link = LinkStats()
+    for i in range(MIN_INTERVALS + 1): #0.25Hz on the pad, would be LOS all the time with the 1Hz default
+        link.packet(i + 1, 4.0 * i)
+    assert link.los_threshold() == pytest.approx(LOS_PERIODS * 4.0)
+    assert link.packet_rate() == pytest.approx(0.25)
+    last = 4.0 * MIN_INTERVALS
+    assert not link.los(last + 4.5)
+    assert link.los(last + 5.0)
+
+def test_los_threshold_allows_for_jitter():
+    link = LinkStats()
+    t = np.cumsum([1.0, 0.8, 1.2, 0.8, 1.2, 0.8, 1.2])
+    for i, ti in enumerate(t):
+        link.packet(i + 1, ti)
+    assert link.los_threshold() > LOS_PERIODS * 1.0 #spread is 0.2s
+    assert link.los_threshold() == pytest.approx(LOS_PERIODS * 1.0 + 3 * 0.2)
+
+def test_threshold_never_goes_below_half_the_default():
+    link = LinkStats()
+    for i in range(10):
+        link.packet(i + 1, 0.01 * i)
+    assert link.los_threshold() == DEFAULT_LOS / 2
+
+def test_loss_and_bursts():
+    link = LinkStats()
+    for count in [1, 2, 3, 6, 7, 10, 11, 12]: #gaps of 2 and 2
+        link.packet(count, count)
+    assert link.lost == 4
+    assert link.bursts == {2: 2}
+    assert link.longest_burst() == 2
+    assert link.loss_rate() == pytest.approx(4 / 12)
+
+def test_restart_and_unreadable_counts_arent_loss():
+    link = LinkStats()
+    for i, count in enumerate([50, 51, 1, 2, np.nan, 3]): #payload restarted, then a corrupted count
+        link.packet(count, i)
+    assert link.lost == 0 and link.loss_rate() == 0
+
+def test_link_log(tmp_path):
+    link = LinkStats()
+    log = LinkLog(str(tmp_path / "link.log"), period=10)
+    link.packet(1, 0)
+    link.packet(3, 1)
+    log.update(link, 100)
+    log.update(link, 105) #not due
+    log.update(link, 111)
+    lines = (tmp_path / "link.log").read_text().splitlines()
+    assert lines[0] == LinkLog.HEADER.strip()
+    assert len(lines) == 3
+    assert lines[1].split(",")[1:4] == ["2", "1", "33.33"]
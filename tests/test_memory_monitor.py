@@ -0,0 +1,19 @@
+import numpy as np
+
+from memory_monitor import memory_mb, size_text
+
+
+def test_memory_mb_is_current_not_peak():
+    before = memory_mb()
+    block = np.ones(200 * 1024 * 1024 // 8) #200MB, big enough to be mapped and given straight back when freed
+    during = memory_mb()
+    del block
+    after = memory_mb()
+    assert np.isfinite(before)
+    assert during - before > 150
+    assert during - after > 150
+
+def test_size_text():
+    assert size_text(512) == "512B"
+    assert size_text(2048) == "2.0KB"
+    assert size_text(3 * 1024 ** 3) == "3.0GB"
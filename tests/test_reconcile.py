@@ -0,0 +1,77 @@
+import numpy as np
+
+from session_log import SessionLog
+from reconcile import read_sd_log, read_radio_logs, pair_runs, reconcile, overlapping, COLUMNS
+from conftest import packet_line
+
+T0 = 1700000000.0
+
+
+def write_sd(tmp_path, packets): #packets: [(count, mission, pressure)]
+    path = tmp_path / "sd_log.csv"
+    path.write_text("".join(packet_line(count, mission=mission, pressure=pressure) + "\n" for count, mission, pressure in packets))
+    return str(path)
+
+def write_radio(tmp_path, name, packets):
+    log = SessionLog(name, str(tmp_path))
+    for count, mission, pressure in packets:
+        log.write(packet_line(count, mission=mission, pressure=pressure) + "\n")
+        log.end_line(count, T0 + mission)
+    log.close()
+    return log.path
+
+def column(rows, name):
+    return [row[COLUMNS.index(name)] for row in rows]
+
+
+def test_overlapping_pairs_only_overlapping_spans():
+    a = [[0, 10, 0], [20, 30, 1], [100, 200, 2]]
+    b = [[5, 25, 0], [40, 50, 1], [150, 160, 2]]
+    assert sorted(overlapping(a, b)) == [[0, 0], [1, 0], [2, 2]]
+    assert overlapping(a, []) == [] and overlapping([], b) == []
+
+def test_repeated_packet_counts_pair_with_the_right_run(tmp_path):
+    #the payload restarted, both runs count 1 to 60 over the same mission times but at different pressures
+    first = [(i, i, 101.0) for i in range(1, 61)]
+    second = [(i, i, 95.0) for i in range(1, 61)]
+    sd = read_sd_log(write_sd(tmp_path, first + second))
+    radio = read_radio_logs([write_radio(tmp_path, "10-00-00_01-01-2026.csv", [p for p in first if not 10 <= p[0] < 15]),
+                             write_radio(tmp_path, "11-00-00_01-01-2026.csv", [p for p in second if p[0] not in [40, 41]])])
+    assert list(np.unique(sd.run)) == [0, 1] and list(np.unique(radio.run)) == [0, 1]
+    assert pair_runs(sd, radio) == [[0, 0], [1, 1]]
+
+    rows, summary = reconcile(sd, radio)
+    assert len(rows) == 120
+    assert column(rows, "Disagrees") == [""] * 120
+    sources = column(rows, "Source")
+    runs = column(rows, "Run")
+    assert sum(1 for run, source in zip(runs, sources) if run == 0 and source == "sd") == 5
+    assert sum(1 for run, source in zip(runs, sources) if run == 1 and source == "sd") == 2
+    assert [float(p) for run, p in zip(runs, column(rows, "Pressure")) if run == 1] == [95.0] * 60
+    assert "5 filled from SD" in summary[0] and "2 filled from SD" in summary[1]
+
+def test_wrapping_packet_count_splits_the_run(tmp_path):
+    #packet count wraps at 50 while mission time carries on, count 5 is sent twice at very different pressures
+    packets = [(mission % 50, mission, 101.0 - mission * 0.05) for mission in range(80)]
+    sd = read_sd_log(write_sd(tmp_path, packets))
+    radio = read_radio_logs([write_radio(tmp_path, "10-00-00_01-01-2026.csv", packets)])
+    assert list(np.unique(sd.run)) == [0, 1]
+    assert pair_runs(sd, radio) == [[0, 0], [1, 1]]
+    rows, summary = reconcile(sd, radio)
+    assert len(rows) == 80
+    assert column(rows, "Source") == ["radio+sd"] * 80
+    assert column(rows, "Disagrees") == [""] * 80
+
+def test_sd_log_without_packet_counts_joins_on_mission_time(tmp_path):
+    packets = [(i, 1000 + i, 101.0) for i in range(1, 61)]
+    sd = read_sd_log(write_sd(tmp_path, [(0, mission, pressure) for count, mission, pressure in packets])) #main board, count always 0
+    radio = read_radio_logs([write_radio(tmp_path, "10-00-00_01-01-2026.csv", packets[:20] + packets[30:])])
+    rows, summary = reconcile(sd, radio)
+    assert "joined on mission time" in summary[0]
+    assert column(rows, "Source").count("sd") == 10
+    assert column(rows, "Disagrees") == [""] * 60
+
+def test_runs_that_dont_overlap_are_not_paired(tmp_path):
+    sd = read_sd_log(write_sd(tmp_path, [(i, i, 101.0) for i in range(1, 61)]))
+    radio = read_radio_logs([write_radio(tmp_path, "10-00-00_01-01-2026.csv", [(i, 5000 + i, 101.0) for i in range(1, 61)])])
+    assert pair_runs(sd, radio) == [[0, None], [None, 0]]
@@ -0,0 +1,93 @@
+import time
+import pytest
+
+from render_scheduler import RenderScheduler, DETAIL_LEVELS, TARGET_FPS, MIN_FPS, ADAPT_PERIOD
+
+
+class Clock(): #stands in for time.perf_counter
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "perf_counter", clock)
+    return clock
+
+def draw(scheduler, clock, cost, late=0.0): #waits for the next frame (plus late s), then draws one taking cost s
+    clock.now = max(clock.now, scheduler.next_frame) + late
+    assert scheduler.due()
+    scheduler.start()
+    clock.now += cost
+    scheduler.finish()
+
+def run(scheduler, clock, cost, seconds): #draws frames for seconds, returns every [level, fps] the scheduler went through
+    end = clock.now + seconds
+    states = [[scheduler.level, scheduler.fps]]
+    while clock.now < end:
+        draw(scheduler, clock, cost)
+        if [scheduler.level, scheduler.fps] != states[-1]:
+            states.append([scheduler.level, scheduler.fps])
+    return states
+
+
+def test_frames_on_time_drop_nothing(clock):
+    scheduler = RenderScheduler()
+    for i in range(100):
+        draw(scheduler, clock, 0.001)
+    assert scheduler.dropped == 0
+    assert scheduler.frames == 100
+    assert scheduler.stats()[3:] == [100, 0]
+
+def test_late_frames_count_whole_periods_missed(clock):
+    scheduler = RenderScheduler()
+    draw(scheduler, clock, 0.001)
+    draw(scheduler, clock, 0.001, late=3.5 / TARGET_FPS) #started three and a half frames late
+    assert scheduler.dropped == 3
+    draw(scheduler, clock, 0.001) #doesnt try to catch up
+    assert scheduler.dropped == 3
+    assert not scheduler.due()
+
+def test_not_due_until_the_next_frame(clock):
+    scheduler = RenderScheduler()
+    draw(scheduler, clock, 0.001)
+    clock.now = scheduler.next_frame - 1e-6
+    assert not scheduler.due()
+    clock.now = scheduler.next_frame
+    assert scheduler.due()
+
+def test_detail_is_lowered_before_the_frame_rate(clock):
+    scheduler = RenderScheduler()
+    states = run(scheduler, clock, 0.5, 30) #far too slow for any frame rate
+    levels = [level for level, fps in states]
+    fps = [fps for level, fps in states]
+    assert levels == sorted(levels) and fps == sorted(fps, reverse=True)
+    first_fps_change = fps.index(next(f for f in fps if f != TARGET_FPS))
+    assert levels[first_fps_change - 1] == len(DETAIL_LEVELS) - 1 #every detail level was used up first
+    assert states[-1] == [len(DETAIL_LEVELS) - 1, MIN_FPS]
+    assert scheduler.detail() == DETAIL_LEVELS[-1]
+
+def test_frame_rate_is_raised_before_detail(clock):
+    scheduler = RenderScheduler()
+    run(scheduler, clock, 0.5, 30)
+    states = run(scheduler, clock, 0.0001, 60) #cheap again
+    levels = [level for level, fps in states]
+    fps = [fps for level, fps in states]
+    assert levels == sorted(levels, reverse=True) and fps == sorted(fps)
+    first_level_change = levels.index(next(l for l in levels if l != levels[0]))
+    assert fps[first_level_change - 1] == TARGET_FPS #frame rate fully back first
+    assert states[-1] == [0, TARGET_FPS]
+
+def test_one_change_per_adapt_period(clock):
+    scheduler = RenderScheduler()
+    states = run(scheduler, clock, 0.5, ADAPT_PERIOD * 0.9)
+    assert len(states) == 2 #the first frame changes it, none of the rest in that period
+
+def test_frames_within_budget_change_nothing(clock):
+    scheduler = RenderScheduler()
+    states = run(scheduler, clock, 0.3 / TARGET_FPS, 10) #between RECOVER and BUDGET of the frame period
+    assert states == [[0, TARGET_FPS]]
+    assert scheduler.frame_time == pytest.approx(0.3 / TARGET_FPS)
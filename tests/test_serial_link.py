@@ -0,0 +1,129 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+import serial
+
+import serial_link
+from serial_link import SerialConnection, probe
+from conftest import packet_line
+
+
+class FakePort(): #a serial port that sends out lines, or answers +++ like an xbee
+    opened = []
+
+    def __init__(self, port, BAUD=115200, timeout=None):
+        if port not in PORTS:
+            raise serial.SerialException("no port " + port)
+        self.port = port
+        self.timeout = timeout
+        self.closed = False
+        self.buffer = PORTS[port]["sends"]
+        self.written = b""
+        FakePort.opened.append(self)
+
+    @property
+    def in_waiting(self):
+        return len(self.buffer)
+
+    def read(self, size=1):
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        if not data: time.sleep(0.001)
+        return data
+
+    def write(self, data):
+        self.written += data
+        if data == b"+++" and PORTS[self.port]["xbee"]:
+            self.buffer += b"OK\r"
+
+    def reset_input_buffer(self):
+        self.buffer = b""
+
+    def close(self):
+        self.closed = True
+
+PORTS = {}
+
+
+@pytest.fixture
+def ports(monkeypatch):
+    PORTS.clear()
+    FakePort.opened = []
+    monkeypatch.setattr(serial, "Serial", FakePort)
+    monkeypatch.setattr(serial.tools.list_ports, "comports", lambda: [SimpleNamespace(device=name, vid=None) for name in PORTS])
+    monkeypatch.setattr(serial_link, "PROBE_SECONDS", 0.05)
+    monkeypatch.setattr(serial_link, "GUARD_TIME", 0.01)
+    return PORTS
+
+def wait_for(condition, seconds=2):
+    end = time.time() + seconds
+    while not condition() and time.time() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_probe_finds_telemetry(ports):
+    ports["COM1"] = {"sends": (packet_line(1) + "\r\n").encode(), "xbee": False}
+    ser, data = probe("COM1", 115200, 0.05)
+    assert data == (packet_line(1) + "\r\n").encode()
+
+def test_probe_finds_a_quiet_xbee(ports):
+    ports["COM1"] = {"sends": b"", "xbee": True}
+    ser, data = probe("COM1", 115200, 0.05)
+    assert ser.written == b"+++ATCN\r" #taken back out of command mode
+
+def test_probe_rejects_other_ports(ports):
+    ports["COM1"] = {"sends": b"", "xbee": False}
+    ports["COM2"] = {"sends": b"GPS,123\r\n", "xbee": False}
+    assert probe("COM1", 115200, 0.05) is None
+    assert probe("COM2", 115200, 0.05) is None
+    assert all(port.closed for port in FakePort.opened)
+
+def test_connects_only_to_a_port_that_passes_probe(ports):
+    ports["COM1"] = {"sends": b"", "xbee": False}
+    ports["COM2"] = {"sends": (packet_line(1) + "\n").encode(), "xbee": False}
+    link = SerialConnection("COM1")
+    try:
+        assert wait_for(lambda: link.connected)
+        assert link.port == "COM2"
+    finally:
+        link.close()
+
+def test_a_single_silent_port_is_not_used(ports):
+    ports["COM1"] = {"sends": b"", "xbee": False}
+    link = SerialConnection()
+    try:
+        assert wait_for(lambda: len(FakePort.opened) >= 2) #keeps rescanning
+        assert not link.connected
+        assert link.state == "Searching"
+    finally:
+        link.close()
+
+def test_a_port_opened_as_it_closes_is_closed(ports, monkeypatch):
+    ports["COM1"] = {"sends": (packet_line(1) + "\n").encode(), "xbee": False}
+    links = []
+    def probe_then_close(port, BAUD):
+        ser = FakePort(port)
+        wait_for(lambda: links)
+        links[0].close()
+        return ser, b""
+    monkeypatch.setattr(serial_link, "probe", probe_then_close)
+    link = SerialConnection("COM1")
+    links.append(link)
+    link.thread.join(2)
+    assert not link.connected
+    assert FakePort.opened and all(port.closed for port in FakePort.opened)
+
+def test_what_the_probe_heard_is_read_first(ports):
+    heard = b"...,NONE\n" + (packet_line(1) + "\n" + packet_line(2)[:20]).encode() #the end of one packet, a whole one and the start of the next
+    ports["COM1"] = {"sends": heard, "xbee": False}
+    link = SerialConnection("COM1")
+    try:
+        assert wait_for(lambda: link.connected)
+        FakePort.opened[-1].buffer += packet_line(2)[20:].encode() + b"\n"
+        data = b""
+        while b"\n" not in data[-1:] or data.count(b"\n") < 3:
+            data += link.read(link.in_waiting or 1)
+        assert data == heard + packet_line(2)[20:].encode() + b"\n"
+    finally:
+        link.close()
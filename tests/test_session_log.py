@@ -0,0 +1,81 @@
+import numpy as np
+
+import session_log
+from session_log import SessionLog, read_session_tail, read_session_range, load_session, is_indexed
+from telemetry import TelemetryStore, FIELD_INDEX
+from conftest import packet_line
+
+T0 = 1700000000.0
+
+
+def write_session(log_dir, n, name="12-00-00_01-01-2026.csv"): #n packets received a second apart from T0, packet counts from 1
+    log = SessionLog(name, str(log_dir))
+    for i in range(n):
+        log.write(packet_line(i + 1, altitude=i) + "\n")
+        log.end_line(i + 1, T0 + i)
+    return log
+
+def counts(msgs):
+    return [int(msg[FIELD_INDEX["Packet Count"]]) for msg in msgs]
+
+
+def test_tail_of_indexed_log(tmp_path):
+    log = write_session(tmp_path, 100)
+    times, msgs = read_session_tail(log.path, 30)
+    assert counts(msgs) == list(range(70, 101))
+    assert np.array_equal(times, T0 + np.arange(69, 100))
+    assert is_indexed(log.path)
+    log.close()
+
+def test_tail_across_rotated_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_log, "SEGMENT_BYTES", 2000) #a segment every 15 or so packets
+    log = write_session(tmp_path, 100)
+    log.compressor.wait()
+    assert len(session_log.session_segments(log.path)) > 5
+    times, msgs = read_session_tail(log.path, 50)
+    assert counts(msgs) == list(range(50, 101))
+    times, msgs = read_session_tail(log.path)
+    assert counts(msgs) == list(range(1, 101))
+    assert np.all(np.diff(times) == 1)
+    times, msgs = read_session_range(log.path, T0 + 20, T0 + 40)
+    assert counts(msgs) == list(range(21, 41))
+    log.close()
+
+def test_tail_of_closed_session(tmp_path):
+    log = write_session(tmp_path, 40)
+    path = log.path
+    log.close() #everything is in compressed segments now
+    times, msgs = read_session_tail(path, 5)
+    assert counts(msgs) == list(range(35, 41))
+
+def test_load_session_fills_store(tmp_path):
+    log = write_session(tmp_path, 100)
+    store = TelemetryStore()
+    times, msgs = load_session(log.path, store, 10)
+    assert store.n == 11
+    assert list(store.channel("Packet Count")) == list(range(90, 101))
+    assert store.channel("Altitude")[-1] == 99
+    assert np.array_equal(store.time(), times)
+    log.close()
+
+def test_unindexed_log_is_timed_from_its_last_packet(tmp_path):
+    path = tmp_path / "old_log.csv"
+    missions = list(range(1, 21)) + list(range(25, 35)) #a 4s gap
+    path.write_text("".join(packet_line(i + 1, mission=m) + "\n" for i, m in enumerate(missions)) + "3130,half a line")
+    assert not is_indexed(str(path))
+    times, msgs = read_session_tail(str(path))
+    assert len(msgs) == 30
+    assert times[-1] == 0 and times[0] == -(34 - 1)
+    times, msgs = read_session_tail(str(path), 5)
+    assert counts(msgs) == list(range(25, 31))
+
+def test_latest_session_skips_unindexed_logs(tmp_path):
+    log = write_session(tmp_path, 5)
+    log.close()
+    legacy = tmp_path / "23-00-00_01-01-2026.csv" #written after, but from before indexes
+    legacy.write_text("".join(packet_line(i) + "\n" for i in range(1, 6)))
+    assert session_log.latest_session(str(tmp_path)) == log.path
+    legacy_only = tmp_path / "legacy"
+    legacy_only.mkdir()
+    (legacy_only / legacy.name).write_text(legacy.read_text())
+    assert session_log.latest_session(str(legacy_only)) is None
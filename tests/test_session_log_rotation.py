@@ -0,0 +1,87 @@
+import os, json, hashlib
+import numpy as np
+
+import session_log
+from session_log import SessionLog, session_segments, iter_session_lines, load_index, manifest_path, empty_sessions, prune_empty_sessions, INDEX_DTYPE
+from conftest import packet_line
+
+T0 = 1700000000.0
+NAME = "12-00-00_01-01-2026.csv"
+
+
+def write_packets(log, first, n):
+    for i in range(first, first + n):
+        log.write(packet_line(i) + "\n")
+        log.end_line(i, T0 + i)
+
+
+def test_rotation_compresses_and_records_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr(session_log, "SEGMENT_BYTES", 1500)
+    log = SessionLog(NAME, str(tmp_path))
+    write_packets(log, 1, 50)
+    log.close()
+
+    segments = session_segments(log.path)
+    assert segments and all(segment.endswith(".csv.xz") for segment in segments)
+    assert not os.path.exists(log.path)
+    with open(manifest_path(str(tmp_path), "12-00-00_01-01-2026")) as file:
+        manifest = json.load(file)["segments"]
+    assert [entry["segment"] for entry in manifest] == list(range(len(segments)))
+    assert sum(entry["packets"] for entry in manifest) == 50
+    assert manifest[0]["first_packet"] == 1 and manifest[-1]["last_packet"] == 50
+    for entry in manifest:
+        with open(tmp_path / entry["file"], "rb") as file:
+            assert hashlib.sha256(file.read()).hexdigest() == entry["sha256"]
+
+    lines = list(iter_session_lines(log.path))
+    assert lines == [(packet_line(i) + "\n").encode() for i in range(1, 51)]
+
+def test_index_points_at_each_packet(tmp_path):
+    log = SessionLog(NAME, str(tmp_path))
+    log.write("garbage before the first packet\n")
+    log.end_line() #not a packet, not indexed
+    write_packets(log, 1, 5)
+    index = load_index(log.path)
+    assert list(index["packet"]) == [1, 2, 3, 4, 5]
+    with open(log.path, "rb") as file:
+        data = file.read()
+    for record in index:
+        assert data[record["offset"]:].startswith(b"3130,")
+
+    with open(session_log.index_path(log.path), "ab") as file: #a crash half way through writing a record
+        file.write(b"\x00" * (INDEX_DTYPE.itemsize // 2))
+    assert len(load_index(log.path)) == 5
+    log.close()
+
+def test_index_records_rssi(tmp_path):
+    log = SessionLog(NAME, str(tmp_path))
+    log.write(packet_line(1) + "\n")
+    log.end_line(1, T0, -67)
+    log.write(packet_line(2) + "\n")
+    log.end_line(2, T0 + 1) #transparent mode
+    index = load_index(log.path)
+    assert index["rssi"][0] == -67 and np.isnan(index["rssi"][1])
+    log.close()
+
+def test_existing_session_is_continued(tmp_path):
+    log = SessionLog(NAME, str(tmp_path))
+    write_packets(log, 1, 3)
+    log.close()
+    log = SessionLog(NAME, str(tmp_path))
+    write_packets(log, 4, 3)
+    log.close()
+    assert len(session_segments(log.path)) == 2
+    assert len(list(iter_session_lines(log.path))) == 6
+
+def test_logging_never_deletes_other_sessions(tmp_path):
+    (tmp_path / "09-00-00_01-01-2026.csv").write_bytes(b"")
+    (tmp_path / "09-00-00_01-01-2026.idx").write_bytes(b"")
+    log = SessionLog(NAME, str(tmp_path))
+    write_packets(log, 1, 2)
+    assert os.path.exists(tmp_path / "09-00-00_01-01-2026.csv")
+    assert empty_sessions(str(tmp_path)) == ["09-00-00_01-01-2026"]
+    log.close()
+
+    assert prune_empty_sessions(str(tmp_path)) == 1
+    assert sorted(os.listdir(tmp_path))[0].startswith("12-00-00")
+    assert len(list(iter_session_lines(log.path))) == 2
@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pytest
+
+from session_log import SessionLog
+from simp_profile import (model_profile, validate_profile, write_commands, load_commands, read_commands, check_playback, pressure_to_altitude,
+                          SCRIPT_DIR, SIMP_FILE, ALTITUDE_TOLERANCE)
+from conftest import packet_line
+
+T0 = 1700000000.0
+
+
+def write_playback(tmp_path, altitudes, before=5): #a session where the payload is in simulation mode reporting altitudes at 1Hz, after some packets in flight mode
+    log = SessionLog("12-00-00_01-01-2026.csv", str(tmp_path))
+    for i in range(before + len(altitudes)):
+        simulating = i >= before
+        log.write(packet_line(i + 1, altitude=altitudes[i - before] if simulating else 3.0, mode="S" if simulating else "F") + "\n")
+        log.end_line(i + 1, T0 + i)
+    log.close()
+    return log.path
+
+@pytest.fixture
+def commands(tmp_path):
+    path = str(tmp_path / "simp_commands.txt")
+    write_commands(path, model_profile())
+    return path
+
+
+def test_model_profile_round_trips_through_the_command_file(commands):
+    profile = model_profile()
+    assert validate_profile(profile) == []
+    lines = load_commands(commands)
+    assert len(lines) == len(profile)
+    assert all(line.startswith("CMD,3130,SIMP,") and line.endswith("\n") for line in lines)
+    assert np.array_equal(read_commands(commands), np.round(profile))
+    assert validate_profile(read_commands(commands)) == []
+    assert np.max(pressure_to_altitude(read_commands(commands), read_commands(commands)[0])) == pytest.approx(725, abs=1)
+
+def test_committed_commands_are_the_default_model(commands): #README.md says data/simp_commands.txt is python simp_profile.py model
+    with open(os.path.join(SCRIPT_DIR, "data", SIMP_FILE)) as committed, open(commands) as made:
+        assert committed.read() == made.read()
+
+def test_validate_profile_finds_problems():
+    profile = model_profile()
+    glitch = profile.copy()
+    glitch[50] -= 20000
+    assert any("Pa/s" in problem for problem in validate_profile(glitch))
+    assert any("ground" in problem for problem in validate_profile(profile[40:]))
+    assert validate_profile(profile[:1]) != []
+
+def test_check_playback_finds_a_known_lag(tmp_path, commands):
+    expected = pressure_to_altitude(read_commands(commands), read_commands(commands)[0])
+    lag = 3
+    reported = np.concatenate([np.zeros(lag), expected]) #the payload takes 3 packets to act on each command
+    packets, found, rms, worst = check_playback(write_playback(tmp_path, reported), commands)
+    assert packets == len(reported)
+    assert found == lag
+    assert rms < 0.01 and worst < 0.01
+
+def test_check_playback_fails_a_wrong_curve(tmp_path, commands):
+    expected = pressure_to_altitude(read_commands(commands), read_commands(commands)[0])
+    packets, found, rms, worst = check_playback(write_playback(tmp_path, expected * 1.1), commands)
+    assert rms > ALTITUDE_TOLERANCE
+
+def test_check_playback_with_no_simulation_packets(tmp_path, commands):
+    packets, found, rms, worst = check_playback(write_playback(tmp_path, [], before=10), commands)
+    assert packets == 0 and np.isnan(rms)
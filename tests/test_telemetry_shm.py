@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pytest
+
+import telemetry_shm
+from telemetry_shm import TelemetryRingWriter, TelemetryRingReader
+from telemetry import NUMERIC_FIELDS
+
+
+def values(i):
+    return np.full(len(NUMERIC_FIELDS), float(i))
+
+@pytest.fixture
+def name():
+    return "gcs_test_" + str(os.getpid())
+
+@pytest.fixture
+def writer(name):
+    writer = TelemetryRingWriter(name, capacity=8)
+    yield writer
+    writer.close()
+
+
+def test_latest_is_oldest_first(writer, name):
+    reader = TelemetryRingReader(name)
+    for i in range(5):
+        writer.write(values(i), recv_time=100 + i)
+    records = reader.latest(3)
+    assert list(records["seq"]) == [2, 3, 4]
+    assert list(records["Altitude"]) == [2, 3, 4]
+    assert list(reader.latest(100)["seq"]) == [0, 1, 2, 3, 4]
+    reader.close()
+
+def test_read_new_counts_overruns(writer, name):
+    reader = TelemetryRingReader(name)
+    writer.write(values(0))
+    assert list(reader.read_new()["seq"]) == [0]
+    assert len(reader.read_new()) == 0
+    for i in range(1, 21):
+        writer.write(values(i))
+    records = reader.read_new()
+    assert reader.overruns == 1 and reader.lost == 12
+    assert list(records["seq"]) == list(range(13, 21))[1:] #the oldest slot is the next one written so isnt trusted
+    reader.close()
+
+def test_record_being_written_is_dropped(writer, name):
+    reader = TelemetryRingReader(name)
+    for i in range(6):
+        writer.write(values(i))
+    i = 3 % writer.capacity
+    writer.records["seq"][i + writer.capacity] = np.nan #writer part way through rewriting record 3
+    records = reader.latest(6)
+    assert list(records["seq"]) == [0, 1, 2, 4, 5]
+    assert reader.torn == 1
+    reader.close()
+
+def test_lapped_record_is_dropped(writer, name):
+    reader = TelemetryRingReader(name)
+    for i in range(8):
+        writer.write(values(i))
+    view = reader.records[writer.capacity:2 * writer.capacity]
+    assert not reader.is_intact(view) #record 0 is the next to be overwritten
+    assert reader.is_intact(view[1:])
+    writer.write(values(8)) #laps record 0
+    assert not reader.is_intact(view)
+    reader.close()
+
+def test_reader_follows_a_restarted_writer(name, monkeypatch):
+    monkeypatch.setattr(telemetry_shm, "REATTACH_PERIOD", 0)
+    first = TelemetryRingWriter(name, capacity=8)
+    reader = TelemetryRingReader(name)
+    first.write(values(1))
+    assert reader.writer_pid() == os.getpid()
+    assert list(reader.read_new()["Altitude"]) == [1]
+    first.close()
+
+    second = TelemetryRingWriter(name, capacity=16)
+    second.write(values(7))
+    second.write(values(8))
+    assert list(reader.read_new()["Altitude"]) == [7, 8]
+    assert reader.restarts == 1 and reader.capacity == 16
+    reader.close()
+    second.close()
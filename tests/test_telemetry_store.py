@@ -0,0 +1,169 @@
+import numpy as np
+import pytest
+
+from telemetry import TelemetryStore, level_of_detail, NUMERIC_FIELDS
+
+COUNT = NUMERIC_FIELDS.index("Packet Count")
+ALTITUDE = NUMERIC_FIELDS.index("Altitude")
+
+
+def row(count, altitude=0.0):
+    values = np.zeros(len(NUMERIC_FIELDS))
+    values[COUNT] = count
+    values[ALTITUDE] = altitude
+    return values
+
+def fill(store, counts, t0=0.0): #a packet a second from t0
+    for i, count in enumerate(counts):
+        store.append(row(count, altitude=t0 + i), t0 + i)
+
+
+def test_memory_stays_bounded_under_the_retention_window():
+    store = TelemetryStore(capacity=16, retention=60)
+    fill(store, range(1, 1001))
+    size = len(store.times)
+    fill(store, range(1001, 20001), t0=1000)
+    assert len(store.times) == size #capacity stopped growing once the window filled
+    assert size <= 4 * 64
+    assert store.spilled
+    assert store.time()[-1] == 20000 - 1
+    assert store.time()[0] >= store.time()[-1] - size #only the window and the room kept free
+    assert np.array_equal(store.channel("Altitude"), store.time())
+
+def test_without_retention_everything_is_kept():
+    store = TelemetryStore(capacity=4)
+    fill(store, range(1, 101))
+    assert store.n == 100 and not store.spilled
+
+def test_count_start_after_rows_are_dropped():
+    store = TelemetryStore(capacity=16, retention=20)
+    fill(store, range(100, 130)) #restarts at t=30 with the old run still partly in memory
+    fill(store, range(1, 6), t0=30)
+    assert store.values[store.count_start, COUNT] == 1
+    assert store.values[store.count_start - 1, COUNT] == 129
+    first, last = store.packet_window(2, 3)
+    assert list(store.values[first:last, COUNT]) == [2, 3]
+
+    fill(store, range(6, 200), t0=35) #the restart has been dropped from memory
+    assert store.count_start == 0
+    counts = store.channel("Packet Count")
+    assert np.all(np.diff(counts) > 0)
+    first, last = store.packet_window(190, 192)
+    assert list(store.values[first:last, COUNT]) == [190, 191, 192]
+    assert store.packet_window(150, 152)[0] == store.packet_window(150, 152)[1] #paged out, nothing in memory
+
+
+class Pager(): #stands in for session_log.read_session_values, rows from a reference history
+    def __init__(self, times, values):
+        self.times, self.values = times, values
+        self.calls = []
+
+    def __call__(self, start, stop):
+        self.calls.append([start, stop])
+        keep = (self.times >= start) & (self.times < stop)
+        return self.times[keep], self.values[keep]
+
+@pytest.fixture
+def paged_store():
+    store = TelemetryStore(capacity=16, retention=30)
+    fill(store, range(1, 101))
+    times = np.arange(100.0)
+    store.pager = Pager(times, np.array([row(i + 1, altitude=i) for i in range(100)]))
+    return store
+
+def test_history_pages_in_older_rows(paged_store):
+    store = paged_store
+    oldest = store.time()[0]
+    history = store.history(10)
+    assert np.array_equal(history.time(), np.arange(10.0, oldest))
+    assert np.array_equal(history.channel("Packet Count"), np.arange(11.0, oldest + 1))
+    assert store.value_at(12.5)["Altitude"] == 12
+    assert store.value_at(oldest + 0.5)["Altitude"] == oldest
+    assert "History" in store.nbytes()
+
+def test_history_is_cached_until_it_is_stale(paged_store):
+    store = paged_store
+    store.history(10)
+    store.history(20) #already have it
+    assert len(store.pager.calls) == 1
+    store.history(5) #further back than read
+    assert len(store.pager.calls) == 2
+
+    fill(store, range(101, 201), t0=100) #memory has moved on so the history read no longer reaches it
+    store.pager.times = np.arange(200.0)
+    store.pager.values = np.array([row(i + 1, altitude=i) for i in range(200)])
+    history = store.history(5)
+    assert len(store.pager.calls) == 3
+    assert history.time()[-1] == store.time()[0] - 1
+
+def test_clear_drops_history_and_never_pages_before_it(paged_store):
+    store = paged_store
+    store.history(10)
+    store.clear()
+    assert store.history(10) is None #nothing spilled since
+    assert store.value_at(12.5) == {}
+    store.pager.times = np.arange(200.0)
+    store.pager.values = np.array([row(i + 1, altitude=i) for i in range(200)])
+    fill(store, range(101, 201), t0=100)
+    history = store.history(0)
+    assert history.time()[0] == 100
+    assert store.pager.calls[-1][0] > 99
+
+def test_history_without_a_pager():
+    store = TelemetryStore(capacity=16, retention=10)
+    fill(store, range(1, 100))
+    assert store.history(0) is None
+
+
+def test_window_on_an_empty_store():
+    store = TelemetryStore()
+    assert store.window(0, 10) == (0, 0)
+    assert store.packet_window(1, 10) == (0, 0)
+    assert store.value_at(5) == {}
+    assert np.isnan(store.latest("Altitude"))
+
+def test_window_edges():
+    store = TelemetryStore(capacity=8)
+    fill(store, range(1, 9)) #full, t 0 to 7
+    assert store.n == len(store.times)
+    assert store.window(2, 4) == (1, 6) #a row either side
+    assert store.window(-10, 100) == (0, 8)
+    assert store.window(-10, -5) == (0, 1)
+    assert store.window(50, 60) == (7, 8)
+    assert store.window(0, 7) == (0, 8)
+
+def test_packet_window_after_a_payload_restart():
+    store = TelemetryStore()
+    fill(store, range(1, 11))
+    fill(store, range(1, 6), t0=10) #counts repeat after the restart
+    assert store.count_start == 10
+    first, last = store.packet_window(2, 4)
+    assert (first, last) == (11, 14)
+    assert list(store.time()[first:last]) == [11, 12, 13]
+
+def test_restart_found_by_extend():
+    store = TelemetryStore()
+    store.extend(np.array([row(c) for c in [5, 6, 7, 1, 2]]), np.arange(5.0))
+    assert store.count_start == 3
+    store.extend(np.array([row(c) for c in [3, 1]]), np.arange(5.0, 7.0)) #restart on the last row
+    assert store.count_start == 6
+
+
+def test_level_of_detail_keeps_spikes_and_gaps():
+    t = np.arange(10000.0)
+    values = np.zeros(10000)
+    values[4321] = 100.0
+    values[6000] = -50.0
+    values[7000:7100] = np.nan
+    lt, lv = level_of_detail(t, values, 500)
+    assert len(lt) <= 600
+    assert np.all(np.diff(lt) > 0)
+    assert 100.0 in lv and -50.0 in lv
+    assert np.any(np.isnan(lv)) #the gap still breaks the line
+    assert lt[0] == t[0] and lt[-1] == t[-1] #the line still runs to both ends when they are flat
+
+def test_level_of_detail_leaves_short_lines_alone():
+    t = np.arange(100.0)
+    values = np.sin(t)
+    lt, lv = level_of_detail(t, values, 500)
+    assert lt is t and lv is values
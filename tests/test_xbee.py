@@ -0,0 +1,65 @@
+import os
+import time
+import queue
+import pytest
+
+import xbee
+from xbee import XbeeDriver
+import acquisition
+from acquisition import XbeeDriverProcess
+from simp_profile import model_profile, write_commands, load_commands, SIMP_FILE
+from telemetry_shm import TelemetryRingReader
+from conftest import packet_line, FakeConnection
+
+
+@pytest.fixture
+def driver(tmp_path, monkeypatch):
+    monkeypatch.setattr(xbee, "SerialConnection", FakeConnection)
+    monkeypatch.setattr(xbee, "SCRIPT_DIR", str(tmp_path))
+    (tmp_path / "logs").mkdir()
+    driver = XbeeDriver(shm_name="gcs_test_xbee_" + str(os.getpid()), filename="12-00-00_01-01-2026.csv", verbose=False)
+    yield driver
+    driver.close()
+
+
+def test_only_whole_packets_are_published(driver):
+    reader = TelemetryRingReader(driver.shm_writer.name)
+    driver.line_received(packet_line(1, altitude=12.5), 100.0)
+    short = packet_line(2).rsplit(",", 3)[0] #fields missing from the end, the CMD echo is still split right
+    driver.line_received(short, 101.0)
+    records = reader.latest(10)
+    assert list(records["Packet Count"]) == [1]
+    assert list(records["Altitude"]) == [12.5]
+    assert driver.get_recv_count() == 2 #still passed on, the GUI drops it
+    reader.close()
+
+def test_simp_starts_from_the_position_given(driver): #where a restarted acquisition process picks the profile back up
+    os.mkdir(os.path.join(xbee.SCRIPT_DIR, "data"))
+    path = os.path.join(xbee.SCRIPT_DIR, "data", SIMP_FILE)
+    write_commands(path, model_profile())
+    driver.start_simp(50)
+    deadline = time.time() + 5
+    while driver._toSendSimp == "" and time.time() < deadline:
+        time.sleep(0.01)
+    assert driver._toSendSimp == load_commands(path)[50]
+    assert driver.simp_state and driver.simp_c == 51
+
+
+class Context(): #stands in for the spawn context, nothing is started
+    Queue = queue.Queue
+    class Process():
+        def __init__(self, **kwargs): pass
+        def start(self): pass
+
+def test_restarted_process_resumes_simp(monkeypatch):
+    monkeypatch.setattr(acquisition.multiprocessing, "get_context", lambda method: Context())
+    process = XbeeDriverProcess(shm_name=None)
+    process.start_simp()
+    assert process._from_gui.get_nowait() == ["simp", True, 0]
+    process._to_gui.put(["heartbeat", 0, 0, "-", "Connected", None, 0, 0, 0, 120])
+    process._collect()
+    process._start() #restarted
+    assert process._from_gui.get_nowait() == ["simp", True, 119] #the last command again in case it never went out
+    process._to_gui.put(["heartbeat", 0, 0, "-", "Connected", None, 0, 0, 0, None]) #hasnt picked the profile back up yet
+    process._collect()
+    assert process.simp_position == 120
@@ -0,0 +1,125 @@
+import io
+
+import pytest
+
+from xbee_api import (escape, unescape, build_frame, checksum, tx_request, parse_frame, FrameParser, ApiTransport,
+                      START, RX_64, RX_16, RX, TX_STATUS, TX_STATUS_15_4, TX, TX_16)
+from conftest import packet_line
+
+SOURCE_64 = 0x0013A20041B2C3D4
+ALL_ESCAPED = bytes([0x7E, 0x7D, 0x11, 0x13])
+
+
+def rx64(data, rssi=60, source=SOURCE_64):
+    return bytes([RX_64]) + source.to_bytes(8, "big") + bytes([rssi, 0]) + data
+
+def rx16(data, rssi=60, source=0x1234):
+    return bytes([RX_16]) + source.to_bytes(2, "big") + bytes([rssi, 0]) + data
+
+def rx(data, source=SOURCE_64):
+    return bytes([RX]) + source.to_bytes(8, "big") + bytes([0xFF, 0xFE, 0x01]) + data
+
+
+@pytest.mark.parametrize("data", [b"", b"plain", ALL_ESCAPED, ALL_ESCAPED * 3 + b"x", bytes(range(256))])
+def test_escape_round_trip(data):
+    escaped = escape(data)
+    assert unescape(escaped) == data
+    assert all(byte not in escaped for byte in [0x7E, 0x11, 0x13])
+
+def test_escape_known_bytes():
+    assert escape(b"\x7e\x7d\x11\x13") == b"\x7d\x5e\x7d\x5d\x7d\x31\x7d\x33"
+
+def test_checksum_of_a_known_frame(): #AT command NJ from the xbee manual, 7E 00 04 08 52 4E 4A 0D
+    assert checksum(bytes([0x08, 0x52, 0x4E, 0x4A])) == 0x0D
+    assert build_frame(bytes([0x08, 0x52, 0x4E, 0x4A]), escaped=False) == bytes([0x7E, 0x00, 0x04, 0x08, 0x52, 0x4E, 0x4A, 0x0D])
+
+
+def test_parse_rx_64():
+    frame = parse_frame(rx64(b"hello", rssi=72))
+    assert frame == {"type": RX_64, "source": SOURCE_64, "rssi": -72, "options": 0, "data": b"hello"}
+
+def test_parse_rx_16():
+    frame = parse_frame(rx16(b"hello", rssi=40))
+    assert frame == {"type": RX_16, "source": 0x1234, "rssi": -40, "options": 0, "data": b"hello"}
+
+def test_parse_rx():
+    frame = parse_frame(rx(b"hello"))
+    assert frame == {"type": RX, "source": SOURCE_64, "rssi": None, "options": 1, "data": b"hello"}
+
+def test_parse_tx_status():
+    frame = parse_frame(bytes([TX_STATUS, 7, 0xFF, 0xFE, 2, 0x21, 0]))
+    assert frame == {"type": TX_STATUS, "frame_id": 7, "retries": 2, "status": 0x21}
+
+def test_parse_tx_status_15_4():
+    frame = parse_frame(bytes([TX_STATUS_15_4, 9, 1]))
+    assert frame == {"type": TX_STATUS_15_4, "frame_id": 9, "status": 1}
+
+
+@pytest.mark.parametrize("escaped", [True, False])
+def test_parser_on_split_input(escaped):
+    frames = [rx64(b"first"), rx16(b"second"), rx(b"third")]
+    stream = b"".join(build_frame(frame, escaped) for frame in frames)
+    parser = FrameParser(escaped)
+    received = []
+    for i in range(len(stream)): #a byte at a time, every frame is split
+        received += parser.feed(stream[i:i + 1])
+    assert received == frames
+    assert parser.frames == 3 and parser.bad_checksums == 0 and parser.discarded == 0
+
+def test_parser_on_escaped_input():
+    frame = rx64(ALL_ESCAPED + b"data" + ALL_ESCAPED, rssi=0x7D, source=0x7E7D11137E7D1113) #every field that can need escaping does
+    stream = build_frame(frame)
+    assert stream.count(bytes([START])) == 1
+    parser = FrameParser(escaped=True)
+    for cut in range(1, len(stream)):
+        assert parser.feed(stream[:cut]) + parser.feed(stream[cut:]) == [frame] #split everywhere, including between 7D and the byte it escapes
+        assert parser.buffer == b""
+
+def test_parser_drops_bad_frames_and_carries_on():
+    good = build_frame(rx64(b"good"))
+    bad = bytearray(build_frame(rx64(b"bad!")))
+    bad[-1] ^= 0xFF
+    parser = FrameParser(escaped=True)
+    assert parser.feed(b"noise" + bytes(bad) + good) == [rx64(b"good")]
+    assert parser.bad_checksums == 1 and parser.discarded == len(b"noise")
+
+def test_unescaped_parser_resyncs_after_a_bad_frame():
+    good = build_frame(rx64(b"good"), escaped=False)
+    bad = bytearray(build_frame(rx64(b"bad!"), escaped=False))
+    bad[-1] ^= 0xFF
+    parser = FrameParser(escaped=False)
+    assert parser.feed(bytes(bad) + good) == [rx64(b"good")]
+    assert parser.bad_checksums == 1
+
+
+def test_transport_reads_packets_and_replies_to_the_sender():
+    line = (packet_line(1) + "\n").encode()
+    stream = io.BytesIO(build_frame(rx(line[:50])) + build_frame(rx64(line[50:], rssi=55)))
+    api = ApiTransport(stream)
+    packets = api.read()
+    assert [packet[0] for packet in packets] == [line[:50], line[50:]]
+    assert [packet[1] for packet in packets] == [None, -55]
+    assert api.rssi == -55 and api.source == SOURCE_64
+
+    out = io.BytesIO()
+    api.stream = out
+    api.write(b"CMD,3130,CX,ON\n")
+    frame = FrameParser().feed(out.getvalue())[0]
+    assert frame[0] == 0x00 #802.15.4 64 bit transmit request, as the packet came that way
+    assert int.from_bytes(frame[2:10], "big") == SOURCE_64
+    assert frame[11:] == b"CMD,3130,CX,ON\n"
+
+def test_transport_sends_to_16_bit_senders():
+    api = ApiTransport(io.BytesIO(build_frame(rx16(b"x", source=0x0042))))
+    api.read()
+    out = io.BytesIO()
+    api.stream = out
+    api.write(b"hi")
+    frame = FrameParser().feed(out.getvalue())[0]
+    assert frame[0] == TX_16 and int.from_bytes(frame[2:4], "big") == 0x0042 and frame[5:] == b"hi"
+
+def test_transport_broadcasts_before_hearing_anything():
+    out = io.BytesIO()
+    ApiTransport(out).write(b"hi")
+    assert out.getvalue() == tx_request(b"hi", frame_id=1)
+    assert FrameParser().feed(out.getvalue())[0][0] == TX
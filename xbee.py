@@ -0,0 +1,236 @@
+# Xbee driver, owns the serial port, the session log and SIMP/command transmission
+
+import os, time, threading
+from collections import deque
+from datetime import datetime
+
+from telemetry import split_packet, packet_numbers, PACKET_LENGTH, NUMERIC_FIELDS
+from telemetry_shm import TelemetryRingWriter
+from session_log import SessionLog
+from serial_link import SerialConnection
+from xbee_api import ApiTransport
+from simp_profile import load_commands, SIMP_FILE, SIMP_PERIOD
+
+TELEMETRY_SHM_NAME = "gcs_telemetry" #shared memory ring other processes can read live telemetry from (see telemetry_shm.py), None to disable
+API_MODE = None #xbee AP setting, None for transparent mode, 1 or 2 for API mode (gives the RSSI of every packet), see xbee_api.py
+READ_TIMEOUT = 0.05 #s the handler waits for data before checking for commands to send, longer uses less CPU while idle but delays commands
+
+SCRIPT_DIR = os.path.dirname(__file__)  #stores path of this file so all paths can be defined as relative
+
+
+class XbeeDriver():
+    def __init__(self, COM=None, BAUD=115200, shm_name=TELEMETRY_SHM_NAME, filename=None, verbose=True, api_mode=API_MODE): #COM: port to try first, None finds the xbee. filename: session log to append to, a new one is started if None. verbose: print every packet
+
+        self.filename = filename or datetime.now().strftime("%H-%M-%S_%d-%m-%Y") + '.csv'
+        self.verbose = verbose
+
+        self.ser = SerialConnection(COM, BAUD, READ_TIMEOUT) #connects and reconnects in the background, never blocks or raises
+        self.api = ApiTransport(self.ser, escaped=api_mode == 2) if api_mode else None #frames are unwrapped here, the rest of the driver only sees the payload's data
+        self.rssi = None #dBm of the latest packet, API mode only
+        self.log = SessionLog(self.filename, os.path.join(SCRIPT_DIR, "logs"))
+
+        self.shm_writer = None
+        if shm_name:
+            try:
+                self.shm_writer = TelemetryRingWriter(shm_name)
+            except Exception as e:
+                print("Xbee driver: could not create telemetry ring, not publishing")
+                print(str(e))
+
+        self._xbee_lock = threading.Lock()
+        self._kill_flag = False
+        self._simp_lock = threading.Lock() #guards the simp flag and where the profile starts from
+        self._simp_running_flag = False
+        self._simp_from = 0 #command the profile starts from when simp is turned on
+        self.simp_state = False
+        self.simp_c = 0 #next command in the profile
+        self._toSendSimp = ''
+
+        self._msgs = deque(maxlen=1000) #[time received, packet, RSSI dBm or None] not yet collected, oldest first
+        self._recv_count = 0
+        self._toSend = ""
+        self._toSendCount = 0 #commands waiting in _toSend
+        self.commands_written = 0 #commands from send_msg written to the port so far
+        self.last_sent_command = "-"
+        self.handler_activity = time.time() #time the xbee handler last went round its loop, stops if it wedges or dies
+
+        self.xbee_thread = threading.Thread(target=self.xbee_handler, daemon=True)
+        self.xbee_thread.start()
+        self.simp_thread = threading.Thread(target=self.simp_handler, daemon=True)
+        self.simp_thread.start()
+
+        print("Xbee driver: finished init")
+        print(self.filename)
+
+    def close(self):
+        self.stop_simp()
+        with self._xbee_lock: self._kill_flag = True
+        self.xbee_thread.join(1) #dont close the port, log or shared memory out from under the handler
+        self.ser.close()
+        self.log.close()
+        if self.shm_writer:
+            self.shm_writer.close()
+
+    def xbee_handler(self): #reads from xbee and writes to xbee
+        latest_msg = b'' #buffer for incomming msg
+        while True:
+            self.handler_activity = time.time()
+            try:
+                with self._xbee_lock:
+                    if self._kill_flag: 
+                        break
+                if self.api:
+                    chunks = [packet[:2] for packet in self.api.read()] #a telemetry line can be split over several frames, a line gets the RSSI of the frame that ends it
+                else:
+                    chunks = [[self.ser.read(self.ser.in_waiting or 1), None]] #everything waiting, or wait up to READ_TIMEOUT for the next byte. Only this thread uses the port so no lock is needed
+
+                for data, rssi in chunks:
+                    if rssi is not None: self.rssi = rssi
+                    while data:
+                        end = data.find(b"\n") #signifies end of current msg
+                        if end == -1:
+                            self.log.write(data)
+                            latest_msg += data #add recieved data to msg buffer
+                            break
+                        self.log.write(data[:end + 1])
+                        line, latest_msg = (latest_msg + data[:end]).decode(errors="replace"), b'' #cleared first so a malformed line cant corrupt the next one
+                        data = data[end + 1:]
+                        self.line_received(line, time.time(), rssi)
+
+                with self._xbee_lock:
+                    if self._toSend != '' and self._write(self._toSend): #kept until the port is connected
+                        print("xbee_handler sending: ", self._toSend)
+                        self.last_sent_command = ('\n\n' + self._toSend).split('\n')[-2]
+                        self._toSend = ''
+                        self.commands_written += self._toSendCount
+                        self._toSendCount = 0
+            except Exception as e:
+                print("xbee handler: ERROR")
+                print(str(e))
+
+    def _write(self, text): #to the payload, in a transmit request frame in API mode
+        if self.api:
+            return self.api.write(text.encode())
+        return self.ser.write(text.encode())
+
+    def line_received(self, line, recv_time, rssi=None): #logs, publishes and queues a whole line, then sends any waiting SIMP command. rssi: dBm, API mode only
+        if self.verbose:
+            print("xbee handler: got packet:")
+            print(line)
+        try:
+            msg = split_packet(line) #remove splits in echo (every command has commas)
+        except ValueError:
+            self.log.end_line()
+            print("xbee handler: ERROR, no blank entry after the CMD echo, line dropped")
+            return
+        whole = len(msg) == PACKET_LENGTH #a packet with fields missing or extra would put values in the wrong columns
+        values = packet_numbers(msg)
+        self.log.end_line(values[NUMERIC_FIELDS.index("Packet Count")] if whole else None, recv_time, rssi)
+        if self.shm_writer and whole:
+            self.shm_writer.write(values, recv_time)
+
+        with self._xbee_lock:
+            if len(self._msgs) == self._msgs.maxlen:
+                print("xbee_handler: MSG OVERFLOW, data lost")
+            if self.verbose:
+                print(msg)
+                print(len(msg))
+                print("xbee_handler: got new msg")
+            self._msgs.append([recv_time, msg, rssi])
+            self._recv_count += 1
+
+            if self._toSendSimp != '': #if there is a simp msg to send
+                print("xbee handler: allowing single simp send")
+                if self._write(self._toSendSimp): #send simp msg to xbee, kept for the next packet if the port is down
+                    self.last_sent_command = ('\n\n' + self._toSendSimp).split('\n')[-2]
+                    self._toSendSimp = ''
+                    print('done')
+
+    def simp_handler(self): #streams the precompiled SIMP commands in data/SIMP_FILE (see simp_profile.py) one every SIMP_PERIOD while simp is on, the xbee handler sends each after the next packet
+        commands = []
+        next_send = 0
+        while True:
+            with self._simp_lock:
+                running = self._simp_running_flag
+            if not running:
+                self.simp_state = False
+                time.sleep(0.1)
+                continue
+
+            if not self.simp_state: #just turned on, the profile is reread in case it has been remade and starts again (or from where a restarted driver left off)
+                self.simp_state = True
+                commands = load_commands(os.path.join(SCRIPT_DIR, "data", SIMP_FILE))
+                with self._simp_lock:
+                    self.simp_c = self._simp_from
+                next_send = time.time()
+            if time.time() >= next_send:
+                next_send += SIMP_PERIOD
+                if self.simp_c < len(commands):
+                    if self.verbose: print("SimP handler: sending packet", self.simp_c)
+                    self.send_simp_msg(commands[self.simp_c])
+                elif self.simp_c == len(commands):
+                    print("SimP handler: end of the profile after " + str(len(commands)) + " commands")
+                self.simp_c += 1
+            time.sleep(0.05)
+
+    def start_simp(self, position=0): #position: command in the profile to start from
+        print("STARTING SIMP")
+        with self._simp_lock:
+            self._simp_running_flag = True
+            self._simp_from = position
+            print(self._simp_running_flag)
+        return 1
+    
+    def stop_simp(self):
+        print("STOPPING SIMP")
+        with self._simp_lock:
+            self._simp_running_flag = False
+        return 0
+
+    def is_unread(self):
+        with self._xbee_lock:
+            x = len(self._msgs) > 0
+        return x
+    
+    def get_msg(self): #oldest packet not yet collected
+        with self._xbee_lock:
+            msg = self._msgs.popleft()[1]
+        return msg
+
+    def get_msgs(self): #every packet not yet collected, oldest first
+        return [packet[1] for packet in self.get_packets()]
+
+    def get_packets(self): #[time received, packet, RSSI dBm or None] for every packet not yet collected, oldest first
+        with self._xbee_lock:
+            packets = list(self._msgs)
+            self._msgs.clear()
+        return packets
+    
+    def connection_status(self): #[state, port, s until the next attempt to connect, RSSI dBm of the latest packet or None], see serial_link.SerialConnection
+        return self.ser.status() + [self.rssi]
+
+    def memory_status(self): #the driver runs in the caller's process, which monitors its own memory
+        return None
+
+    def get_recv_count(self):
+        with self._xbee_lock:
+            x = self._recv_count
+        return x
+    
+    def send_msg(self, msg):
+        if "<UTC TIME>" in msg: #replace <UTC TIME> with HH:MM:SS timestamp
+            print("Replacing ", msg)
+            start = msg.find("<UTC TIME>")
+            end = msg[start:].find(">") + start + 1
+            msg = msg[:start] + datetime.now().strftime("%H:%M:%S") + msg[end:]
+            print("with", msg)
+
+        with self._xbee_lock:
+                self._toSend += msg
+                self._toSendCount += 1
+        return True
+    
+    def send_simp_msg(self, msg):
+        with self._xbee_lock:
+                self._toSendSimp = msg
+        return True
@@ -0,0 +1,169 @@
+# XBee API mode framing (AP=1, or AP=2 escaped) so the RSSI and source of every packet are known, frames are 7E | length | frame data | checksum
+
+START = 0x7E
+ESCAPE = 0x7D
+ESCAPED = bytes([0x7E, 0x7D, 0x11, 0x13])
+
+RX_64 = 0x80 #802.15.4 receive, 64 bit source, RSSI
+RX_16 = 0x81 #802.15.4 receive, 16 bit source, RSSI
+RX = 0x90 #DigiMesh / Zigbee receive, no RSSI in the frame
+TX_STATUS_15_4 = 0x89
+TX_STATUS = 0x8B
+TX_64 = 0x00 #802.15.4 transmit requests
+TX_16 = 0x01
+TX = 0x10 #DigiMesh / Zigbee transmit request
+BROADCAST_64 = 0x000000000000FFFF
+BROADCAST_16 = 0xFFFF
+
+
+def checksum(frame_data): #FF - (sum of frame data & FF)
+    return 0xFF - (sum(frame_data) & 0xFF)
+
+def escape(data): #AP=2, any 7E 7D 11 13 after the start delimiter is sent as 7D then the byte XOR 20, so 7E only ever starts a frame
+    out = bytearray()
+    for byte in data:
+        if byte in ESCAPED:
+            out += bytes([ESCAPE, byte ^ 0x20])
+        else:
+            out.append(byte)
+    return bytes(out)
+
+def unescape(data): #undoes escape, data must not end half way through an escape
+    parts = data.split(bytes([ESCAPE]))
+    return parts[0] + b"".join(bytes([part[0] ^ 0x20]) + part[1:] for part in parts[1:] if part)
+
+def build_frame(frame_data, escaped=True): #wraps frame data (API id + fields) in a frame
+    body = len(frame_data).to_bytes(2, "big") + bytes(frame_data) + bytes([checksum(frame_data)])
+    return bytes([START]) + (escape(body) if escaped else body)
+
+def tx_request(data, dest64=BROADCAST_64, dest16=0xFFFE, frame_id=1, escaped=True): #DigiMesh / Zigbee transmit request, frame_id 0 for no TX status
+    if isinstance(data, str): data = data.encode()
+    frame = bytes([TX, frame_id]) + dest64.to_bytes(8, "big") + dest16.to_bytes(2, "big") + bytes([0, 0]) + data #broadcast radius 0 (max), options 0
+    return build_frame(frame, escaped)
+
+def tx16_request(data, dest16=BROADCAST_16, frame_id=1, escaped=True): #802.15.4 transmit request to a 16 bit address
+    if isinstance(data, str): data = data.encode()
+    return build_frame(bytes([TX_16, frame_id]) + dest16.to_bytes(2, "big") + bytes([0]) + data, escaped)
+
+def tx64_request(data, dest64=BROADCAST_64, frame_id=1, escaped=True): #802.15.4 transmit request to a 64 bit address
+    if isinstance(data, str): data = data.encode()
+    return build_frame(bytes([TX_64, frame_id]) + dest64.to_bytes(8, "big") + bytes([0]) + data, escaped)
+
+def parse_frame(frame_data): #fields of a received frame as a dict, "type" is always there. receive frames have source, rssi (dBm or None) and data
+    frame_type = frame_data[0]
+    if frame_type == RX_64:
+        return {"type": frame_type, "source": int.from_bytes(frame_data[1:9], "big"), "rssi": -frame_data[9], "options": frame_data[10], "data": bytes(frame_data[11:])}
+    if frame_type == RX_16:
+        return {"type": frame_type, "source": int.from_bytes(frame_data[1:3], "big"), "rssi": -frame_data[3], "options": frame_data[4], "data": bytes(frame_data[5:])}
+    if frame_type == RX:
+        return {"type": frame_type, "source": int.from_bytes(frame_data[1:9], "big"), "rssi": None, "options": frame_data[11], "data": bytes(frame_data[12:])}
+    if frame_type == TX_STATUS:
+        return {"type": frame_type, "frame_id": frame_data[1], "retries": frame_data[4], "status": frame_data[5]}
+    if frame_type == TX_STATUS_15_4:
+        return {"type": frame_type, "frame_id": frame_data[1], "status": frame_data[2]}
+    return {"type": frame_type, "data": bytes(frame_data[1:])}
+
+
+class FrameParser(): #turns bytes read in any size chunks into frames, bad frames are dropped and counted
+    def __init__(self, escaped=True): #escaped: AP=2
+        self.escaped = escaped
+        self.buffer = b""
+        self.frames = 0
+        self.bad_checksums = 0
+        self.discarded = 0 #bytes thrown away looking for the start of a frame
+
+    def feed(self, data): #returns the frame data (API id + fields) of every whole frame received so far
+        self.buffer += data
+        return self._split_escaped() if self.escaped else self._split_lengths()
+
+    def _check(self, body): #body: unescaped length + frame data + checksum, returns the frame data or None
+        length = int.from_bytes(body[:2], "big")
+        frame_data = body[2:2 + length]
+        if length == 0 or len(body) != length + 3 or checksum(frame_data) != body[-1]:
+            self.bad_checksums += 1
+            return None
+        self.frames += 1
+        return frame_data
+
+    def _split_escaped(self): #7E can only be a start delimiter, so splitting on it finds every frame without reading a byte at a time
+        parts = self.buffer.split(bytes([START]))
+        self.discarded += len(parts[0])
+        frames = []
+        for i, part in enumerate(parts[1:]):
+            last = i == len(parts) - 2
+            if last: #may not have all arrived yet
+                if part.endswith(bytes([ESCAPE])):
+                    self.buffer = bytes([START]) + part
+                    return frames
+                body = unescape(part)
+                if len(body) < 2 or len(body) < int.from_bytes(body[:2], "big") + 3:
+                    self.buffer = bytes([START]) + part
+                    return frames
+            else:
+                body = unescape(part)
+            frame_data = self._check(body)
+            if frame_data is not None:
+                frames.append(frame_data)
+        self.buffer = b""
+        return frames
+
+    def _split_lengths(self): #AP=1, 7E can appear inside a frame so frames are found by their length, resynchronising on a bad checksum
+        frames = []
+        while True:
+            start = self.buffer.find(bytes([START]))
+            if start == -1:
+                self.discarded += len(self.buffer)
+                self.buffer = b""
+                return frames
+            self.discarded += start
+            self.buffer = self.buffer[start:]
+            if len(self.buffer) < 3:
+                return frames
+            end = int.from_bytes(self.buffer[1:3], "big") + 4
+            if len(self.buffer) < end:
+                return frames
+            frame_data = self._check(self.buffer[1:end])
+            if frame_data is None:
+                self.buffer = self.buffer[1:] #look for the next start delimiter
+            else:
+                frames.append(frame_data)
+                self.buffer = self.buffer[end:]
+
+
+class ApiTransport(): #receives and sends through an xbee in API mode over anything with read and write (serial port, SerialConnection, io.BytesIO)
+    def __init__(self, stream, escaped=True, address=None, tx_type=TX): #address: 64 bit address commands are sent to, None replies to whoever last sent a packet (broadcast until then). tx_type: TX or TX_64 (802.15.4), used until a packet shows which the xbee is
+        self.stream = stream
+        self.escaped = escaped
+        self.parser = FrameParser(escaped)
+        self.address = address
+        self.tx_type = tx_type
+        self.rx_type = None #type of the latest receive frame, says whether the xbees are 802.15.4 or DigiMesh/Zigbee
+        self.source = None #address of the latest packet received
+        self.rssi = None #dBm of the latest packet received
+        self.tx_status = {} #frame id: delivery status (0 is success)
+        self._frame_id = 0
+
+    def read(self): #every received packet since the last call as [data, rssi, source]
+        size = getattr(self.stream, "in_waiting", 0) or 1 #serial ports say how much is waiting, anything else is read in blocks
+        data = self.stream.read(size if hasattr(self.stream, "in_waiting") else 4096)
+        packets = []
+        for frame_data in self.parser.feed(data or b""):
+            try:
+                frame = parse_frame(frame_data)
+            except IndexError: #checksum was fine but the frame is too short for its type
+                continue
+            if "data" in frame and "source" in frame:
+                self.source, self.rssi, self.rx_type = frame["source"], frame["rssi"], frame["type"]
+                packets.append([frame["data"], frame["rssi"], frame["source"]])
+            elif "status" in frame:
+                self.tx_status[frame["frame_id"]] = frame["status"]
+        return packets
+
+    def write(self, data): #sends data to the payload in a transmit request, returns what the stream's write returned
+        self._frame_id = self._frame_id % 255 + 1 #1 to 255, 0 would turn off the TX status
+        if self.rx_type == RX_16 and self.address is None: #payload has a 16 bit address (802.15.4 MY set)
+            return self.stream.write(tx16_request(data, self.source, self._frame_id, self.escaped))
+        dest = self.address or (self.source if self.rx_type != RX_16 else None) or BROADCAST_64
+        if self.rx_type == RX_64 or (self.rx_type is None and self.tx_type == TX_64):
+            return self.stream.write(tx64_request(data, dest, self._frame_id, self.escaped))
+        return self.stream.write(tx_request(data, dest, frame_id=self._frame_id, escaped=self.escaped))